@@ -1,5 +1,6 @@
 import os
-from flask import Flask, send_from_directory
+from urllib.parse import urlsplit
+from flask import Flask, flash, jsonify, redirect, request, url_for
 from dotenv import load_dotenv
 from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_sqlalchemy import SQLAlchemy
@@ -31,6 +32,10 @@ from .config import DevConfig, ProdConfig  # noqa: E402
 def create_app():
     app = Flask(__name__, instance_relative_config=True)
 
+    # Límite de subida por endpoint + partes de archivo a disco (ver app/uploads.py)
+    from .uploads import UploadRequest
+    app.request_class = UploadRequest
+
     # Cargar configuración
     if flask_config == "ProdConfig":
         app.config.from_object(ProdConfig)
@@ -40,11 +45,16 @@ def create_app():
     # Crear carpeta instance si no existe
     os.makedirs(app.instance_path, exist_ok=True)
 
-    # Inicializar extensiones
+    # Inicializar extensiones (opciones del engine por backend: app/engine.py)
+    from .engine import configured_options, init_engine
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = configured_options(app)
     db.init_app(app)
     login_manager.init_app(app)
     csrf.init_app(app)
 
+    with app.app_context():
+        init_engine(app, db.engine)
+
     # ProxyFix (para IP real detrás de Nginx/ELB)
     if app.config.get("USE_PROXYFIX"):
         app.wsgi_app = ProxyFix(
@@ -63,12 +73,55 @@ def create_app():
         return Markup("<br>".join(escape(value).splitlines()))
     app.jinja_env.filters["nl2br"] = nl2br
 
-    # Cargar modelos para el user_loader (evita import circular)
-    from .models import User  # noqa: WPS433
-
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+    @app.errorhandler(413)
+    def request_too_large(e):
+        # Clientes JSON (import / bulk de admin): 413 con el error, sin redirigir.
+        # Formularios: de vuelta a la página del form (Referer del mismo host); no a
+        # request.path, que en endpoints solo-POST acaba en 405.
+        message = "El archivo supera el tamaño máximo permitido."
+        if request.is_json or request.accept_mimetypes.best == "application/json":
+            return jsonify(error=message), 413
+        flash(message, "warning")
+        referrer = request.referrer or ""
+        if referrer and urlsplit(referrer).netloc == request.host:
+            return redirect(referrer)
+        return redirect(url_for("main.index"))
+
+    # Almacenamiento de subidas (local / S3 / memoria)
+    from . import storage
+    storage.init_app(app)
+
+    # Variantes de avatar por tamaño (ver app/images.py)
+    from .images import avatar_src, avatar_srcset
+    app.jinja_env.globals.update(avatar_src=avatar_src, avatar_srcset=avatar_srcset)
+
+    # user_loader con caché (evita el SELECT del usuario en cada request)
+    from . import user_cache
+    user_cache.init_app(app)
+
+    # Caché de páginas públicas (anónimos), invalidada por commit
+    from . import page_cache
+    page_cache.init_app(app)
+
+    # Listado público de clasificados: consulta paginada con caché de resultados
+    from . import public_classifieds
+    public_classifieds.init_app(app)
+
+    # Contadores del dashboard mantenidos al escribir
+    from .kpis import register_kpi_listeners
+    register_kpi_listeners()
+
+    # Escritor de auditoría por lotes (solo se usa con AUDIT_MODE="queue")
+    from .audit import audit_writer
+    audit_writer.init_app(app)
+
+    # Tiempos por request (db / render / resto), consultas lentas y /metrics
+    from . import metrics
+    metrics.init_app(app)
+
+    # Perfilado opcional de requests (PROFILER_ENABLED)
+    from . import profiler
+    profiler.init_app(app)
 
     # Blueprints
     from .main import main_bp
@@ -76,18 +129,18 @@ def create_app():
     from .classifieds import classifieds_bp
     from .admin import admin_bp
     from .auth import auth_bp
+    from .media import media_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(services_bp, url_prefix="/services")
     app.register_blueprint(classifieds_bp)  # ya define /clasificados dentro
     app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_blueprint(auth_bp)
+    app.register_blueprint(media_bp)  # /media/avatars/...
+
+    # Tareas en segundo plano (app/email.py registra "mail", app/deletions.py "deletions",
+    # app/visibility.py "visibility")
+    from . import email, deletions, visibility, workers  # noqa: F401
+    workers.init_app(app)
 
-    @app.route("/media/avatars/<path:filename>")
-    def media_avatars(filename):
-        upload_dir = app.config.get(
-            "AVATAR_UPLOAD_DIR",
-            os.path.join(app.static_folder, "uploads", "avatars")
-        )
-        return send_from_directory(upload_dir, filename)
     return app
@@ -1,10 +1,25 @@
 # app/admin.py
-from datetime import datetime, timedelta
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import os
+from datetime import datetime
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, abort, send_file
 from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
-from sqlalchemy import or_
-from .models import db, User, Service, ServiceStatus, LoginLog, Classified, ActivityLog
+from .models import db, User, Service, ServiceStatus, LoginLog, Classified, ActivityLog, UserDeletion
+from .audit import audit_writer
+from .email import outbox_stats
+from .engine import pool_stats, pragma_values
+from .exports import FORMATS, stream_export
+from .imports import ImportFileError, import_listings, read_rows, MODELS as IMPORT_MODELS, FORMATS as IMPORT_FORMATS
+from .deletions import enqueue_user_deletion
+from .kpis import get_kpis
+from .metrics import registry as metrics_registry
+from .moderation import bulk_moderate, ACTIONS
+from .page_cache import page_cache
+from .pagination import keyset_paginate, page_size
+from . import profiler
+from .retention import recent_activity
+from .search import normalized_match, prefix_match
+from .user_cache import cache_stats as user_cache_stats
 from .utils import log_action
 
 admin_bp = Blueprint("admin", __name__)
@@ -20,6 +35,59 @@ def _check_admin():
 def _is_super():
     return current_user.is_authenticated and current_user.role == "superadmin"
 
+def users_by_id(ids) -> dict:
+    """{id: nombre} solo de los usuarios indicados (una consulta por PK, no la tabla entera)."""
+    ids = {i for i in ids if i}
+    if not ids:
+        return {}
+    return dict(db.session.query(User.id, User.name).filter(User.id.in_(ids)).all())
+
+# ------------------------
+# Filtros de los listados (compartidos con las exportaciones)
+# ------------------------
+def _listing_query(model, args):
+    """Servicios/clasificados no eliminados, filtro de estado y búsqueda."""
+    status = args.get("status")
+    search = (args.get("q") or "").strip()
+    q = model.query.filter_by(is_deleted=False)
+    if status:
+        q = q.filter_by(status=status)
+    if search:
+        q = q.filter(normalized_match(search, model.search_norm))
+    return q, search
+
+def _users_query(args):
+    q = (args.get("q") or "").strip()
+    base = User.query.filter(User.is_deleted == False)
+
+    if _is_super():
+        # Superadmin ve todos los no eliminados
+        query = base
+    else:
+        # Admin solo básicos
+        query = base.filter(User.role == "user")
+
+    if q:
+        query = query.filter(normalized_match(q, User.name_norm, User.email))
+    return query, q
+
+def _logs_queries(args):
+    action = (args.get("action") or "").strip()
+    entity = (args.get("entity") or "").strip()
+    user_id = args.get("user_id", type=int)
+
+    aq = ActivityLog.query
+    if action:
+        aq = aq.filter(ActivityLog.action == action)
+    if entity:
+        aq = aq.filter(ActivityLog.entity == entity)
+    if user_id:
+        aq = aq.filter(ActivityLog.actor_id == user_id)
+    lq = LoginLog.query
+    if user_id:
+        lq = lq.filter(LoginLog.user_id == user_id)
+    return aq, lq, dict(action=action, entity=entity, user_id=user_id or "")
+
 # ------------------------
 # Dashboard (sin gráficas)
 # ------------------------
@@ -29,34 +97,9 @@ def dashboard():
     if not _require_admin():
         return ("Forbidden", 403)
 
-    now = datetime.utcnow()
-    today = now.date()
-
-    total_users = db.session.query(User).filter_by(is_deleted=False).count()
-    active_users_30d = (
-        db.session.query(LoginLog.user_id)
-        .filter(LoginLog.created_at >= now - timedelta(days=30))
-        .distinct()
-        .count()
-    )
-    services_pending = db.session.query(Service).filter_by(status=ServiceStatus.PENDING.value, is_deleted=False).count()
-    services_active = db.session.query(Service).filter_by(status=ServiceStatus.APPROVED.value, is_active=True, is_deleted=False).count()
-    classifieds_pending = db.session.query(Classified).filter_by(status=ServiceStatus.PENDING.value, is_deleted=False).count()
-    classifieds_active = db.session.query(Classified).filter_by(status=ServiceStatus.APPROVED.value, is_active=True, is_deleted=False).count()
-    logins_today = db.session.query(LoginLog).filter(LoginLog.created_at >= datetime.combine(today, datetime.min.time())).count()
-
-    return render_template(
-        "admin/dashboard.html",
-        kpis=dict(
-            total_users=total_users,
-            active_users_30d=active_users_30d,
-            services_pending=services_pending,
-            services_active=services_active,
-            classifieds_pending=classifieds_pending,
-            classifieds_active=classifieds_active,
-            logins_today=logins_today,
-        ),
-    )
+    # Contadores materializados (app/kpis.py): lectura O(1), sin COUNT(*) por visita.
+    # Histórico desde los resúmenes diarios (app/retention.py), no desde los logs crudos.
+    return render_template("admin/dashboard.html", kpis=get_kpis(), activity=recent_activity())
 
 # ------------------------
 # Servicios
@@ -66,15 +109,15 @@ def dashboard():
 def admin_services():
     if not _require_admin():
         return ("Forbidden", 403)
-    status = request.args.get("status")
-    q = Service.query.filter_by(is_deleted=False)
-    if status:
-        q = q.filter_by(status=status)
-    items = q.order_by(Service.created_at.desc()).all()
+    q, search = _listing_query(Service, request.args)
+    page = keyset_paginate(q, Service, request.args.get("cursor"), page_size(request.args.get("per_page")))
 
-    users_map = {u.id: u.name for u in User.query.with_entities(User.id, User.name).all()}
+    users_map = users_by_id(s.rejected_by for s in page.items)
 
-    return render_template("admin/services.html", items=items, ServiceStatus=ServiceStatus, users_map=users_map)
+    return render_template(
+        "admin/services.html", items=page.items, page=page, q=search,
+        ServiceStatus=ServiceStatus, users_map=users_map,
+    )
 
 @admin_bp.route("/services/approve/<int:service_id>", methods=["POST"])
 @login_required
@@ -90,8 +133,8 @@ def approve_service(service_id):
     s.is_active = True
     s.approved_by = current_user.id
     s.approved_at = datetime.utcnow()
-    db.session.commit()
     log_action(current_user, "approve", "Service", s.id, "")
+    db.session.commit()
     flash("Servicio aprobado y activado.", "success")
     return redirect(url_for("admin.admin_services"))
 
@@ -105,8 +148,8 @@ def reject_service(service_id):
     s.is_active = False
     s.rejected_by = current_user.id
     s.rejected_at = datetime.utcnow()
-    db.session.commit()
     log_action(current_user, "reject", "Service", s.id, "")
+    db.session.commit()
     flash("Servicio rechazado.", "warning")
     return redirect(url_for("admin.admin_services"))
 
@@ -118,8 +161,8 @@ def softdelete_service(service_id):
     s = Service.query.get_or_404(service_id)
     s.is_deleted = True
     s.is_active = False
-    db.session.commit()
     log_action(current_user, "soft_delete", "Service", s.id, "")
+    db.session.commit()
     flash("Servicio movido a papelera.", "info")
     return redirect(url_for("admin.admin_services"))
 
@@ -133,12 +176,80 @@ def toggle_active(service_id):
         flash("Solo los servicios aprobados pueden activarse/desactivarse.", "warning")
         return redirect(url_for("admin.admin_services"))
     s.is_active = not bool(s.is_active)
-    db.session.commit()
     action = "activate" if s.is_active else "deactivate"
     log_action(current_user, action, "Service", s.id, "")
+    db.session.commit()
     flash("Servicio activado." if s.is_active else "Servicio desactivado.", "success")
     return redirect(url_for("admin.admin_services"))
 
+# ------------------------
+# Moderación en bloque (app/moderation.py)
+# ------------------------
+_BULK_MESSAGES = {
+    "ok": "aplicados", "unchanged": "sin cambios", "forbidden": "no autorizados",
+    "invalid_status": "con estado no válido", "not_found": "no encontrados",
+}
+
+def _listing_url(endpoint):
+    """Vuelve al listado con sus filtros (`next` del form, solo rutas locales)."""
+    target = request.form.get("next") or ""
+    if target.startswith("/") and not target.startswith("//"):
+        return target
+    return url_for(endpoint)
+
+def _bulk(model, listing_endpoint):
+    """
+    Form (ids=1&ids=2&action=approve) -> flash + redirect al listado;
+    JSON {"action": ..., "ids": [...]} -> {"results": {id: resultado}, "counts": {...}}.
+    """
+    wants_json = request.is_json or request.accept_mimetypes.best == "application/json"
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        action, raw_ids = data.get("action"), data.get("ids") or []
+    else:
+        action, raw_ids = request.form.get("action"), request.form.getlist("ids")
+    try:
+        ids = [int(i) for i in raw_ids]
+    except (TypeError, ValueError):
+        ids = None
+    limit = int(current_app.config.get("MODERATION_BULK_MAX", 500))
+    error = None
+    if action not in ACTIONS[model]:
+        error = "Acción no válida."
+    elif not ids:
+        error = "No seleccionaste elementos."
+    elif len(ids) > limit:
+        error = f"Máximo {limit} elementos por acción."
+    if error:
+        if wants_json:
+            return jsonify(error=error), 400
+        flash(error, "warning")
+        return redirect(_listing_url(listing_endpoint))
+
+    results = bulk_moderate(model, action, ids, current_user, _is_super())
+    counts = {}
+    for result in results.values():
+        counts[result] = counts.get(result, 0) + 1
+    if wants_json:
+        return jsonify(action=action, results=results, counts=counts)
+    summary = ", ".join(f"{n} {_BULK_MESSAGES[r]}" for r, n in counts.items())
+    flash(f"Acción en bloque: {summary}.", "success" if counts.get("ok") else "warning")
+    return redirect(_listing_url(listing_endpoint))
+
+@admin_bp.route("/services/bulk", methods=["POST"])
+@login_required
+def bulk_services():
+    if not _require_admin():
+        return ("Forbidden", 403)
+    return _bulk(Service, "admin.admin_services")
+
+@admin_bp.route("/classifieds/bulk", methods=["POST"])
+@login_required
+def bulk_classifieds():
+    if not _require_admin():
+        return ("Forbidden", 403)
+    return _bulk(Classified, "admin.admin_classifieds")
+
 # ------------------------
 # Clasificados
 # ------------------------
@@ -147,15 +258,15 @@ def toggle_active(service_id):
 def admin_classifieds():
     if not _require_admin():
         return ("Forbidden", 403)
-    status = request.args.get("status")
-    q = Classified.query.filter_by(is_deleted=False)
-    if status:
-        q = q.filter_by(status=status)
-    items = q.order_by(Classified.created_at.desc()).all()
+    q, search = _listing_query(Classified, request.args)
+    page = keyset_paginate(q, Classified, request.args.get("cursor"), page_size(request.args.get("per_page")))
 
-    users_map = {u.id: u.name for u in User.query.with_entities(User.id, User.name).all()}
+    users_map = users_by_id(c.rejected_by for c in page.items)
 
-    return render_template("admin/classifieds.html", items=items, ServiceStatus=ServiceStatus, users_map=users_map)
+    return render_template(
+        "admin/classifieds.html", items=page.items, page=page, q=search,
+        ServiceStatus=ServiceStatus, users_map=users_map,
+    )
 
 @admin_bp.route("/classifieds/approve/<int:cid>", methods=["POST"])
 @login_required
@@ -171,8 +282,8 @@ def approve_classified(cid):
     c.is_active = True
     c.approved_by = current_user.id
     c.approved_at = datetime.utcnow()
-    db.session.commit()
     log_action(current_user, "approve", "Classified", c.id, "")
+    db.session.commit()
     flash("Clasificado aprobado y activado.", "success")
     return redirect(url_for("admin.admin_classifieds"))
 
@@ -186,8 +297,8 @@ def reject_classified(cid):
     c.is_active = False
     c.rejected_by = current_user.id
     c.rejected_at = datetime.utcnow()
-    db.session.commit()
     log_action(current_user, "reject", "Classified", c.id, "")
+    db.session.commit()
     flash("Clasificado rechazado.", "warning")
     return redirect(url_for("admin.admin_classifieds"))
 
@@ -200,22 +311,24 @@ def users():
     if not _require_admin():
         return ("Forbidden", 403)
 
-    q = (request.args.get("q") or "").strip()
-    base = User.query.filter(User.is_deleted == False)
+    query, q = _users_query(request.args)
+    page = keyset_paginate(query, User, request.args.get("cursor"), page_size(request.args.get("per_page")))
+    return render_template("admin/users.html", items=page.items, page=page, q=q)
 
-    if _is_super():
-        # Superadmin ve todos los no eliminados
-        query = base
+@admin_bp.route("/users/search")
+@login_required
+def search_users():
+    """Typeahead de usuarios (JSON, máx. 10): prefijo de nombre/email o id exacto."""
+    q = (request.args.get("q") or "").strip()
+    if len(q) < 2 and not q.isdigit():
+        return jsonify(items=[])
+    query = db.session.query(User.id, User.name, User.email).filter(User.is_deleted == False)
+    if q.isdigit():
+        query = query.filter(User.id == int(q))
     else:
-        # Admin solo básicos
-        query = base.filter(User.role == "user")
-
-    if q:
-        like = f"%{q}%"
-        query = query.filter(or_(User.name.ilike(like), User.email.ilike(like)))
-
-    items = query.order_by(User.created_at.desc()).limit(1000).all()
-    return render_template("admin/users.html", items=items, q=q)
+        query = query.filter(prefix_match(q, User.name_norm, User.email)).order_by(User.name_norm)
+    items = [{"id": uid, "name": name, "email": email} for uid, name, email in query.limit(10)]
+    return jsonify(items=items)
 
 @admin_bp.route("/users/create", methods=["GET", "POST"])
 @login_required
@@ -240,8 +353,10 @@ def create_user():
             password = "Temp-" + email.split("@")[0]
         u = User(name=name, email=email, phone=phone, role=role, is_verified=True)
         u.password_hash = generate_password_hash(password)
-        db.session.add(u); db.session.commit()
+        db.session.add(u)
+        db.session.flush()  # asigna id para la auditoría
         log_action(current_user, "create_user", "User", u.id, f"Rol {role}")
+        db.session.commit()
         flash("Usuario creado.", "success")
         return redirect(url_for("admin.users"))
     return render_template("admin/create_user.html")
@@ -259,8 +374,8 @@ def edit_user(uid):
         u.name = request.form.get("name", u.name).strip()
         u.email = request.form.get("email", u.email).lower().strip()
         u.phone = request.form.get("phone", u.phone).strip()
-        db.session.commit()
         log_action(current_user, "edit_user", "User", u.id, "Datos básicos")
+        db.session.commit()
         flash("Usuario actualizado.", "success")
         return redirect(url_for("admin.users"))
     return render_template("admin/edit_user.html", u=u)
@@ -276,8 +391,8 @@ def reset_password(uid):
         return redirect(url_for("admin.users"))
     temp = f"Temp-{u.id}-{int(datetime.utcnow().timestamp())}"
     u.password_hash = generate_password_hash(temp)
-    db.session.commit()
     log_action(current_user, "reset_password", "User", u.id, "")
+    db.session.commit()
     flash(f"Contraseña temporal: {temp}", "info")
     return redirect(url_for("admin.users"))
 
@@ -291,8 +406,8 @@ def softdelete_user(uid):
         flash("No autorizado.", "danger")
         return redirect(url_for("admin.users"))
     u.is_deleted = True
-    db.session.commit()
     log_action(current_user, "soft_delete", "User", u.id, "")
+    db.session.commit()
     flash("Usuario movido a papelera.", "info")
     return redirect(url_for("admin.users"))
 
@@ -316,8 +431,8 @@ def change_role(uid):
             return redirect(url_for("admin.users"))
 
     u.role = new_role
-    db.session.commit()
     log_action(current_user, "change_role", "User", u.id, f"{new_role}")
+    db.session.commit()
     flash("Rol actualizado.", "success")
     return redirect(url_for("admin.users"))
 
@@ -332,8 +447,8 @@ def verify_user(uid):
         return redirect(url_for("admin.users"))
     u.is_verified = True
     u.verification_code = None
-    db.session.commit()
     log_action(current_user, "verify_user", "User", u.id, "")
+    db.session.commit()
     flash("Usuario verificado manualmente.", "success")
     return redirect(url_for("admin.users"))
 
@@ -353,16 +468,20 @@ def harddelete_user(uid):
             flash("Debe quedar al menos un superadmin activo.", "warning")
             return redirect(url_for("admin.users"))
 
-    Service.query.filter_by(owner_id=u.id).delete(synchronize_session=False)
-    Classified.query.filter_by(owner_id=u.id).delete(synchronize_session=False)
-    ActivityLog.query.filter((ActivityLog.actor_id == u.id)).delete(synchronize_session=False)
-    LoginLog.query.filter_by(user_id=u.id).delete(synchronize_session=False)
-
-    db.session.delete(u)
+    # Se borra por tandas en segundo plano (app/deletions.py); aquí solo se encola
+    enqueue_user_deletion(u, current_user)
     db.session.commit()
-    log_action(current_user, "hard_delete", "User", uid, "")
-    flash("Usuario eliminado definitivamente.", "success")
-    return redirect(url_for("admin.users"))
+    flash("Eliminación definitiva en curso: el progreso se ve en Eliminaciones.", "info")
+    return redirect(url_for("admin.deletions"))
+
+@admin_bp.route("/deletions")
+@login_required
+def deletions():
+    if not (_require_admin() and _is_super()):
+        return ("Forbidden", 403)
+    jobs = UserDeletion.query.order_by(UserDeletion.id.desc()).limit(50).all()
+    active = any(j.status in ("queued", "running") for j in jobs)
+    return render_template("admin/deletions.html", jobs=jobs, active=active)
 
 # ------------------------
 # Logs
@@ -372,6 +491,159 @@ def harddelete_user(uid):
 def logs():
     if not (_require_admin()):
         return ("Forbidden", 403)
-    activities = ActivityLog.query.order_by(ActivityLog.created_at.desc()).limit(500).all()
-    logins = LoginLog.query.order_by(LoginLog.created_at.desc()).limit(500).all()
-    return render_template("admin/logs.html", activities=activities, logins=logins)
+    per_page = page_size(request.args.get("per_page"))
+    aq, lq, filters = _logs_queries(request.args)
+
+    # Cada tabla pagina con su propio cursor (a_cursor / l_cursor)
+    activities = keyset_paginate(aq, ActivityLog, request.args.get("a_cursor"), per_page)
+    logins = keyset_paginate(lq, LoginLog, request.args.get("l_cursor"), per_page)
+    return render_template(
+        "admin/logs.html",
+        activities=activities.items, activities_page=activities,
+        logins=logins.items, logins_page=logins,
+        filters=filters,
+        audit=audit_writer.metrics() if current_app.config.get("AUDIT_MODE") == "queue" else None,
+        outbox=outbox_stats(),
+    )
+
+# ------------------------
+# Perfiles de requests (app/profiler.py)
+# ------------------------
+def _profile_path(name):
+    if not profiler.FILENAME_RE.match(name):
+        abort(404)
+    path = os.path.join(profiler.profile_dir(), name)
+    if not os.path.exists(path):
+        abort(404)
+    return path
+
+@admin_bp.route("/profiles", methods=["GET", "POST"])
+@login_required
+def profiles():
+    if not (_require_admin() and _is_super()):
+        return ("Forbidden", 403)
+    token = profiler.make_token(current_user) if request.method == "POST" else None
+    return render_template(
+        "admin/profiles.html", items=profiler.list_profiles(), token=token,
+        header=profiler.HEADER, cfg=current_app.config,
+    )
+
+@admin_bp.route("/profiles/<name>")
+@login_required
+def profile_download(name):
+    if not (_require_admin() and _is_super()):
+        return ("Forbidden", 403)
+    return send_file(_profile_path(name), as_attachment=True, download_name=name)
+
+@admin_bp.route("/profiles/<name>/summary")
+@login_required
+def profile_summary(name):
+    if not (_require_admin() and _is_super()):
+        return ("Forbidden", 403)
+    _profile_path(name)
+    return current_app.response_class(profiler.summary(name), mimetype="text/plain; charset=utf-8")
+
+# ------------------------
+# Exportaciones (CSV / JSONL en streaming)
+# ------------------------
+# Columnas exportadas por tabla (nunca hashes de contraseña ni códigos de verificación)
+EXPORT_COLUMNS = {
+    "users": (User.id, User.name, User.email, User.phone, User.role, User.is_verified,
+              User.created_at, User.last_login_at),
+    "services": (Service.id, Service.title, Service.owner_id, Service.status, Service.is_active,
+                 Service.website, Service.address, Service.contact_name, Service.contact_email,
+                 Service.contact_phone, Service.created_at, Service.approved_at, Service.rejected_at),
+    "classifieds": (Classified.id, Classified.title, Classified.owner_id, Classified.status,
+                    Classified.is_active, Classified.start_date, Classified.end_date,
+                    Classified.created_at, Classified.approved_at, Classified.rejected_at),
+    "activity": (ActivityLog.id, ActivityLog.actor_id, ActivityLog.action, ActivityLog.entity,
+                 ActivityLog.entity_id, ActivityLog.meta, ActivityLog.created_at),
+    "logins": (LoginLog.id, LoginLog.user_id, LoginLog.ip, LoginLog.user_agent, LoginLog.created_at),
+}
+
+def _export_query(kind, args):
+    """Misma consulta (y filtros) que el listado de `kind`, ordenada por id."""
+    if kind == "users":
+        query, _q = _users_query(args)
+        return query.order_by(User.id)
+    if kind in ("services", "classifieds"):
+        model = Service if kind == "services" else Classified
+        query, _search = _listing_query(model, args)
+        return query.order_by(model.id)
+    aq, lq, _filters = _logs_queries(args)
+    return aq.order_by(ActivityLog.id) if kind == "activity" else lq.order_by(LoginLog.id)
+
+@admin_bp.route("/export/<kind>.<fmt>")
+@login_required
+def export(kind, fmt):
+    if not _require_admin():
+        return ("Forbidden", 403)
+    if kind not in EXPORT_COLUMNS or fmt not in FORMATS:
+        return ("Not found", 404)
+    query = _export_query(kind, request.args)
+    filters = " ".join(f"{k}={v}" for k, v in request.args.items() if v)
+    log_action(current_user, "export", kind, None, f"{fmt} {filters}".strip()[:500])
+    db.session.commit()  # la auditoría no espera a que termine la descarga
+    filename = f"{kind}-{datetime.utcnow():%Y%m%d-%H%M}"
+    return stream_export(query, EXPORT_COLUMNS[kind], fmt, filename)
+
+# ------------------------
+# Importación (CSV / JSONL)
+# ------------------------
+@admin_bp.route("/import", methods=["GET", "POST"])
+@login_required
+def import_listings_view():
+    """
+    Form multipart: kind (services|classifieds), file (.csv/.jsonl) y dry_run.
+    Con Accept: application/json devuelve el informe como JSON.
+    """
+    if not _require_admin():
+        return ("Forbidden", 403)
+    if request.method == "GET":
+        return render_template("admin/import.html", report=None, kind="services")
+
+    wants_json = request.accept_mimetypes.best == "application/json"
+    kind = request.form.get("kind", "services")
+    upload = request.files.get("file")
+    fmt = (upload.filename.rsplit(".", 1)[-1].lower() if upload and upload.filename else "")
+    fmt = "jsonl" if fmt == "ndjson" else fmt
+    error = None
+    if kind not in IMPORT_MODELS:
+        error = "Tipo no válido."
+    elif fmt not in IMPORT_FORMATS:
+        error = "Sube un archivo .csv o .jsonl."
+    report = None
+    if not error:
+        try:
+            report = import_listings(
+                IMPORT_MODELS[kind], read_rows(upload.stream, fmt), actor=current_user,
+                dry_run=bool(request.form.get("dry_run")), source=upload.filename,
+            )
+        except (ImportFileError, UnicodeDecodeError) as e:
+            db.session.rollback()
+            error = str(e) if isinstance(e, ImportFileError) else "El archivo no está en UTF-8."
+    if wants_json:
+        return (jsonify(error=error), 400) if error else jsonify(report)
+    if error:
+        flash(error, "warning")
+    return render_template("admin/import.html", report=report, kind=kind)
+
+# ------------------------
+# Cachés
+# ------------------------
+@admin_bp.route("/cache")
+@login_required
+def cache_stats():
+    if not (_require_admin()):
+        return ("Forbidden", 403)
+    return jsonify(pages=page_cache.stats(), users=user_cache_stats())
+
+@admin_bp.route("/db")
+@login_required
+def db_stats():
+    if not (_require_admin()):
+        return ("Forbidden", 403)
+    return jsonify(
+        pool=pool_stats(), pragmas=pragma_values(),
+        slow_queries=metrics_registry.slow_queries(int(current_app.config.get("SLOW_QUERY_TOP", 20))),
+    )
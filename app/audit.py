@@ -0,0 +1,163 @@
+# app/audit.py
+"""
+Escritor de ActivityLog en segundo plano (AUDIT_MODE="queue").
+
+log_action / log_actions dejan las filas en la sesión (session.info) y se encolan
+al confirmarse su transacción (after_commit); si se revierte, se descartan: nunca
+se audita una acción que no ocurrió. La cola está acotada en memoria y un hilo las
+inserta por lotes (un INSERT multi-fila + un commit por lote). Si la cola está llena se espera
+AUDIT_PUT_TIMEOUT segundos (backpressure) y luego se descarta y se cuenta.
+Al apagar el proceso (atexit) se vacía la cola.
+
+En el modo por defecto (AUDIT_MODE="transaction") no se usa: log_action añade la
+entrada a la transacción del llamador y se confirma con su mismo commit.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from sqlalchemy import event
+from .models import db, ActivityLog
+
+_STOP = object()
+_PENDING = "audit_pending"  # session.info: filas a encolar en el commit
+
+
+class AuditWriter:
+    def __init__(self):
+        self.app = None
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = int(app.config.get("AUDIT_BATCH_SIZE", 200))
+        self.flush_interval = float(app.config.get("AUDIT_FLUSH_INTERVAL", 1.0))
+        self.put_timeout = float(app.config.get("AUDIT_PUT_TIMEOUT", 0.05))
+        self.max_queue = int(app.config.get("AUDIT_QUEUE_MAX", 10000))
+        for name, fn in (("after_commit", _after_commit), ("after_rollback", _after_rollback)):
+            if not event.contains(db.session, name, fn):
+                event.listen(db.session, name, fn)
+        atexit.register(self.shutdown)
+
+    # -------------------------
+    # Productor (requests)
+    # -------------------------
+
+    def submit_on_commit(self, rows: list):
+        """Filas que se encolan cuando se confirme la transacción actual de db.session."""
+        db.session.info.setdefault(_PENDING, []).extend(rows)
+
+    def submit(self, row: dict) -> bool:
+        """Encola una fila (dict de columnas de ActivityLog). False si se descartó."""
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            self._stats["dropped"] += 1
+            if self._stats["dropped"] % 100 == 1:
+                self.app.logger.warning("[audit] cola llena, entradas descartadas: %s", self._stats["dropped"])
+            return False
+        self._stats["enqueued"] += 1
+        return True
+
+    def _ensure_started(self):
+        # Arranque perezoso y por proceso (los workers de gunicorn se crean con fork)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._queue is None or self._pid != os.getpid():
+                # Proceso nuevo (fork): la cola heredada es del padre. Si solo murió el
+                # hilo, se conserva la cola con lo pendiente.
+                self._queue = queue.Queue(maxsize=self.max_queue)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    # -------------------------
+    # Consumidor (hilo)
+    # -------------------------
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            stop = first is _STOP
+            batch = [] if stop else [first]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: list):
+        t0 = time.perf_counter()
+        with self.app.app_context():
+            try:
+                db.session.execute(ActivityLog.__table__.insert(), batch)
+                db.session.commit()
+                self._stats["written"] += len(batch)
+                self._stats["batches"] += 1
+            except Exception:
+                db.session.rollback()
+                self._stats["failed"] += len(batch)
+                self.app.logger.exception("[audit] no se pudo escribir un lote de %s entradas", len(batch))
+            finally:
+                db.session.remove()
+        self._stats["write_ms"] += int((time.perf_counter() - t0) * 1000)
+
+    # -------------------------
+    # Apagado y métricas
+    # -------------------------
+
+    def shutdown(self, timeout: float = 5.0):
+        """Vacía la cola y detiene el hilo (atexit)."""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        self._thread = None
+
+    def metrics(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "enqueued": self._stats["enqueued"],
+            "written": self._stats["written"],
+            "dropped": self._stats["dropped"],
+            "failed": self._stats["failed"],
+            "batches": self._stats["batches"],
+            "write_ms": self._stats["write_ms"],
+        }
+
+
+audit_writer = AuditWriter()
+
+
+def _after_commit(session):
+    for row in session.info.pop(_PENDING, None) or ():
+        audit_writer.submit(row)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING, None)
@@ -1,3 +1,4 @@
+from datetime import datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
@@ -35,12 +36,13 @@ def register():
         u.set_password(password)
         u.verification_code = gen_code(6)
         db.session.add(u)
-        db.session.commit()
+        db.session.flush()  # asigna id para el token
 
         token = _ts().dumps({"uid": u.id, "code": u.verification_code})
         link = _build_verify_link(token)
-        # Email real con link y código
+        # Email real con link y código: se encola en la misma transacción que el usuario
         send_verification_email(u.email, link, code=u.verification_code)
+        db.session.commit()
 
         flash("Registro exitoso. Te enviamos un correo con el enlace de verificación.", "success")
         return redirect(url_for("auth.verify"))
@@ -105,6 +107,7 @@ def login():
             flash("Tu cuenta no está verificada. Revisa tu email o solicita un nuevo enlace.", "warning")
             return redirect(url_for("auth.verify"))
         login_user(u, remember=True)
+        u.last_login_at = datetime.utcnow()
         # IP real (respeta proxy si se configuró ProxyFix)
         ip_hdr = request.headers.get("X-Forwarded-For", request.remote_addr) or ""
         ip = ip_hdr.split(",")[0].strip() if ip_hdr else request.remote_addr
@@ -159,8 +162,8 @@ def profile():
             current_user.set_password(pwd)
             flash("Contraseña actualizada.", "success")
 
-        db.session.commit()
         log_action(current_user, "update_profile", "User", current_user.id, "Perfil actualizado")
+        db.session.commit()
         return redirect(url_for("auth.profile"))
 
     return render_template("auth/profile.html")
\ No newline at end of file
@@ -0,0 +1,211 @@
+# app/cache.py
+"""
+Cachés clave -> valor con TTL.
+
+- LocalCache: LRU en memoria del proceso (por defecto). Con varios workers de
+  gunicorn cada uno tiene la suya: una invalidación solo llega al proceso que la
+  hace y el resto ve el valor viejo hasta que vence el TTL (por eso TTL corto).
+- FileCache: un archivo por clave en un directorio; compartida entre los procesos
+  de una misma máquina, sin dependencias.
+- RedisCache: compartida entre procesos (CACHE_REDIS_URL, cualquier servidor que
+  hable el protocolo de Redis: Redis, Valkey, KeyDB...). Requiere el paquete `redis`,
+  que es opcional: si no está instalado se usa LocalCache con un aviso.
+
+Los valores deben ser serializables con pickle (dicts de columnas, no objetos ORM).
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict, Counter
+
+
+class LocalCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # clave -> (vence_en, valor)
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._stats["misses"] += 1
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                self._stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "local", "size": len(self._data), **self._stats}
+
+
+class FileCache:
+    def __init__(self, directory: str, maxsize: int = 10000, ttl: float = 30):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._stats = Counter()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key) -> str:
+        return os.path.join(self.directory, hashlib.sha1(str(key).encode()).hexdigest())
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                expires, value = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self._stats["misses"] += 1
+            return None
+        if expires < time.time():
+            self._remove(path)
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        # Escritura atómica: tmp + rename (otro proceso nunca lee un archivo a medias)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump((time.time() + (ttl or self.ttl), value), fh)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            self._remove(tmp)
+            self._stats["errors"] += 1
+            return
+        self._stats["sets"] += 1
+        if self._stats["sets"] % 100 == 0:
+            self._prune()
+
+    def _prune(self):
+        """Si hay más de maxsize archivos, borra los más antiguos (por mtime)."""
+        try:
+            entries = [e for e in os.scandir(self.directory) if not e.name.endswith(".tmp")]
+        except OSError:
+            return
+        if len(entries) <= self.maxsize:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.maxsize]:
+            self._remove(entry.path)
+            self._stats["evictions"] += 1
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self._remove(self._path(key))
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            self._remove(entry.path)
+
+    def stats(self) -> dict:
+        try:
+            size = sum(1 for e in os.scandir(self.directory) if not e.name.endswith(".tmp"))
+        except OSError:
+            size = 0
+        return {"backend": "filesystem", "size": size, **self._stats}
+
+
+class RedisCache:
+    def __init__(self, client, prefix: str, ttl: float = 30):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self._stats = Counter()
+
+    def _key(self, key) -> str:
+        return f"{self.prefix}:{key}"
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self._key(key))
+        except Exception:
+            self._stats["errors"] += 1
+            return None
+        if raw is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl: float | None = None):
+        try:
+            self.client.set(self._key(key), pickle.dumps(value), ex=max(1, int(ttl or self.ttl)))
+        except Exception:
+            self._stats["errors"] += 1
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        try:
+            self.client.delete(*(self._key(k) for k in keys))
+        except Exception:
+            self._stats["errors"] += 1
+
+    def clear(self):
+        try:
+            for key in self.client.scan_iter(f"{self.prefix}:*"):
+                self.client.delete(key)
+        except Exception:
+            self._stats["errors"] += 1
+
+    def stats(self) -> dict:
+        return {"backend": "redis", **self._stats}
+
+
+def make_cache(app, prefix: str, ttl: float, maxsize: int = 1024, backend: str | None = None):
+    """
+    backend: "memory" | "filesystem" | "redis". Sin indicar: Redis si hay
+    CACHE_REDIS_URL, si no memoria.
+    """
+    url = app.config.get("CACHE_REDIS_URL")
+    if backend == "filesystem":
+        directory = os.path.join(app.config.get("CACHE_DIR") or os.path.join(app.instance_path, "cache"), prefix)
+        return FileCache(directory, maxsize=maxsize, ttl=ttl)
+    if backend == "redis" and not url:
+        app.logger.warning("[cache] backend redis sin CACHE_REDIS_URL; usando caché local")
+    if url and backend in (None, "redis"):
+        try:
+            import redis
+        except ImportError:
+            app.logger.warning("[cache] CACHE_REDIS_URL definido pero falta el paquete redis; usando caché local")
+        else:
+            return RedisCache(redis.Redis.from_url(url), prefix=prefix, ttl=ttl)
+    return LocalCache(maxsize=maxsize, ttl=ttl)
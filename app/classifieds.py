@@ -1,8 +1,10 @@
 # app/classifieds.py
-from datetime import date, datetime
+from datetime import datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
 from .models import db, Classified, ServiceStatus
+from .page_cache import cached_page, tag_page
+from .public_classifieds import page_size, public_page
 from .utils import log_action
 
 classifieds_bp = Blueprint("classifieds", __name__, url_prefix="/clasificados")
@@ -10,21 +12,12 @@ classifieds_bp = Blueprint("classifieds", __name__, url_prefix="/clasificados")
 def _is_admin():
     return current_user.is_authenticated and current_user.role in ("admin", "superadmin")
 
-# Público: lista de clasificados activos, aprobados y vigentes
+# Público: clasificados publicados (app/public_classifieds.py), paginados por cursor
 @classifieds_bp.route("/", methods=["GET"])
+@cached_page("classifieds")
 def public_list():
-    today = date.today()
-    q = Classified.query.filter(
-        Classified.is_deleted == False,
-        Classified.is_active == True,
-        Classified.status == ServiceStatus.APPROVED.value,
-    ).filter(
-        (Classified.start_date == None) | (Classified.start_date <= today)
-    ).filter(
-        (Classified.end_date == None) | (Classified.end_date >= today)
-    ).order_by(Classified.start_date.desc().nullslast())
-    items = q.all()
-    return render_template("classifieds/public_list.html", items=items)
+    page = public_page(request.args.get("cursor"), page_size(request.args.get("per_page")))
+    return render_template("public/classifieds_cards.html", items=page.items, page=page)
 
 # Propios del usuario
 @classifieds_bp.route("/mine", methods=["GET"])
@@ -64,8 +57,10 @@ def create():
             try: c.end_date = datetime.strptime(end_date, fmt).date()
             except: pass
 
-        db.session.add(c); db.session.commit()
+        db.session.add(c)
+        db.session.flush()  # asigna id para la auditoría
         log_action(current_user, "create", "Classified", c.id, "")
+        db.session.commit()
         flash("Clasificado creado. Quedó pendiente de aprobación.", "success")
         return redirect(url_for("classifieds.mine"))
 
@@ -73,8 +68,10 @@ def create():
 
 # Detalle
 @classifieds_bp.route("/detail/<int:cid>")
+@cached_page("classified:{cid}")
 def detail(cid):
     c = Classified.query.get_or_404(cid)
+    tag_page(f"owner:{c.owner_id}")
     if not c.is_deleted and (c.is_active and c.status==ServiceStatus.APPROVED.value or (current_user.is_authenticated and (current_user.id==c.owner_id or _is_admin()))):
         return render_template("classifieds/detail.html", c=c)
     flash("Clasificado no disponible.", "warning")
@@ -38,7 +38,21 @@ class BaseConfig:
     _RAW_DB_URL = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(INSTANCE_DIR, 'app.db')}")
     SQLALCHEMY_DATABASE_URI = _normalize_sqlite_url(_RAW_DB_URL)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ENGINE_OPTIONS = {"pool_pre_ping": True}
+    # Opciones del engine: vacío = perfil por backend (app/engine.py) con los DB_* de abajo
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))             # conexiones por proceso
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))       # extra en picos (se cierran al devolverlas)
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))    # s esperando conexión libre -> error
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))    # s; por debajo del idle timeout del servidor
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_SLOW_WAIT_MS = int(os.getenv("DB_POOL_SLOW_WAIT_MS", "100"))  # cuenta como espera lenta
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # Postgres; 0 = sin límite
+    DB_LOCK_TIMEOUT_MS = int(os.getenv("DB_LOCK_TIMEOUT_MS", "0"))
+    DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
 
     # MAIL
     MAIL_ENABLED = os.getenv("MAIL_ENABLED", "false").lower() == "true"
@@ -49,6 +63,62 @@ class BaseConfig:
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
     SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
     SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "false").lower() == "true"
+    SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "20"))
+    MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+    MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "5"))
+    MAIL_RETRY_BASE = float(os.getenv("MAIL_RETRY_BASE", "30"))        # backoff: 30s, 60s, 120s... (máx 1h)
+    MAIL_CLAIM_TIMEOUT = int(os.getenv("MAIL_CLAIM_TIMEOUT", "600"))   # reclama 'sending' abandonados
+    MAIL_SMTP_IDLE = float(os.getenv("MAIL_SMTP_IDLE", "60"))          # cierra la conexión SMTP ociosa
+    MAIL_WORKER_INTERVAL = float(os.getenv("MAIL_WORKER_INTERVAL", "5"))
+
+    # Borrado definitivo de cuentas por tandas (app/deletions.py)
+    HARD_DELETE_CHUNK = int(os.getenv("HARD_DELETE_CHUNK", "500"))                 # filas por tanda/commit
+    HARD_DELETE_TIME_BUDGET = float(os.getenv("HARD_DELETE_TIME_BUDGET", "20"))    # s por pasada del worker
+    HARD_DELETE_CLAIM_TIMEOUT = int(os.getenv("HARD_DELETE_CLAIM_TIMEOUT", "300"))  # reclama 'running' abandonados
+    HARD_DELETE_MAX_ATTEMPTS = int(os.getenv("HARD_DELETE_MAX_ATTEMPTS", "5"))
+    HARD_DELETE_WORKER_INTERVAL = float(os.getenv("HARD_DELETE_WORKER_INTERVAL", "2"))
+
+    # Reconciliación de los KPIs del dashboard (app/kpis.py): tarea "kpis"
+    KPI_RECONCILE_INTERVAL = float(os.getenv("KPI_RECONCILE_INTERVAL", "3600"))  # edad máxima de los valores exactos
+    KPI_WORKER_INTERVAL = float(os.getenv("KPI_WORKER_INTERVAL", "300"))         # cada cuánto lo comprueba cada proceso
+
+    # Publicación/retirada de clasificados por fechas (app/visibility.py); solo compara el día
+    CLASSIFIED_VISIBILITY_INTERVAL = float(os.getenv("CLASSIFIED_VISIBILITY_INTERVAL", "60"))
+
+    # Retención de logs (app/retention.py, scripts/compact_logs.py)
+    LOGIN_LOG_RETENTION_DAYS = int(os.getenv("LOGIN_LOG_RETENTION_DAYS", "180"))
+    ACTIVITY_LOG_RETENTION_DAYS = int(os.getenv("ACTIVITY_LOG_RETENTION_DAYS", "365"))
+    LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", "")  # JSONL.gz; por defecto instance/archive
+    LOG_COMPACT_CHUNK = int(os.getenv("LOG_COMPACT_CHUNK", "5000"))
+    LOG_MAINTENANCE_INTERVAL = float(os.getenv("LOG_MAINTENANCE_INTERVAL", "600"))  # tarea "logs"; solo compara el día
+
+    # Exportaciones CSV/JSONL de admin (app/exports.py)
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))           # filas por fetch (yield_per)
+    EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))  # tamaño de cada trozo enviado
+
+    # Importación masiva de servicios/clasificados (app/imports.py)
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))             # filas por lote/commit
+    IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+
+    # Instrumentación (app/metrics.py): tiempos por request, consultas lentas, /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # Bearer para el scraper (además de admins logueados)
+    METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "true").lower() == "true"
+    SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", "200"))
+    SLOW_QUERY_TOP = int(os.getenv("SLOW_QUERY_TOP", "20"))
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+    # Perfilado de requests (app/profiler.py); desactivado no cuesta nada
+    PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+    PROFILER_MODE = os.getenv("PROFILER_MODE", "sample")                  # sample | cprofile
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))    # 0.001 = 1 de cada 1000
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_TOKEN_TTL = int(os.getenv("PROFILE_TOKEN_TTL", "3600"))       # validez del token X-Profile
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "")                            # por defecto instance/profiles
+    PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+    # Tareas en segundo plano dentro del proceso web ("" = usar scripts/run_workers.py)
+    BACKGROUND_WORKERS = os.getenv("BACKGROUND_WORKERS", "mail,deletions,visibility,logs,kpis")
 
     # VERIFICATION
     VERIFY_TOKEN_MAX_AGE = int(os.getenv("VERIFY_TOKEN_MAX_AGE", "86400"))  # 24h
@@ -62,16 +132,83 @@ class BaseConfig:
     PROXYFIX_X_PORT = int(os.getenv("PROXYFIX_X_PORT", "1"))
     PROXYFIX_X_PREFIX = int(os.getenv("PROXYFIX_X_PREFIX", "0"))
 
+    # Auditoría (ActivityLog): "transaction" = en el commit del llamador; "queue" = hilo por lotes tras el commit
+    AUDIT_MODE = os.getenv("AUDIT_MODE", "transaction")
+    AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+    AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+    AUDIT_PUT_TIMEOUT = float(os.getenv("AUDIT_PUT_TIMEOUT", "0.05"))
+
+    # Listados de admin (paginación por cursor)
+    ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
+    ADMIN_PAGE_SIZE_MAX = int(os.getenv("ADMIN_PAGE_SIZE_MAX", "500"))
+    MODERATION_BULK_MAX = int(os.getenv("MODERATION_BULK_MAX", "500"))  # ids por acción en bloque
+
+    # Cachés (CACHE_REDIS_URL opcional: compartida entre procesos, requiere `redis`)
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "")
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "2048"))
+    CACHE_DIR = os.getenv("CACHE_DIR", "")  # backend "filesystem" (por defecto instance/cache)
+
+    # Caché de páginas públicas para anónimos: memory | filesystem | redis | none
+    # (memory es por proceso: con varios workers usar filesystem o redis)
+    PAGE_CACHE_BACKEND = os.getenv("PAGE_CACHE_BACKEND", "memory")
+    PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "60"))
+    PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "1000"))
+
+    # Listado público de clasificados (app/public_classifieds.py); TTL 0 = sin caché
+    CLASSIFIEDS_PAGE_SIZE = int(os.getenv("CLASSIFIEDS_PAGE_SIZE", "48"))
+    CLASSIFIEDS_PAGE_SIZE_MAX = int(os.getenv("CLASSIFIEDS_PAGE_SIZE_MAX", "96"))
+    CLASSIFIEDS_CACHE_TTL = float(os.getenv("CLASSIFIEDS_CACHE_TTL", "60"))
+    CLASSIFIEDS_CACHE_SIZE = int(os.getenv("CLASSIFIEDS_CACHE_SIZE", "256"))
+
     # Avatares
     AVATAR_UPLOAD_DIR = AVATAR_UPLOAD_DIR
-    AVATAR_MAX_SIZE = 2 * 1024 * 1024  # 2MB
+    AVATAR_MAX_SIZE = int(os.getenv("AVATAR_MAX_SIZE", str(2 * 1024 * 1024)))  # 2MB
     AVATAR_ALLOWED_EXT = {"png", "jpg", "jpeg", "webp"}
 
+    # Subidas (ver app/uploads.py): límite del cuerpo por endpoint, el resto usa el global
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(1024 * 1024)))
+    IMPORT_MAX_SIZE = int(os.getenv("IMPORT_MAX_SIZE", str(50 * 1024 * 1024)))  # admin: importación CSV/JSONL
+    UPLOAD_LIMITS = {
+        "auth.profile": AVATAR_MAX_SIZE + 64 * 1024,  # + margen para los campos del form
+        "admin.import_listings_view": IMPORT_MAX_SIZE + 64 * 1024,
+    }
+    UPLOAD_SPOOL_SIZE = 256 * 1024  # por encima, las partes de archivo van a disco
+    UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR", "")
+
+    # Almacenamiento de subidas (ver app/storage.py): local | s3 | memory
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+    STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "")  # por defecto el padre de AVATAR_UPLOAD_DIR
+    S3_BUCKET = os.getenv("S3_BUCKET", "")
+    S3_PREFIX = os.getenv("S3_PREFIX", "")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # MinIO/R2/...; vacío = AWS
+    S3_REGION = os.getenv("S3_REGION", "")
+    S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    S3_PUBLIC_BASE_URL = os.getenv("S3_PUBLIC_BASE_URL", "")  # bucket/CDN público: sin firmar
+    S3_PRESIGN_TTL = int(os.getenv("S3_PRESIGN_TTL", "3600"))
+
+    # /media: nombres únicos -> caché inmutable; envío por el proxy opcional (ver app/media.py)
+    MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", str(365 * 24 * 3600)))
+    MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "")  # "" | x-accel | x-sendfile
+    MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/_media/avatars")
+
 class DevConfig(BaseConfig):
     DEBUG = True
 
 class ProdConfig(BaseConfig):
     DEBUG = False
+    # Pool: recicla en vez de hacer ping en cada checkout; límites a consultas colgadas
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "600"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    DB_LOCK_TIMEOUT_MS = int(os.getenv("DB_LOCK_TIMEOUT_MS", "5000"))
+    DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "web")
+    # Server-Timing revela el desglose a cualquiera: en producción, solo si se pide
+    METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "false").lower() == "true"
     SESSION_COOKIE_SECURE = True
     REMEMBER_COOKIE_SECURE = True
     SESSION_COOKIE_SAMESITE = "Lax"  # o "None" si usas cookies cross-site bajo HTTPS
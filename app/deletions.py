@@ -0,0 +1,195 @@
+# app/deletions.py
+"""
+Borrado definitivo de cuentas por tandas, fuera del request.
+
+admin.harddelete_user solo encola (enqueue_user_deletion): marca al usuario como
+eliminado (desaparece de listados y no puede entrar) y crea un UserDeletion. La
+tarea "deletions" (app/workers.py) lo procesa en pasos (STEPS), cada uno en tandas
+de HARD_DELETE_CHUNK filas con su propio commit: nunca hay un DELETE sin límite ni
+una transacción larga que bloquee tablas grandes. Cada tanda actualiza el progreso
+(UserDeletion.done / step), que se ve en /admin/deletions. Sus publicaciones siguen
+visibles hasta que el trabajo las borra (segundos con el worker en marcha): ocultarlas
+al encolar sería otro UPDATE sin límite.
+
+Integridad: las FKs hacia user tienen reglas ON DELETE (CASCADE para lo que es del
+usuario, SET NULL para approved_by/rejected_by). Aun así cada paso borra/desliga
+explícitamente, para que el DELETE final del usuario sea de una fila y funcione
+también en tablas creadas antes de las reglas (scripts/migrate_db.py las añade).
+
+Reanudable: los pasos son idempotentes (vuelven a buscar filas pendientes), así que
+un trabajo interrumpido (proceso caído, HARD_DELETE_TIME_BUDGET agotado) sigue
+donde estaba al reclamarlo de nuevo.
+"""
+import secrets
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update, delete, func, or_, and_
+from .kpis import apply_deltas, forget_listings
+from .models import db, User, Service, Classified, LoginLog, ActivityLog, UserDeletion
+from .page_cache import invalidate_on_commit
+from .user_cache import invalidate_users
+from .utils import log_action
+from .workers import register_task
+
+# Filas del usuario que se borran (paso, modelo, columna que apunta al usuario)
+_OWNED = (
+    ("services", Service, Service.owner_id),
+    ("classifieds", Classified, Classified.owner_id),
+    ("login_log", LoginLog, LoginLog.user_id),
+    ("activity_log", ActivityLog, ActivityLog.actor_id),
+)
+# Referencias en filas ajenas que se ponen a NULL
+_REFERENCES = (
+    Service.approved_by, Service.rejected_by,
+    Classified.approved_by, Classified.rejected_by,
+    UserDeletion.requested_by,
+)
+STEPS = tuple(name for name, _model, _col in _OWNED) + ("references", "user")
+ACTIVE = ("queued", "running")
+
+
+def enqueue_user_deletion(user: User, actor) -> UserDeletion:
+    """Encola el borrado de `user` (idempotente). NO hace commit."""
+    job = UserDeletion.query.filter(UserDeletion.user_id == user.id, UserDeletion.status.in_(ACTIVE)).first()
+    if job is not None:
+        return job
+    user.is_deleted = True
+    total = sum(
+        db.session.execute(select(func.count()).select_from(model).where(col == user.id)).scalar()
+        for _name, model, col in _OWNED
+    )
+    job = UserDeletion(user_id=user.id, user_email=user.email, requested_by=actor.id, total=total + 1)
+    db.session.add(job)
+    log_action(actor, "hard_delete_requested", "User", user.id, "")
+    invalidate_on_commit("classifieds", f"owner:{user.id}")
+    return job
+
+
+# -------------------------
+# Worker
+# -------------------------
+
+def _claim(now: datetime):
+    """Reclama un trabajo (queued, o running abandonado) con un token propio."""
+    token = secrets.token_hex(8)
+    stale = now - timedelta(seconds=int(current_app.config.get("HARD_DELETE_CLAIM_TIMEOUT", 300)))
+    claimable = or_(
+        UserDeletion.status == "queued",
+        and_(UserDeletion.status == "running", UserDeletion.claimed_at < stale),
+    )
+    ready = select(UserDeletion.id).where(claimable).order_by(UserDeletion.id).limit(1)
+    if db.engine.dialect.name == "postgresql":
+        ready = ready.with_for_update(skip_locked=True)
+    job_id = db.session.execute(ready).scalar()
+    if job_id is None:
+        db.session.rollback()
+        return None
+    res = db.session.execute(
+        update(UserDeletion)
+        .where(UserDeletion.id == job_id, claimable)
+        .values(status="running", claimed_by=token, claimed_at=now, attempts=UserDeletion.attempts + 1)
+    )
+    db.session.commit()
+    if res.rowcount != 1:
+        return None  # otro worker se adelantó
+    return db.session.get(UserDeletion, job_id)
+
+
+def _chunk_ids(model, criterion, size: int) -> list[int]:
+    return db.session.execute(select(model.id).where(criterion).limit(size)).scalars().all()
+
+
+def _step(job: UserDeletion, name: str, size: int) -> int:
+    """Procesa una tanda del paso `name`. Devuelve las filas tocadas (0 = paso terminado)."""
+    uid = job.user_id
+    for step, model, col in _OWNED:
+        if step != name:
+            continue
+        ids = _chunk_ids(model, col == uid, size)
+        if ids and model in (Service, Classified):
+            # DELETE masivo: los listeners de KPIs no lo ven
+            forget_listings(model, model.id.in_(ids))
+        if ids:
+            db.session.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+        return len(ids)
+
+    if name == "references":
+        for col in _REFERENCES:
+            model = col.class_
+            ids = _chunk_ids(model, col == uid, size)
+            if ids:
+                db.session.execute(
+                    update(model).where(model.id.in_(ids)).values({col.key: None})
+                    .execution_options(synchronize_session=False)
+                )
+                return len(ids)
+        return 0
+
+    # "user": la fila del usuario (ya sin dependientes)
+    was_active = db.session.execute(select(User.is_deleted == False).where(User.id == uid)).scalar()
+    if was_active is None:
+        return 0
+    if was_active:
+        apply_deltas({"total_users": -1})
+    db.session.execute(delete(User).where(User.id == uid).execution_options(synchronize_session=False))
+    return 1
+
+
+def _finish(job: UserDeletion, now: datetime):
+    job.status = "done"
+    job.step = None
+    job.finished_at = now
+    job.claimed_by = None
+    requester = db.session.get(User, job.requested_by) if job.requested_by else None
+    log_action(requester, "hard_delete", "User", job.user_id, f"{job.done} filas")
+    invalidate_on_commit("classifieds", f"owner:{job.user_id}")
+    db.session.commit()
+    invalidate_users(job.user_id)
+
+
+def process_deletions() -> dict:
+    """Avanza un trabajo de borrado durante como mucho HARD_DELETE_TIME_BUDGET segundos."""
+    cfg = current_app.config
+    size = int(cfg.get("HARD_DELETE_CHUNK", 500))
+    budget = float(cfg.get("HARD_DELETE_TIME_BUDGET", 20))
+    max_attempts = int(cfg.get("HARD_DELETE_MAX_ATTEMPTS", 5))
+
+    job = _claim(datetime.utcnow())
+    if job is None:
+        return {"job": None}
+    job_id = job.id
+    deadline = time.monotonic() + budget
+    try:
+        for name in STEPS[STEPS.index(job.step) if job.step in STEPS else 0:]:
+            while True:
+                touched = _step(job, name, size)
+                job.step = name
+                job.done = (job.done or 0) + touched
+                job.claimed_at = datetime.utcnow()  # latido: no se considera abandonado
+                db.session.commit()
+                if not touched or name == "user":
+                    break
+                if time.monotonic() >= deadline:
+                    # Tiempo agotado: se libera para la siguiente pasada (de este u otro worker)
+                    job.status, job.claimed_by, job.attempts = "queued", None, 0
+                    db.session.commit()
+                    return {"job": job_id, "status": "queued", "done": job.done}
+        _finish(job, datetime.utcnow())
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(UserDeletion, job_id)
+        job.status = "failed" if job.attempts >= max_attempts else "queued"
+        job.claimed_by = None
+        job.last_error = str(e)[:500]
+        db.session.commit()
+        current_app.logger.exception("[deletions] trabajo %s falló (intento %s)", job_id, job.attempts)
+    return {"job": job_id, "status": job.status, "done": job.done}
+
+
+def deletion_stats() -> dict:
+    rows = db.session.execute(select(UserDeletion.status, func.count()).group_by(UserDeletion.status)).all()
+    return {status: n for status, n in rows}
+
+
+register_task("deletions", process_deletions, "HARD_DELETE_WORKER_INTERVAL", 2)
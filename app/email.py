@@ -1,43 +1,229 @@
 # app/email.py
+"""
+Correo saliente con cola persistente (tabla outbound_email).
+
+El request solo encola (`_send_email` añade la fila a la transacción del llamador);
+la tarea "mail" (app/workers.py) la drena por lotes reutilizando una conexión SMTP
+de larga duración, con reintentos y backoff exponencial.
+
+Pruebas en local con un SMTP de mentira:
+    python -m aiosmtpd -n -l localhost:1025      # SMTP_HOST=localhost SMTP_PORT=1025
+"""
+import secrets
 import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
 from email.message import EmailMessage
 from flask import current_app
+from sqlalchemy import func, select, update, or_, and_
+from .models import db, OutboundEmail
+from .workers import register_task
+
+# -------------------------
+# Encolado (request)
+# -------------------------
 
 def _send_email(subject: str, to_email: str, html: str, plain: str | None = None):
+    """Encola el correo en la transacción actual (se envía tras el commit del llamador)."""
     cfg = current_app.config
     if not cfg.get("MAIL_ENABLED"):
         current_app.logger.warning("[MAIL_DISABLED] To:%s Subject:%s", to_email, subject)
         return
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = cfg.get("MAIL_FROM")
-    msg["To"] = to_email
-    msg.set_content(plain or "Verifica tu correo.")
-    msg.add_alternative(html, subtype="html")
-
-    host = cfg.get("SMTP_HOST")
-    port = int(cfg.get("SMTP_PORT", 587))
-    user = cfg.get("SMTP_USER")
-    password = cfg.get("SMTP_PASSWORD")
-    use_ssl = cfg.get("SMTP_USE_SSL", False)
-    use_tls = cfg.get("SMTP_USE_TLS", True)
-
-    if use_ssl:
-        server = smtplib.SMTP_SSL(host, port, timeout=20)
-    else:
-        server = smtplib.SMTP(host, port, timeout=20)
-
-    try:
+    db.session.add(OutboundEmail(
+        to_email=to_email,
+        subject=subject,
+        html=html,
+        plain=plain or "Verifica tu correo.",
+        status="queued",
+        next_attempt_at=datetime.utcnow(),
+    ))
+
+# -------------------------
+# Conexión SMTP reutilizable (worker)
+# -------------------------
+
+class SMTPConnection:
+    """Una conexión SMTP viva por hilo worker: se verifica con NOOP y se reabre si cae."""
+
+    def __init__(self):
+        self.server = None
+        self.last_used = 0.0
+
+    def _open(self, cfg):
+        host = cfg.get("SMTP_HOST")
+        port = int(cfg.get("SMTP_PORT", 587))
+        timeout = float(cfg.get("SMTP_TIMEOUT", 20))
+        use_ssl = cfg.get("SMTP_USE_SSL", False)
+        use_tls = cfg.get("SMTP_USE_TLS", True)
+        if use_ssl:
+            server = smtplib.SMTP_SSL(host, port, timeout=timeout)
+        else:
+            server = smtplib.SMTP(host, port, timeout=timeout)
         server.ehlo()
         if use_tls and not use_ssl:
             server.starttls()
             server.ehlo()
-        if user:
-            server.login(user, password)
-        server.send_message(msg)
-    finally:
-        server.quit()
+        if cfg.get("SMTP_USER"):
+            server.login(cfg.get("SMTP_USER"), cfg.get("SMTP_PASSWORD"))
+        return server
+
+    def get(self, cfg):
+        if self.server is not None:
+            try:
+                if self.server.noop()[0] == 250:
+                    return self.server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self.close()
+        self.server = self._open(cfg)
+        return self.server
+
+    def send(self, cfg, msg: EmailMessage):
+        self.get(cfg).send_message(msg)
+        self.last_used = time.monotonic()
+
+    def close_if_idle(self, idle_seconds: float):
+        if self.server is not None and time.monotonic() - self.last_used > idle_seconds:
+            self.close()
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self.server = None
+
+
+_local = threading.local()
+
+
+def _smtp() -> SMTPConnection:
+    """La conexión del hilo actual (smtplib.SMTP no se comparte entre hilos)."""
+    conn = getattr(_local, "smtp", None)
+    if conn is None:
+        conn = _local.smtp = SMTPConnection()
+    return conn
+
+# -------------------------
+# Drenado de la cola (worker)
+# -------------------------
+
+def _build_message(cfg, row: OutboundEmail) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = row.subject
+    msg["From"] = cfg.get("MAIL_FROM")
+    msg["To"] = row.to_email
+    msg.set_content(row.plain or "")
+    if row.html:
+        msg.add_alternative(row.html, subtype="html")
+    return msg
+
+
+def _claim(batch_size: int, now: datetime) -> list[OutboundEmail]:
+    """
+    Reclama hasta `batch_size` correos listos con un token propio (seguro con varios
+    workers). Los 'sending' abandonados (worker caído) se reclaman tras MAIL_CLAIM_TIMEOUT
+    mientras les queden intentos; si no, pasan a 'failed' (una fila que tumba el
+    worker no se reintenta para siempre).
+    """
+    token = secrets.token_hex(8)
+    cfg = current_app.config
+    stale = now - timedelta(seconds=int(cfg.get("MAIL_CLAIM_TIMEOUT", 600)))
+    max_attempts = int(cfg.get("MAIL_MAX_ATTEMPTS", 5))
+    abandoned = and_(OutboundEmail.status == "sending", OutboundEmail.claimed_at < stale)
+    exhausted = db.session.execute(
+        select(OutboundEmail.id).where(abandoned, OutboundEmail.attempts >= max_attempts).limit(batch_size)
+    ).scalars().all()
+    if exhausted:
+        db.session.execute(
+            update(OutboundEmail)
+            .where(OutboundEmail.id.in_(exhausted), abandoned)
+            .values(status="failed", claimed_by=None, last_error="abandonado en 'sending' sin más intentos")
+        )
+        db.session.commit()
+        current_app.logger.error("[mail] %s correos abandonados sin más intentos: failed", len(exhausted))
+    claimable = or_(
+        and_(OutboundEmail.status == "queued", OutboundEmail.next_attempt_at <= now),
+        and_(abandoned, OutboundEmail.attempts < max_attempts),
+    )
+    ready = select(OutboundEmail.id).where(claimable).order_by(OutboundEmail.id).limit(batch_size)
+    if db.engine.dialect.name == "postgresql":
+        ready = ready.with_for_update(skip_locked=True)
+    ids = db.session.execute(ready).scalars().all()
+    if not ids:
+        db.session.rollback()
+        return []
+    # El WHERE repite la condición: si otro worker se adelantó, su fila no se toca
+    db.session.execute(
+        update(OutboundEmail)
+        .where(OutboundEmail.id.in_(ids), claimable)
+        .values(status="sending", claimed_by=token, claimed_at=now, attempts=OutboundEmail.attempts + 1)
+    )
+    db.session.commit()
+    return OutboundEmail.query.filter_by(claimed_by=token, status="sending").order_by(OutboundEmail.id).all()
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    base = float(current_app.config.get("MAIL_RETRY_BASE", 30))
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), 3600))
+
+
+def drain_outbox(batch_size: int | None = None) -> dict:
+    """Envía un lote de la cola. Devuelve {'sent': n, 'retry': n, 'failed': n}."""
+    cfg = current_app.config
+    batch_size = batch_size or int(cfg.get("MAIL_BATCH_SIZE", 50))
+    max_attempts = int(cfg.get("MAIL_MAX_ATTEMPTS", 5))
+    result = {"sent": 0, "retry": 0, "failed": 0}
+
+    now = datetime.utcnow()
+    smtp = _smtp()
+    rows = _claim(batch_size, now)
+    for row in rows:
+        try:
+            smtp.send(cfg, _build_message(cfg, row))
+            row.status = "sent"
+            row.sent_at = datetime.utcnow()
+            row.last_error = None
+            result["sent"] += 1
+        except Exception as e:  # SMTP/red, pero también cabeceras o destinatarios inválidos
+            smtp.close()
+            row.last_error = str(e)[:500]
+            if row.attempts >= max_attempts:
+                row.status = "failed"
+                result["failed"] += 1
+                current_app.logger.error("[mail] descartado tras %s intentos To:%s (%s)", row.attempts, row.to_email, e)
+            else:
+                row.status = "queued"
+                row.next_attempt_at = datetime.utcnow() + _retry_delay(row.attempts)
+                result["retry"] += 1
+        row.claimed_by = None
+        db.session.commit()
+
+    smtp.close_if_idle(float(cfg.get("MAIL_SMTP_IDLE", 60)))
+    return result
+
+
+def outbox_stats() -> dict:
+    """Conteo por estado de la cola (queued/sending/sent/failed)."""
+    rows = db.session.execute(
+        select(OutboundEmail.status, func.count()).group_by(OutboundEmail.status)
+    ).all()
+    stats = {"queued": 0, "sending": 0, "sent": 0, "failed": 0}
+    stats.update({status: n for status, n in rows})
+    return stats
+
+
+register_task("mail", drain_outbox, "MAIL_WORKER_INTERVAL", 5)
+
+# -------------------------
+# Plantillas
+# -------------------------
 
 def send_verification_email(to_email: str, verify_link: str, code: str | None = None):
     """Envía un correo con link de verificación (y opcionalmente muestra el código)."""
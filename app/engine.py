@@ -0,0 +1,243 @@
+# app/engine.py
+"""
+Perfiles del engine de SQLAlchemy por backend y métricas del pool.
+
+- Postgres: QueuePool con DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT, reciclado
+  de conexiones (DB_POOL_RECYCLE, por debajo del idle timeout del servidor/proxy) y
+  statement_timeout / lock_timeout por conexión (opciones de arranque de libpq; con
+  PgBouncer en modo transaction, que no las admite, poner DB_STATEMENT_TIMEOUT_MS=0 y
+  fijarlos en el rol: ALTER ROLE ... SET statement_timeout). pool_pre_ping (un
+  SELECT 1 extra en cada checkout) solo si DB_POOL_PRE_PING: con el reciclado casi
+  nunca hace falta y una conexión caída igualmente se descarta al fallar.
+- SQLite: PRAGMAs en cada conexión (evento "connect"): foreign_keys=ON, WAL (lectores
+  y un escritor a la vez), synchronous=NORMAL (seguro con WAL) y busy_timeout, para
+  que varios workers de gunicorn esperen el lock en vez de fallar con
+  "database is locked".
+- Métricas: pool_stats() da conexiones en uso, overflow, checkouts, timeouts y el
+  tiempo de espera para obtener una conexión (medio / máximo). Son por proceso: cada
+  worker tiene su pool. Se ven en /admin/db (del worker que atiende la petición);
+  scripts/run_workers.py --status muestra el perfil y los PRAGMAs efectivos.
+
+Si la configuración ya trae SQLALCHEMY_ENGINE_OPTIONS, se respeta tal cual.
+Los scripts de mantenimiento llaman a maintenance_mode() antes de create_app().
+"""
+import logging
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+
+# -------------------------
+# Métricas del pool
+# -------------------------
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.slow_waits = 0
+
+    def observe_wait(self, seconds: float, slow: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if seconds >= slow:
+                self.slow_waits += 1
+
+    def count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "slow_waits": self.slow_waits,
+                "wait_ms_avg": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mide cuánto tarda cada checkout (espera de hueco + conexión nueva)."""
+
+    slow_wait = 0.1  # s; engine_options lo ajusta con DB_POOL_SLOW_WAIT_MS
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeout:
+            pool_metrics.count("timeouts")
+            raise
+        pool_metrics.observe_wait(time.perf_counter() - t0, self.slow_wait)
+        return conn
+
+
+# SQLAlchemy nombra el logger del pool por su módulo: "app.engine.TimedQueuePool" cuelga
+# del logger "app" de Flask (DEBUG en desarrollo) y registraría cada checkout
+logging.getLogger(f"{__name__}.{TimedQueuePool.__name__}").setLevel(logging.WARNING)
+
+
+# -------------------------
+# Perfiles
+# -------------------------
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and (not url.database or url.database == ":memory:")
+
+
+def engine_options(config) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS según el backend de SQLALCHEMY_DATABASE_URI."""
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    backend = url.get_backend_name()
+    TimedQueuePool.slow_wait = int(config.get("DB_POOL_SLOW_WAIT_MS", 100)) / 1000
+
+    if backend == "sqlite":
+        if _is_memory_sqlite(url):
+            return {}  # SingletonThreadPool por defecto: una BD por conexión
+        # El lock de escritura lo gestiona busy_timeout; el pool solo evita reabrir el archivo
+        return {
+            "poolclass": TimedQueuePool,
+            "pool_size": int(config.get("DB_POOL_SIZE", 5)),
+            "max_overflow": int(config.get("DB_MAX_OVERFLOW", 10)),
+            "pool_timeout": float(config.get("DB_POOL_TIMEOUT", 10)),
+        }
+
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": int(config.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(config.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(config.get("DB_POOL_TIMEOUT", 10)),
+        "pool_recycle": int(config.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": bool(config.get("DB_POOL_PRE_PING", False)),
+        "pool_use_lifo": True,  # reutiliza las conexiones calientes; las sobrantes caducan
+    }
+    if backend == "postgresql":
+        pg_options = []
+        statement_ms = _timeout_ms(config, "DB_STATEMENT_TIMEOUT_MS")
+        lock_ms = _timeout_ms(config, "DB_LOCK_TIMEOUT_MS")
+        if statement_ms:
+            pg_options.append(f"-c statement_timeout={statement_ms}")
+        if lock_ms:
+            pg_options.append(f"-c lock_timeout={lock_ms}")
+        connect_args = {"connect_timeout": int(config.get("DB_CONNECT_TIMEOUT", 10))}
+        if pg_options:
+            connect_args["options"] = " ".join(pg_options)
+        if config.get("DB_APPLICATION_NAME"):
+            connect_args["application_name"] = config["DB_APPLICATION_NAME"]
+        options["connect_args"] = connect_args
+    return options
+
+
+def _sqlite_pragmas(config):
+    busy_ms = int(config.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    journal = config.get("SQLITE_JOURNAL_MODE", "WAL")
+    synchronous = config.get("SQLITE_SYNCHRONOUS", "NORMAL")
+
+    def on_connect(dbapi_conn, conn_record):
+        cursor = dbapi_conn.cursor()
+        # SQLite no aplica FKs (ni ON DELETE) salvo que se active en cada conexión
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={busy_ms}")
+        if journal:
+            cursor.execute(f"PRAGMA journal_mode={journal}")
+        if synchronous:
+            cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.close()
+
+    return on_connect
+
+
+def _count(name):
+    def listener(*_args):
+        pool_metrics.count(name)
+    return listener
+
+
+def init_engine(app, engine):
+    """Engancha PRAGMAs (SQLite) y contadores del pool al engine ya creado."""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _sqlite_pragmas(app.config))
+    event.listen(engine, "connect", _count("connects"))
+    event.listen(engine, "invalidate", _count("invalidations"))
+
+
+def pool_stats() -> dict:
+    """Estado del pool de este proceso + contadores acumulados."""
+    from . import db
+    pool = db.engine.pool
+    stats = {"pool": type(pool).__name__, "backend": db.engine.dialect.name}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    stats.update(pool_metrics.snapshot())
+    return stats
+
+
+def pragma_values() -> dict:
+    """PRAGMAs efectivos de una conexión SQLite (diagnóstico)."""
+    from . import db
+    if db.engine.dialect.name != "sqlite":
+        return {}
+    with db.engine.connect() as conn:
+        return {
+            name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "foreign_keys")
+        }
+
+
+# -------------------------
+# Scripts de mantenimiento
+# -------------------------
+
+_maintenance = False
+
+
+def maintenance_mode():
+    """
+    Para scripts de mantenimiento (scripts/migrate_db.py, init_db, partition_logs,
+    compact_logs, reconcile_kpis), antes de create_app(): las conexiones se abren sin
+    el statement_timeout / lock_timeout de la config (ProdConfig: 30 s / 5 s), pensados
+    para requests. Índices, copias, UPDATE masivos o COUNT(*) de tablas grandes los
+    superan y se cancelarían a mitad. Un valor fijado en el entorno se respeta.
+    """
+    global _maintenance
+    _maintenance = True
+
+
+def _timeout_ms(config, key: str) -> int:
+    if _maintenance and key not in os.environ:
+        return 0
+    return int(config.get(key, 0))
+
+
+def configured_options(app) -> dict:
+    """Opciones a pasar a Flask-SQLAlchemy: las explícitas de la config o el perfil."""
+    explicit = app.config.get("SQLALCHEMY_ENGINE_OPTIONS")
+    return explicit if explicit else engine_options(app.config)
+
@@ -0,0 +1,98 @@
+# app/images.py
+"""
+Procesado de avatares al subirlos.
+
+De cada imagen se generan variantes cuadradas de tamaño fijo (AVATAR_SIZES) en
+WebP y JPEG: se decodifica, se orienta según EXIF, se recorta al centro y se
+guarda SIN metadatos. El original no se conserva.
+
+Las variantes se generan en memoria (son pequeñas) y el llamador las guarda en el
+almacenamiento (app/storage.py) como avatars/<base>_<px>.<webp|jpg>. `User.avatar_url` apunta a la variante
+JPEG más grande; `avatar_src` / `avatar_srcset` derivan de ella la URL del tamaño
+pedido. Las URLs antiguas (sin variantes) se devuelven tal cual hasta que se
+ejecute scripts/backfill_avatars.py.
+"""
+import io
+import re
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+AVATAR_SIZES = (24, 120, 512)
+FORMATS = {"webp": ("WEBP", "image/webp", dict(quality=80, method=4)),
+           "jpg": ("JPEG", "image/jpeg", dict(quality=85, optimize=True, progressive=True))}
+
+_VARIANT_RE = re.compile(r"_(\d+)\.(?:jpg|webp)$")
+
+
+class ImageError(ValueError):
+    """La subida no es una imagen válida (o es demasiado grande para decodificar)."""
+
+
+def _load(source, max_pixels: int) -> Image.Image:
+    try:
+        img = Image.open(source)
+        if img.width * img.height > max_pixels:
+            raise ImageError(f"imagen demasiado grande ({img.width}x{img.height})")
+        img.seek(0)  # GIF animado: primer cuadro
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImageError(str(e)) from e
+    return img
+
+
+def _flatten(img: Image.Image, fmt: str) -> Image.Image:
+    """RGB para JPEG (transparencia sobre blanco); WebP conserva el canal alfa."""
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    if fmt == "webp":
+        return img.convert("RGBA" if has_alpha else "RGB")
+    if has_alpha:
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def render_avatar_variants(source, base_name: str, max_pixels: int = 40_000_000) -> list[tuple]:
+    """
+    Devuelve [(nombre, BytesIO, content_type)] con <base_name>_<px>.<ext> para cada
+    tamaño y formato. Decodifica todo antes de devolver: si la imagen no sirve se
+    lanza ImageError y no se ha guardado nada.
+    """
+    img = _load(source, max_pixels)
+    variants = []
+    for px in AVATAR_SIZES:
+        square = ImageOps.fit(img, (px, px), method=Image.Resampling.LANCZOS)
+        for ext, (pil_format, content_type, options) in FORMATS.items():
+            buf = io.BytesIO()
+            # Sin exif=...: el archivo resultante no lleva metadatos
+            _flatten(square, ext).save(buf, pil_format, **options)
+            buf.seek(0)
+            variants.append((f"{base_name}_{px}.{ext}", buf, content_type))
+    return variants
+
+
+# -------------------------
+# Helpers de plantilla
+# -------------------------
+
+def _pick(px: int) -> int:
+    """Menor variante >= px (o la mayor)."""
+    return next((s for s in AVATAR_SIZES if s >= px), AVATAR_SIZES[-1])
+
+
+def avatar_src(url: str | None, px: int, fmt: str = "jpg") -> str | None:
+    if not url or not _VARIANT_RE.search(url):
+        return url
+    return _VARIANT_RE.sub(f"_{_pick(px)}.{fmt}", url)
+
+
+def avatar_srcset(url: str | None, px: int, fmt: str = "jpg") -> str:
+    """srcset 1x/2x para mostrar el avatar a `px` píxeles CSS."""
+    if not url or not _VARIANT_RE.search(url):
+        return url or ""
+    return f"{avatar_src(url, px, fmt)} 1x, {avatar_src(url, px * 2, fmt)} 2x"
+
+
+def has_variants(url: str | None) -> bool:
+    return bool(url and _VARIANT_RE.search(url))
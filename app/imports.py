@@ -0,0 +1,256 @@
+# app/imports.py
+"""
+Importación masiva de servicios y clasificados desde CSV / JSONL.
+
+Columnas (cabecera CSV o claves JSON): `owner_email` (obligatoria, el propietario
+debe existir) + los campos de IMPORT_FIELDS. Fechas en AAAA-MM-DD.
+
+El archivo se lee en streaming y se procesa por lotes de IMPORT_BATCH_SIZE filas:
+  1. valida cada fila (obligatorios, longitudes, fechas);
+  2. resuelve los propietarios del lote con una sola consulta por email (los ya
+     vistos quedan en memoria);
+  3. descarta duplicados, dentro del archivo y contra la BD: mismo título
+     (normalizado) y propietario, o —servicios— mismo email de contacto;
+  4. inserta el lote con un INSERT por lotes (executemany) rellenando title_norm /
+     search_norm (el listener before_insert no corre con inserts Core) y suma los
+     KPIs a mano; commit por lote.
+Todo entra como PENDING / inactivo: pasa por moderación (admin o /admin/*/bulk),
+por eso no hay páginas cacheadas que invalidar. Al final, una sola línea de
+auditoría con el resumen.
+
+dry_run hace todo salvo insertar. Si la lectura falla a mitad (CSV mal formado,
+bytes que no son UTF-8), los lotes ya confirmados quedan y la línea de auditoría
+se escribe igual, marcada como interrumpida; reimportar el mismo archivo los salta
+como duplicados.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, insert
+from .kpis import apply_deltas, listing_deltas
+from .models import db, User, Service, Classified, ServiceStatus
+from .normalize import fold
+from .utils import log_action
+
+FORMATS = ("csv", "jsonl")
+MODELS = {"services": Service, "classifieds": Classified}
+IMPORT_FIELDS = {
+    Service: ("title", "description", "website", "social", "address",
+              "contact_name", "contact_email", "contact_phone"),
+    Classified: ("title", "description", "start_date", "end_date"),
+}
+_DATE_FIELDS = ("start_date", "end_date")
+
+
+class ImportFileError(ValueError):
+    """Archivo ilegible (formato, cabecera). Los errores por fila van al informe."""
+
+
+# -------------------------
+# Lectura
+# -------------------------
+
+def read_rows(stream, fmt: str):
+    """Itera (línea, dict) de un archivo binario CSV (UTF-8, con o sin BOM) o JSONL."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        done = 0  # última línea de un registro leído entero
+        try:
+            if not reader.fieldnames or "title" not in reader.fieldnames:
+                raise ImportFileError("El CSV necesita cabecera con al menos title y owner_email.")
+            done = reader.line_num
+            for row in reader:
+                yield reader.line_num, row
+                done = reader.line_num
+        except csv.Error as e:  # p.ej. comillas sin cerrar: el campo crece hasta field_size_limit
+            raise ImportFileError(f"CSV no válido a partir de la línea {done + 1}: {e}") from e
+        return
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_no, (row if isinstance(row, dict) else None)
+
+
+def _batches(rows, size: int):
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# -------------------------
+# Validación
+# -------------------------
+
+def _clean(model, raw) -> dict:
+    """Fila del archivo -> columnas del modelo. ValueError con el motivo si no vale."""
+    if raw is None:
+        raise ValueError("línea JSON no válida")
+    values = {}
+    for name in IMPORT_FIELDS[model]:
+        value = raw.get(name)
+        value = "" if value is None else str(value).strip()
+        if name in _DATE_FIELDS:
+            if value:
+                try:
+                    value = datetime.strptime(value, "%Y-%m-%d").date()
+                except ValueError:
+                    raise ValueError(f"{name}: fecha no válida (AAAA-MM-DD)")
+            else:
+                value = None
+        else:
+            limit = getattr(model.__table__.c[name].type, "length", None)
+            if limit and len(value) > limit:
+                raise ValueError(f"{name}: más de {limit} caracteres")
+        values[name] = value
+    if not values["title"]:
+        raise ValueError("title: obligatorio")
+    if values.get("contact_email"):
+        values["contact_email"] = values["contact_email"].lower()
+        if "@" not in values["contact_email"]:
+            raise ValueError("contact_email: no válido")
+    if values.get("start_date") and values.get("end_date") and values["end_date"] < values["start_date"]:
+        raise ValueError("end_date anterior a start_date")
+    owner_email = str(raw.get("owner_email") or "").strip().lower()
+    if not owner_email:
+        raise ValueError("owner_email: obligatorio")
+    values["owner_email"] = owner_email
+    return values
+
+
+def _resolve_owners(emails, owners: dict):
+    """Completa `owners` {email: id | None} con una consulta para los emails nuevos."""
+    missing = [e for e in emails if e not in owners]
+    if not missing:
+        return
+    # Los emails se guardan en minúsculas (auth/admin): usa el índice único de email
+    found = dict(db.session.execute(
+        select(User.email, User.id).where(User.email.in_(missing), User.is_deleted == False)
+    ).all())
+    for email in missing:
+        owners[email] = found.get(email)
+
+
+def _existing(model, rows) -> tuple[set, set]:
+    """
+    Claves (title_norm, owner_id) y emails de contacto del lote que ya están en la BD.
+    Se filtra solo por la columna selectiva (title_norm / contact_email, con índice) y
+    el resto en Python: con owner_id o is_deleted en el WHERE, SQLite sin ANALYZE
+    elige ix_service_owner / ix_*_admin_list y recorre miles de filas por lote.
+    """
+    keys = {(r["title_norm"], r["owner_id"]) for r in rows}
+    taken = {
+        (title_norm, owner_id)
+        for title_norm, owner_id, deleted in db.session.execute(
+            select(model.title_norm, model.owner_id, model.is_deleted)
+            .where(model.title_norm.in_({k[0] for k in keys}))
+        )
+        if not deleted and (title_norm, owner_id) in keys
+    }
+    emails = set()
+    if model is Service:
+        wanted = {r["contact_email"] for r in rows if r["contact_email"]}
+        if wanted:
+            emails = {
+                email for email, deleted in db.session.execute(
+                    select(Service.contact_email, Service.is_deleted).where(Service.contact_email.in_(wanted))
+                )
+                if not deleted
+            }
+    return taken, emails
+
+
+# -------------------------
+# Importación
+# -------------------------
+
+def import_listings(model, rows, actor=None, dry_run: bool = False, source: str = "") -> dict:
+    """
+    Importa `rows` (iterable de (línea, dict), ver read_rows). Devuelve el informe:
+    {"created", "duplicates", "errors", "total", "dry_run", "error_rows": [{line, error, title}]}.
+    """
+    cfg = current_app.config
+    size = int(cfg.get("IMPORT_BATCH_SIZE", 1000))
+    max_report = int(cfg.get("IMPORT_MAX_REPORTED_ERRORS", 1000))
+    entity = model.__name__
+    report = {"created": 0, "duplicates": 0, "errors": 0, "total": 0, "dry_run": dry_run, "error_rows": []}
+    owners, seen_keys, seen_emails = {}, set(), set()
+
+    def fail(line, title, error):
+        report["errors"] += 1
+        if len(report["error_rows"]) < max_report:
+            report["error_rows"].append({"line": line, "error": error, "title": (title or "")[:200]})
+
+    committed = completed = False
+    try:
+        for batch in _batches(rows, size):
+            report["total"] += len(batch)
+            cleaned = []
+            for line, raw in batch:
+                try:
+                    cleaned.append((line, _clean(model, raw)))
+                except ValueError as e:
+                    fail(line, (raw or {}).get("title"), str(e))
+            _resolve_owners({values["owner_email"] for _line, values in cleaned}, owners)
+
+            now = datetime.utcnow()
+            candidates = []
+            for line, values in cleaned:
+                owner_id = owners.get(values.pop("owner_email"))
+                if owner_id is None:
+                    fail(line, values["title"], "owner_email: usuario no encontrado")
+                    continue
+                values.update(
+                    owner_id=owner_id,
+                    title_norm=fold(values["title"]),
+                    search_norm=fold(f"{values['title']} {values['description']}"),
+                    status=ServiceStatus.PENDING.value, is_active=False, is_deleted=False, created_at=now,
+                )
+                candidates.append((line, values))
+
+            taken, taken_emails = _existing(model, [values for _line, values in candidates]) if candidates else (set(), set())
+            fresh = []
+            for line, values in candidates:
+                key = (values["title_norm"], values["owner_id"])
+                email = values.get("contact_email")
+                if key in taken or key in seen_keys or (email and (email in taken_emails or email in seen_emails)):
+                    report["duplicates"] += 1
+                    continue
+                seen_keys.add(key)
+                if email:
+                    seen_emails.add(email)
+                fresh.append(values)
+
+            if fresh and not dry_run:
+                db.session.execute(insert(model), fresh)
+                # INSERT Core: el listener de KPIs no lo ve
+                apply_deltas(listing_deltas(model, [(None, (ServiceStatus.PENDING.value, False, False))] * len(fresh)))
+                db.session.commit()
+                committed = True
+            report["created"] += len(fresh)
+        completed = True
+    finally:
+        report["error_rows"].sort(key=lambda e: e["line"])
+        # También si la lectura falla a mitad: los lotes confirmados quedan y se auditan
+        if not dry_run and (completed or committed):
+            if not completed:
+                db.session.rollback()
+            log_action(actor, "import", entity, None, (
+                f"{source} {report['created']} creados, {report['duplicates']} duplicados, "
+                f"{report['errors']} errores de {report['total']}" + ("" if completed else " (interrumpida)")
+            ).strip())
+            db.session.commit()
+    if dry_run:
+        db.session.rollback()
+    return report
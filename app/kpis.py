@@ -0,0 +1,257 @@
+# app/kpis.py
+"""
+KPIs del dashboard de admin como contadores materializados (tabla kpi_counter).
+
+- Se actualizan en la MISMA transacción que el cambio de negocio: un listener
+  `after_flush` compara el estado anterior/posterior de Service, Classified, User
+  y las altas de LoginLog, y suma los deltas (approve/reject/toggle/softdelete,
+  registro, login...). Las operaciones en bloque (UPDATE/DELETE sin ORM) deben
+  llamar a `apply_deltas` (con `listing_deltas`) / `forget_listings` explícitamente.
+- `reconcile()` recalcula los valores exactos: tarea "kpis" (app/workers.py, como
+  mucho una vez cada KPI_RECONCILE_INTERVAL entre todos los procesos) o scripts/reconcile_kpis.py. "Activos 30d" solo sube al
+  vuelo; las bajas por ventana, los borrados definitivos y las rutas Core sin
+  deltas se corrigen al reconciliar.
+- `get_kpis()` lee todos los contadores con una sola consulta por PK: O(1).
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, func, inspect, select, update, delete
+from sqlalchemy.dialects import sqlite, postgresql
+from .models import db, User, Service, Classified, LoginLog, KpiCounter, ServiceStatus
+from .workers import register_task
+
+ACTIVE_WINDOW = timedelta(days=30)
+LOGIN_KEY_RETENTION = timedelta(days=35)
+RECONCILED_AT = "kpi:reconciled_at"  # epoch UTC (s) de la última reconciliación
+_EPOCH = datetime(1970, 1, 1)
+
+_LISTINGS = {Service: "services", Classified: "classifieds"}
+
+KPI_NAMES = (
+    "total_users", "active_users_30d",
+    "services_pending", "services_active",
+    "classifieds_pending", "classifieds_active",
+)
+
+
+def logins_key(day) -> str:
+    return f"logins:{day.isoformat()}"
+
+
+# -------------------------
+# Estado -> pertenencia a cada KPI
+# -------------------------
+
+def _listing_flags(status, is_active, is_deleted) -> dict:
+    if is_deleted:
+        return {"pending": 0, "active": 0}
+    return {
+        "pending": int(status == ServiceStatus.PENDING.value),
+        "active": int(status == ServiceStatus.APPROVED.value and bool(is_active)),
+    }
+
+
+def _previous(obj, attr):
+    hist = inspect(obj).attrs[attr].history
+    return hist.deleted[0] if hist.deleted else getattr(obj, attr)
+
+
+def _track_listing(prefix, before, after, deltas: Counter):
+    for key in ("pending", "active"):
+        diff = (after[key] if after else 0) - (before[key] if before else 0)
+        if diff:
+            deltas[f"{prefix}_{key}"] += diff
+
+
+def _flags_now(obj) -> dict:
+    return _listing_flags(obj.status, obj.is_active, obj.is_deleted)
+
+
+def _flags_before(obj) -> dict:
+    return _listing_flags(_previous(obj, "status"), _previous(obj, "is_active"), _previous(obj, "is_deleted"))
+
+
+def _collect(session) -> Counter:
+    deltas = Counter()
+    now = datetime.utcnow()
+
+    for obj in session.new:
+        prefix = _LISTINGS.get(type(obj))
+        if prefix:
+            _track_listing(prefix, None, _flags_now(obj), deltas)
+        elif isinstance(obj, User):
+            deltas["total_users"] += 0 if obj.is_deleted else 1
+        elif isinstance(obj, LoginLog):
+            deltas[logins_key((obj.created_at or now).date())] += 1
+
+    for obj in session.dirty:
+        if not session.is_modified(obj, include_collections=False):
+            continue
+        prefix = _LISTINGS.get(type(obj))
+        if prefix:
+            _track_listing(prefix, _flags_before(obj), _flags_now(obj), deltas)
+        elif isinstance(obj, User):
+            deltas["total_users"] += int(not obj.is_deleted) - int(not _previous(obj, "is_deleted"))
+            hist = inspect(obj).attrs.last_login_at.history
+            if hist.added and hist.added[0]:
+                prev = hist.deleted[0] if hist.deleted else None
+                if prev is None or prev < now - ACTIVE_WINDOW:
+                    deltas["active_users_30d"] += 1
+
+    for obj in session.deleted:
+        prefix = _LISTINGS.get(type(obj))
+        if prefix:
+            _track_listing(prefix, _flags_before(obj), None, deltas)
+        elif isinstance(obj, User):
+            deltas["total_users"] -= int(not _previous(obj, "is_deleted"))
+
+    return Counter({k: v for k, v in deltas.items() if v})
+
+
+def _after_flush(session, flush_context):
+    deltas = _collect(session)
+    if deltas:
+        apply_deltas(deltas, conn=session.connection())
+
+
+def register_kpi_listeners():
+    """Engancha el listener a la sesión de Flask-SQLAlchemy (idempotente)."""
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
+
+
+# -------------------------
+# Escritura de contadores
+# -------------------------
+
+def _upsert(conn, name: str, value: int, increment: bool):
+    table = KpiCounter.__table__
+    now = datetime.utcnow()
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(table).values(name=name, value=value, updated_at=now)
+        new_value = table.c.value + stmt.excluded.value if increment else stmt.excluded.value
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.name], set_={"value": new_value, "updated_at": now},
+        ))
+        return
+    new_value = table.c.value + value if increment else value
+    res = conn.execute(update(table).where(table.c.name == name).values(value=new_value, updated_at=now))
+    if res.rowcount == 0:
+        conn.execute(table.insert().values(name=name, value=value, updated_at=now))
+
+
+def apply_deltas(deltas: dict, conn=None):
+    """Suma deltas {nombre: n} en la transacción en curso (sin commit)."""
+    conn = conn or db.session.connection()
+    for name, value in deltas.items():
+        if value:
+            _upsert(conn, name, int(value), increment=True)
+
+
+def listing_deltas(model, changes) -> Counter:
+    """
+    Deltas de KPIs para cambios de estado hechos con UPDATE / INSERT masivo.
+    `changes`: pares ((status, is_active, is_deleted) antes, (...) después); antes
+    None = fila nueva (INSERT masivo).
+    """
+    prefix = _LISTINGS[model]
+    deltas = Counter()
+    for before, after in changes:
+        _track_listing(prefix, _listing_flags(*before) if before else None, _listing_flags(*after), deltas)
+    return deltas
+
+
+def forget_listings(model, *criteria):
+    """
+    Descuenta de los KPIs las filas de `model` que cumplen `criteria`, antes de un
+    DELETE/UPDATE masivo que el listener no ve. Una consulta agrupada.
+    """
+    prefix = _LISTINGS[model]
+    rows = db.session.execute(
+        select(model.status, model.is_active, model.is_deleted, func.count())
+        .where(*criteria)
+        .group_by(model.status, model.is_active, model.is_deleted)
+    ).all()
+    deltas = Counter()
+    for status, is_active, is_deleted, n in rows:
+        flags = _listing_flags(status, is_active, is_deleted)
+        for key in ("pending", "active"):
+            deltas[f"{prefix}_{key}"] -= flags[key] * n
+    apply_deltas(deltas)
+
+
+# -------------------------
+# Lectura y reconciliación
+# -------------------------
+
+def get_kpis(today=None) -> dict:
+    """Valores para admin.dashboard (una consulta por clave primaria)."""
+    today = today or datetime.utcnow().date()
+    keys = list(KPI_NAMES) + [logins_key(today), RECONCILED_AT]
+    values = dict(db.session.execute(
+        select(KpiCounter.name, KpiCounter.value).where(KpiCounter.name.in_(keys))
+    ).all())
+    if RECONCILED_AT not in values:
+        # Primera vez (tabla vacía): arranca con valores exactos
+        reconcile()
+        return get_kpis(today)
+
+    kpis = {name: max(values.get(name, 0), 0) for name in KPI_NAMES}
+    kpis["logins_today"] = values.get(logins_key(today), 0)
+    kpis["reconciled_at"] = _EPOCH + timedelta(seconds=values[RECONCILED_AT])
+    return kpis
+
+
+def compute_exact(now=None) -> dict:
+    """Los COUNT(*) originales del dashboard (caros: solo para reconciliar)."""
+    now = now or datetime.utcnow()
+    today = now.date()
+    q = db.session.query
+    return {
+        "total_users": q(User).filter_by(is_deleted=False).count(),
+        # User.last_login_at (indexado) y no LoginLog: las filas viejas se purgan (app/retention.py)
+        "active_users_30d": q(User).filter(User.last_login_at >= now - ACTIVE_WINDOW).count(),
+        "services_pending": q(Service).filter_by(status=ServiceStatus.PENDING.value, is_deleted=False).count(),
+        "services_active": q(Service).filter_by(
+            status=ServiceStatus.APPROVED.value, is_active=True, is_deleted=False).count(),
+        "classifieds_pending": q(Classified).filter_by(status=ServiceStatus.PENDING.value, is_deleted=False).count(),
+        "classifieds_active": q(Classified).filter_by(
+            status=ServiceStatus.APPROVED.value, is_active=True, is_deleted=False).count(),
+        logins_key(today): q(LoginLog).filter(
+            LoginLog.created_at >= datetime.combine(today, datetime.min.time())).count(),
+    }
+
+
+def reconcile(now=None) -> dict:
+    """Recalcula y fija los valores exactos; purga contadores diarios viejos. Hace commit."""
+    now = now or datetime.utcnow()
+    exact = compute_exact(now)
+    conn = db.session.connection()
+    for name, value in exact.items():
+        _upsert(conn, name, value, increment=False)
+    _upsert(conn, RECONCILED_AT, int((now - _EPOCH).total_seconds()), increment=False)
+    oldest = logins_key((now - LOGIN_KEY_RETENTION).date())
+    conn.execute(delete(KpiCounter.__table__).where(
+        KpiCounter.name.like("logins:%"), KpiCounter.name < oldest,
+    ))
+    db.session.commit()
+    return exact
+
+
+def reconcile_if_stale(now=None) -> dict | None:
+    """
+    Tarea "kpis": reconcilia si la última reconciliación (de cualquier proceso) tiene
+    más de KPI_RECONCILE_INTERVAL; así varios procesos no repiten los COUNT(*).
+    """
+    now = now or datetime.utcnow()
+    last = db.session.execute(select(KpiCounter.value).where(KpiCounter.name == RECONCILED_AT)).scalar()
+    interval = float(current_app.config.get("KPI_RECONCILE_INTERVAL", 3600))
+    if last is not None and (now - _EPOCH).total_seconds() - last < interval:
+        return None
+    return reconcile(now)
+
+
+register_task("kpis", reconcile_if_stale, "KPI_WORKER_INTERVAL", 300)
@@ -0,0 +1,103 @@
+# app/media.py
+"""
+Archivos subidos por usuarios (/media/avatars/...).
+
+Los nombres son únicos por subida (user<id>_<rand>_<px>.<ext>): un archivo nunca
+cambia de contenido, así que se sirve con `Cache-Control: public, max-age=1 año,
+immutable` y ETag fuerte. GET condicional (304) y Range (206) los resuelve
+werkzeug (send_file).
+
+MEDIA_SENDFILE delega la transferencia al proxy (sin copiar bytes en Python):
+  - "x-accel": Nginx. Responde con X-Accel-Redirect: MEDIA_ACCEL_PREFIX/<archivo>;
+    Nginx necesita un location interno, p.ej.
+        location /_media/avatars/ { internal; alias /var/data/uploads/avatars/; }
+  - "x-sendfile": Apache (mod_xsendfile) / lighttpd. Responde con X-Sendfile: <ruta>.
+  - "" (por defecto): lo envía el worker de Flask.
+Solo aplica al almacenamiento local. Con un backend que da URLs (S3) se redirige
+a la URL firmada/pública y el archivo no pasa por el worker; sin URL ni ruta en
+disco (memory) se transmite por bloques desde el almacenamiento.
+"""
+import mimetypes
+import os
+from flask import Blueprint, Response, current_app, send_file, abort, make_response, redirect, request
+from werkzeug.security import safe_join
+from .storage import get_storage, StorageError, CHUNK_SIZE
+
+media_bp = Blueprint("media", __name__)
+
+
+def _max_age() -> int:
+    return int(current_app.config.get("MEDIA_MAX_AGE", 31536000))
+
+
+def _immutable(resp):
+    resp.cache_control.public = True
+    resp.cache_control.max_age = _max_age()
+    resp.cache_control.immutable = True
+    return resp
+
+
+def _offload(path: str, filename: str, mode: str):
+    """Respuesta vacía con la cabecera que hace que el proxy envíe el archivo."""
+    resp = make_response("")
+    resp.mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    if mode == "x-accel":
+        prefix = current_app.config.get("MEDIA_ACCEL_PREFIX", "/_media/avatars").rstrip("/")
+        resp.headers["X-Accel-Redirect"] = f"{prefix}/{filename}"
+    else:
+        resp.headers["X-Sendfile"] = path
+    return resp
+
+
+def _stream(storage, key: str, filename: str, info: dict):
+    fh = storage.open(key)
+    if fh is None:
+        abort(404)
+
+    def chunks():
+        try:
+            while True:
+                chunk = fh.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            fh.close()
+
+    resp = Response(chunks(), mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+    resp.content_length = info["size"]
+    resp.set_etag(info["etag"])
+    resp.last_modified = info["modified"]
+    return resp.make_conditional(request)
+
+
+@media_bp.route("/media/avatars/<path:filename>")
+def avatar(filename):
+    key = safe_join("avatars", filename)
+    if key is None:
+        abort(404)
+    storage = get_storage()
+
+    url = storage.url(key)
+    if url:
+        resp = redirect(url)
+        resp.cache_control.public = True
+        resp.cache_control.max_age = min(storage.redirect_max_age, _max_age())
+        return resp
+
+    if storage.name == "local":
+        try:
+            path = storage.path(key)
+        except StorageError:
+            abort(404)
+        if not os.path.isfile(path):
+            abort(404)
+        mode = (current_app.config.get("MEDIA_SENDFILE") or "").lower()
+        if mode in ("x-accel", "x-sendfile"):
+            return _immutable(_offload(path, filename, mode))
+        return _immutable(send_file(path, conditional=True, etag=True, max_age=_max_age()))
+
+    info = storage.stat(key)
+    if info is None:
+        abort(404)
+    return _immutable(_stream(storage, key, filename, info))
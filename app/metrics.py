@@ -0,0 +1,312 @@
+# app/metrics.py
+"""
+Instrumentación por request, log de consultas lentas y /metrics (Prometheus).
+
+Por cada request se mide:
+  - total: de before_request a after_request (en respuestas en streaming, hasta que
+    la vista devuelve el generador, no hasta el último byte);
+  - db: tiempo dentro de cursor.execute (eventos before/after_cursor_execute) y
+    número de sentencias;
+  - render: render_template (señales before_render_template / template_rendered),
+    descontando las consultas lanzadas desde la plantilla (lazy loads), que van a db;
+  - other: el resto (código de la vista, hidratación del ORM, serialización...).
+El desglose sale en la cabecera Server-Timing (METRICS_SERVER_TIMING, visible en
+las devtools del navegador) y en el log si el request supera SLOW_REQUEST_MS.
+
+Consultas lentas (>= SLOW_QUERY_MS): se registran en el log con la sentencia
+normalizada (literales e IN (...) colapsados) y se agregan por sentencia para
+/admin/db (las SLOW_QUERY_TOP de más tiempo acumulado).
+
+/metrics expone histogramas por endpoint (duración, db, render, sentencias),
+contadores de requests por estado y el estado del pool (app/engine.py). Acceso:
+admin logueado o `Authorization: Bearer METRICS_TOKEN` (para el scraper). Los
+valores son por proceso: con varios workers de gunicorn cada scrape ve el del
+worker que atiende; sumar series entre workers requiere etiquetarlos
+(p.ej. un target por worker) o un solo worker con hilos.
+
+Coste: dos perf_counter por sentencia y unos pocos dicts por request (ver
+scripts/bench_metrics.py); pensado para dejarlo activo en producción.
+"""
+import hmac
+import re
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, current_app, g, has_request_context, request, template_rendered, before_render_template
+from flask_login import current_user
+from sqlalchemy import event
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+# -------------------------
+# Registro (en memoria, por proceso)
+# -------------------------
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # el último es +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}  # (métrica, etiquetas) -> Histogram
+            self.counters = {}    # (métrica, etiquetas) -> valor
+            self.slow = {}        # sentencia normalizada -> {count, total, max}
+
+    def observe(self, name: str, labels: tuple, value: float, buckets=DURATION_BUCKETS):
+        with self._lock:
+            hist = self.histograms.get((name, labels))
+            if hist is None:
+                hist = self.histograms[(name, labels)] = Histogram(buckets)
+            hist.observe(value)
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1):
+        with self._lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + value
+
+    def record_slow(self, statement: str, seconds: float, limit: int):
+        with self._lock:
+            item = self.slow.get(statement)
+            if item is None:
+                if len(self.slow) >= limit * 10:  # acotado: se descarta la de menos tiempo
+                    del self.slow[min(self.slow, key=lambda s: self.slow[s]["total"])]
+                item = self.slow[statement] = {"count": 0, "total": 0.0, "max": 0.0}
+            item["count"] += 1
+            item["total"] += seconds
+            item["max"] = max(item["max"], seconds)
+
+    def slow_queries(self, limit: int) -> list[dict]:
+        with self._lock:
+            items = sorted(self.slow.items(), key=lambda kv: kv[1]["total"], reverse=True)[:limit]
+        return [
+            {"statement": s, "count": v["count"], "total_ms": round(v["total"] * 1000, 1),
+             "max_ms": round(v["max"] * 1000, 1)}
+            for s, v in items
+        ]
+
+    def snapshot(self):
+        with self._lock:
+            hists = {
+                key: (h.buckets, list(h.counts), h.total, h.count) for key, h in self.histograms.items()
+            }
+            return hists, dict(self.counters)
+
+
+registry = Registry()
+
+
+# -------------------------
+# Sentencias
+# -------------------------
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|\$\d+|:\w+|%s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str, max_len: int = 500) -> str:
+    """Sentencia sin literales ni parámetros concretos, para agrupar y registrar."""
+    sql = _STRING.sub("?", statement)
+    sql = _PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?...)", sql)
+    sql = _SPACES.sub(" ", sql).strip()
+    return sql[:max_len]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_start", []).append(time.perf_counter())
+
+
+def _handle_error(exception_context):
+    # La sentencia falló: after_cursor_execute no llega, se descarta su inicio
+    conn = exception_context.connection
+    stack = conn.info.get("_metrics_start") if conn is not None else None
+    if stack:
+        stack.pop()
+
+
+def _make_after_cursor_execute(app):
+    config = app.config
+
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_metrics_start")
+        if not stack:
+            return
+        elapsed = time.perf_counter() - stack.pop()
+        in_request = has_request_context()
+        if in_request:
+            state = g.get("_metrics")
+            if state is not None:
+                state["db"] += elapsed
+                state["queries"] += 1
+        registry.inc("db_queries_total")
+        registry.inc("db_query_seconds_total", value=elapsed)
+        if elapsed * 1000 >= config.get("SLOW_QUERY_MS", 200):
+            normalized = normalize_statement(statement)
+            registry.inc("db_slow_queries_total")
+            registry.record_slow(normalized, elapsed, int(config.get("SLOW_QUERY_TOP", 20)))
+            app.logger.warning(
+                "[slow-query] %.1f ms%s %s", elapsed * 1000,
+                f" ({request.endpoint})" if in_request else "", normalized,
+            )
+
+    return _after_cursor_execute
+
+
+# -------------------------
+# Requests
+# -------------------------
+
+def _before_request():
+    g._metrics = {"start": time.perf_counter(), "db": 0.0, "queries": 0, "render": 0.0, "renders": []}
+
+
+def _before_render(sender, template, context, **extra):
+    state = g.get("_metrics")
+    if state is not None:
+        state["renders"].append((time.perf_counter(), state["db"]))
+
+
+def _after_render(sender, template, context, **extra):
+    state = g.get("_metrics")
+    if state is not None and state["renders"]:
+        started, db_before = state["renders"].pop()
+        # Las consultas lanzadas desde la plantilla ya cuentan como db
+        state["render"] += (time.perf_counter() - started) - (state["db"] - db_before)
+
+
+def _after_request(response):
+    state = g.pop("_metrics", None)
+    if state is None:
+        return response
+    cfg = current_app.config
+    total = time.perf_counter() - state["start"]
+    db_time, render = state["db"], max(state["render"], 0.0)
+    other = max(total - db_time - render, 0.0)
+    endpoint = request.endpoint or "none"
+    labels = (("endpoint", endpoint), ("method", request.method))
+
+    registry.observe("http_request_duration_seconds", labels, total)
+    registry.observe("http_request_db_seconds", labels, db_time)
+    registry.observe("http_request_render_seconds", labels, render)
+    registry.observe("http_request_queries", labels, state["queries"], QUERY_BUCKETS)
+    registry.inc("http_requests_total", labels + (("status", str(response.status_code)),))
+
+    if cfg.get("METRICS_SERVER_TIMING"):
+        response.headers["Server-Timing"] = (
+            f"db;dur={db_time * 1000:.1f};desc=\"{state['queries']} queries\", "
+            f"render;dur={render * 1000:.1f}, app;dur={other * 1000:.1f}, total;dur={total * 1000:.1f}"
+        )
+    if total * 1000 >= cfg.get("SLOW_REQUEST_MS", 1000):
+        current_app.logger.warning(
+            "[slow-request] %s %s %.0f ms (db %.0f ms / %s sentencias, render %.0f ms, resto %.0f ms)",
+            request.method, request.path, total * 1000, db_time * 1000, state["queries"],
+            render * 1000, other * 1000,
+        )
+    return response
+
+
+# -------------------------
+# /metrics (formato de texto de Prometheus)
+# -------------------------
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def _fmt(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus() -> str:
+    from .engine import pool_stats
+
+    hists, counters = registry.snapshot()
+    lines = []
+    for name in sorted({key[0] for key in hists}):
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), (buckets, counts, total, count) in sorted(hists.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, n in zip(buckets + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_fmt(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+    for name in sorted({key[0] for key in counters}):
+        lines.append(f"# TYPE {name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_labels(labels)} {_fmt(value)}")
+
+    pool = pool_stats()
+    gauges = {
+        "db_pool_size": pool.get("size"),
+        "db_pool_checked_out": pool.get("checked_out"),
+        "db_pool_overflow": pool.get("overflow"),
+    }
+    for name, value in gauges.items():
+        if value is not None:
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+    for name, key in (("db_pool_checkouts_total", "checkouts"), ("db_pool_timeouts_total", "timeouts"),
+                      ("db_pool_slow_waits_total", "slow_waits")):
+        lines += [f"# TYPE {name} counter", f"{name} {pool[key]}"]
+    lines += ["# TYPE db_pool_wait_seconds_max gauge", f"db_pool_wait_seconds_max {pool['wait_ms_max'] / 1000}"]
+    return "\n".join(lines) + "\n"
+
+
+def _authorized() -> bool:
+    token = current_app.config.get("METRICS_TOKEN") or ""
+    header = request.headers.get("Authorization", "")
+    if token and header.startswith("Bearer ") and hmac.compare_digest(header[7:], token):
+        return True
+    return current_user.is_authenticated and current_user.role in ("admin", "superadmin")
+
+
+def metrics_view():
+    if not _authorized():
+        return ("Forbidden", 403)
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+# -------------------------
+# Registro en la app
+# -------------------------
+
+def init_app(app):
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    from . import db
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _make_after_cursor_execute(app))
+    event.listen(engine, "handle_error", _handle_error)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
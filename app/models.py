@@ -2,8 +2,10 @@
 from datetime import datetime, date
 from enum import Enum
 from flask_login import UserMixin
+from sqlalchemy import event
 from werkzeug.security import generate_password_hash, check_password_hash
-from . import db, login_manager
+from . import db
+from .normalize import fold
 
 
 class ServiceStatus(str, Enum):
@@ -12,19 +14,33 @@ class ServiceStatus(str, Enum):
     REJECTED = "REJECTED"
 
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
+def _listed_index(name: str, *columns):
+    """
+    Índice parcial sobre filas publicables (no eliminadas y activas).
+    `status` va como columna y no en el WHERE: SQLite no puede usar un índice
+    parcial cuando el valor de la condición llega como parámetro (?).
+    """
+    return db.Index(
+        name, *columns,
+        sqlite_where=db.text("is_deleted = 0 AND is_active = 1"),
+        postgresql_where=db.text("is_deleted = false AND is_active = true"),
+    )
 
 
 class User(db.Model, UserMixin):
     __tablename__ = "user"
+    __table_args__ = (
+        # admin.users: no eliminados (+ rol), orden (created_at, id) para keyset
+        db.Index("ix_user_admin_list", "is_deleted", "created_at", "id"),
+        db.Index("ix_user_admin_role", "is_deleted", "role", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
     # Perfil
     name = db.Column(db.String(150), nullable=False)
     email = db.Column(db.String(255), unique=True, index=True, nullable=False)
+    name_norm = db.Column(db.String(150), index=True)  # fold(name), para búsquedas
     phone = db.Column(db.String(50))
     address = db.Column(db.String(255))
     avatar_url = db.Column(db.String(500))
@@ -35,20 +51,24 @@ class User(db.Model, UserMixin):
     is_verified = db.Column(db.Boolean, default=False)
     verification_code = db.Column(db.String(10))
     is_deleted = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_login_at = db.Column(db.DateTime, index=True)  # KPI "activos 30d" (ver app/kpis.py)
 
-    # Relaciones (lazy='dynamic' para poder encadenar queries)
+    # Relaciones (lazy='dynamic' para poder encadenar queries).
+    # passive_deletes: al borrar el usuario, los hijos los borra la BD (ON DELETE CASCADE)
     services = db.relationship(
         "Service",
         backref="owner",
         lazy="dynamic",
         foreign_keys="Service.owner_id",
+        passive_deletes=True,
     )
     classifieds = db.relationship(
         "Classified",
         backref="owner",
         lazy="dynamic",
         foreign_keys="Classified.owner_id",
+        passive_deletes=True,
     )
 
     def set_password(self, raw: str):
@@ -63,6 +83,17 @@ class User(db.Model, UserMixin):
 
 class Service(db.Model):
     __tablename__ = "service"
+    __table_args__ = (
+        # Búsqueda pública (fallback LIKE) y conteos de activos
+        _listed_index("ix_service_listed", "status", "created_at"),
+        # services.my_services
+        db.Index("ix_service_owner", "owner_id", "is_deleted", "created_at"),
+        # admin.admin_services (con y sin filtro de estado)
+        db.Index("ix_service_admin_list", "is_deleted", "created_at", "id"),
+        db.Index("ix_service_admin_status", "is_deleted", "status", "created_at", "id"),
+        # app/imports.py: duplicados por email de contacto
+        db.Index("ix_service_contact_email", "contact_email"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -73,8 +104,12 @@ class Service(db.Model):
     social = db.Column(db.String(255))
     address = db.Column(db.String(255))
 
+    # Texto normalizado (se rellena al escribir, ver _fill_norm_columns)
+    title_norm = db.Column(db.String(200), index=True)  # índice: duplicados de app/imports.py (IN), no el LIKE
+    search_norm = db.Column(db.Text)
+
     # Propietario
-    owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
 
     # Contacto (se rellenan automáticamente con datos del owner para básicos)
     contact_name = db.Column(db.String(150))
@@ -85,12 +120,12 @@ class Service(db.Model):
     status = db.Column(db.String(20), default=ServiceStatus.PENDING.value)
     is_active = db.Column(db.Boolean, default=False)
     is_deleted = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     # Auditoría de flujo
-    approved_by = db.Column(db.Integer, db.ForeignKey("user.id"))
+    approved_by = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="SET NULL"), index=True)
     approved_at = db.Column(db.DateTime)
-    rejected_by = db.Column(db.Integer, db.ForeignKey("user.id"))
+    rejected_by = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="SET NULL"), index=True)
     rejected_at = db.Column(db.DateTime)
 
     def __repr__(self):
@@ -99,6 +134,14 @@ class Service(db.Model):
 
 class Classified(db.Model):
     __tablename__ = "classified"
+    __table_args__ = (
+        # /clasificados/ público: ix_classified_public, debajo de la clase
+        # classifieds.mine
+        db.Index("ix_classified_owner", "owner_id", "is_deleted", "created_at"),
+        # admin.admin_classifieds (con y sin filtro de estado)
+        db.Index("ix_classified_admin_list", "is_deleted", "created_at", "id"),
+        db.Index("ix_classified_admin_status", "is_deleted", "status", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -106,23 +149,29 @@ class Classified(db.Model):
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
 
+    # Texto normalizado (se rellena al escribir, ver _fill_norm_columns)
+    title_norm = db.Column(db.String(200), index=True)  # índice: duplicados de app/imports.py (IN), no el LIKE
+    search_norm = db.Column(db.Text)
+
     # Fechas de vigencia (opcionales)
     start_date = db.Column(db.Date)
     end_date = db.Column(db.Date)
 
     # Propietario
-    owner_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
 
     # Estado
     status = db.Column(db.String(20), default=ServiceStatus.PENDING.value)
     is_active = db.Column(db.Boolean, default=False)
     is_deleted = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Publicado hoy (is_publishable), materializado: ver app/visibility.py
+    is_visible = db.Column(db.Boolean, default=False)
 
     # Auditoría de flujo (⚠️ NUEVO)
-    approved_by = db.Column(db.Integer, db.ForeignKey("user.id"))
+    approved_by = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="SET NULL"), index=True)
     approved_at = db.Column(db.DateTime)
-    rejected_by = db.Column(db.Integer, db.ForeignKey("user.id"))
+    rejected_by = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="SET NULL"), index=True)
     rejected_at = db.Column(db.DateTime)
 
     def is_currently_valid(self, today: date | None = None) -> bool:
@@ -134,35 +183,186 @@ class Classified(db.Model):
             return False
         return True
 
+    def is_publishable(self, today: date | None = None) -> bool:
+        """Valor que debe tener is_visible (en SQL: visibility.visible_clause)."""
+        return bool(
+            not self.is_deleted and self.is_active and self.status == ServiceStatus.APPROVED.value
+            and self.is_currently_valid(today)
+        )
+
     def __repr__(self):
         return f"<Classified {self.id} {self.title} [{self.status}]>"
 
 
+# /clasificados/ público (app/public_classifieds.py): solo las filas publicadas, con la
+# clave exacta del listado (start_date DESC NULLS LAST, created_at DESC, id DESC) para
+# paginarlo sin ordenar. Postgres: declarado así (un índice ASC recorrido hacia atrás
+# da NULLS FIRST). SQLite no admite NULLS en un índice; el ASC hacia atrás ya deja los
+# NULL al final.
+db.Index(
+    "ix_classified_public",
+    Classified.start_date.desc().nullslast(), Classified.created_at.desc(), Classified.id.desc(),
+    postgresql_where=db.text("is_visible = true"),
+).ddl_if(dialect="postgresql")
+db.Index(
+    "ix_classified_public", Classified.start_date, Classified.created_at, Classified.id,
+    sqlite_where=db.text("is_visible = 1"),
+).ddl_if(dialect="sqlite")
+
+
+@event.listens_for(User, "before_insert")
+@event.listens_for(User, "before_update")
+def _fill_user_norm(mapper, connection, target):
+    target.name_norm = fold(target.name)
+
+
+@event.listens_for(Service, "before_insert")
+@event.listens_for(Service, "before_update")
+@event.listens_for(Classified, "before_insert")
+@event.listens_for(Classified, "before_update")
+def _fill_norm_columns(mapper, connection, target):
+    target.title_norm = fold(target.title)
+    target.search_norm = fold(f"{target.title or ''} {target.description or ''}")
+
+
+@event.listens_for(Classified, "before_insert")
+@event.listens_for(Classified, "before_update")
+def _fill_visibility(mapper, connection, target):
+    target.is_visible = target.is_publishable()
+
+
 class LoginLog(db.Model):
     __tablename__ = "login_log"
+    __table_args__ = (
+        # admin.logs (keyset) y ventanas de tiempo del dashboard
+        db.Index("ix_login_log_created", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), index=True)
     ip = db.Column(db.String(100))
     user_agent = db.Column(db.String(500))
     location = db.Column(db.String(255))  # si luego integras GeoIP
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
-    user = db.relationship("User", backref="login_logs")
+    user = db.relationship("User", backref=db.backref("login_logs", passive_deletes=True))
 
 
 class ActivityLog(db.Model):
     __tablename__ = "activity_log"
+    __table_args__ = (
+        # admin.logs (keyset, con y sin filtro de acción)
+        db.Index("ix_activity_log_created", "created_at", "id"),
+        db.Index("ix_activity_log_action", "action", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    actor_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True)
+    actor_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), index=True)
     action = db.Column(db.String(50))           # e.g., "create", "approve", "reject", etc.
     entity = db.Column(db.String(50))           # e.g., "Service", "Classified", "User"
     entity_id = db.Column(db.Integer)
     meta = db.Column(db.Text)                   # json/extra info si la necesitas
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
-    actor = db.relationship("User", backref="activities")
+    actor = db.relationship("User", backref=db.backref("activities", passive_deletes=True))
 
     def __repr__(self):
         return f"<ActivityLog {self.id} {self.action} {self.entity}#{self.entity_id}>"
+
+
+class LoginDaily(db.Model):
+    """Resumen diario de LoginLog (app/retention.py): sobrevive a la purga de las filas."""
+    __tablename__ = "login_daily"
+
+    day = db.Column(db.Date, primary_key=True)
+    logins = db.Column(db.Integer, nullable=False, default=0)
+    active_users = db.Column(db.Integer, nullable=False, default=0)  # usuarios distintos ese día
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<LoginDaily {self.day} logins={self.logins}>"
+
+
+class ActionDaily(db.Model):
+    """Resumen diario de ActivityLog por acción y entidad (app/retention.py)."""
+    __tablename__ = "action_daily"
+
+    day = db.Column(db.Date, primary_key=True)
+    action = db.Column(db.String(50), primary_key=True)
+    entity = db.Column(db.String(50), primary_key=True, default="")  # "" si la fila no tenía entidad
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ActionDaily {self.day} {self.action}/{self.entity}={self.count}>"
+
+
+class KpiCounter(db.Model):
+    """Contadores del dashboard, mantenidos al escribir y reconciliados periódicamente."""
+    __tablename__ = "kpi_counter"
+
+    name = db.Column(db.String(64), primary_key=True)  # p.ej. "services_pending", "logins:2025-01-31"
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<KpiCounter {self.name}={self.value}>"
+
+
+class OutboundEmail(db.Model):
+    """Cola persistente de correo saliente (ver app/email.py)."""
+    __tablename__ = "outbound_email"
+    __table_args__ = (
+        # El worker reclama: status='queued' AND next_attempt_at <= ahora
+        db.Index("ix_outbound_email_pending", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html = db.Column(db.Text)
+    plain = db.Column(db.Text)
+
+    status = db.Column(db.String(20), default="queued")  # queued | sending | sent | failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_by = db.Column(db.String(32))
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<OutboundEmail {self.id} {self.to_email} [{self.status}]>"
+
+
+class UserDeletion(db.Model):
+    """Borrado definitivo de una cuenta, por tandas en segundo plano (ver app/deletions.py)."""
+    __tablename__ = "user_deletion"
+    __table_args__ = (
+        db.Index("ix_user_deletion_pending", "status", "claimed_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)  # sin FK: el usuario desaparece
+    user_email = db.Column(db.String(255))
+    requested_by = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="SET NULL"), index=True)
+
+    status = db.Column(db.String(20), default="queued")  # queued | running | done | failed
+    step = db.Column(db.String(30))                      # paso en curso (ver deletions.STEPS)
+    total = db.Column(db.Integer, default=0)             # filas estimadas al encolar
+    done = db.Column(db.Integer, default=0)              # filas borradas/actualizadas
+    attempts = db.Column(db.Integer, default=0)
+    claimed_by = db.Column(db.String(32))
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    @property
+    def percent(self) -> int:
+        if self.status == "done":
+            return 100
+        return min(99, int(100 * (self.done or 0) / self.total)) if self.total else 0
+
+    def __repr__(self):
+        return f"<UserDeletion {self.id} user={self.user_id} [{self.status}]>"
@@ -0,0 +1,104 @@
+# app/moderation.py
+"""
+Moderación en bloque de servicios y clasificados (admin.bulk_services / admin.bulk_classifieds).
+
+Una acción sobre N ids cuesta lo mismo que sobre uno:
+  1. Un SELECT de (id, estado, rechazado por) de los ids pedidos (FOR UPDATE en
+     Postgres) para decidir el resultado de cada uno con las mismas reglas que las
+     acciones individuales (solo quien rechazó, o un superadmin, puede re-aprobar).
+  2. Un UPDATE por conjunto con los ids aplicables (en clasificados, también
+     is_visible: ver app/visibility.py).
+  3. Auditoría en un INSERT por lotes (log_actions), deltas de KPIs (apply_deltas)
+     e invalidación de páginas cacheadas al confirmar: el UPDATE masivo no pasa por
+     los listeners de flush.
+Todo en la transacción del llamador (hace commit al final).
+
+Resultado por id: "ok", "unchanged" (ya estaba así), "forbidden" (regla de
+rechazo), "invalid_status" (activar/desactivar algo no aprobado) o "not_found".
+"""
+from datetime import date, datetime
+from sqlalchemy import select, update
+from .kpis import apply_deltas, listing_deltas
+from .models import db, Service, Classified, ServiceStatus
+from .page_cache import invalidate_on_commit
+from .utils import log_actions
+from .visibility import dates_clause
+
+APPROVED = ServiceStatus.APPROVED.value
+REJECTED = ServiceStatus.REJECTED.value
+
+# Acciones permitidas por modelo
+ACTIONS = {
+    Service: ("approve", "reject", "activate", "deactivate"),
+    Classified: ("approve", "reject"),
+}
+
+
+def _page_tags(model, ids):
+    if model is Service:
+        return [f"service:{i}" for i in ids]
+    return ["classifieds"] + [f"classified:{i}" for i in ids]
+
+
+def _decide(action: str, row, actor_id: int, is_super: bool) -> str:
+    status, is_active = row.status, bool(row.is_active)
+    if action == "approve":
+        if status == REJECTED and not is_super and row.rejected_by and row.rejected_by != actor_id:
+            return "forbidden"
+        return "unchanged" if status == APPROVED and is_active else "ok"
+    if action == "reject":
+        return "unchanged" if status == REJECTED else "ok"
+    if status != APPROVED:
+        return "invalid_status"
+    return "unchanged" if is_active == (action == "activate") else "ok"
+
+
+def _values(action: str, actor_id: int, now: datetime) -> dict:
+    if action == "approve":
+        return dict(status=APPROVED, is_active=True, approved_by=actor_id, approved_at=now)
+    if action == "reject":
+        return dict(status=REJECTED, is_active=False, rejected_by=actor_id, rejected_at=now)
+    return dict(is_active=action == "activate")
+
+
+def bulk_moderate(model, action: str, ids, actor, is_super: bool) -> dict:
+    """Aplica `action` a `ids` y devuelve {id: resultado}. Hace commit."""
+    if action not in ACTIONS[model]:
+        raise ValueError(f"acción no válida: {action}")
+    ids = list(dict.fromkeys(ids))
+    results = dict.fromkeys(ids, "not_found")
+    if not ids:
+        return results
+
+    rows = db.session.execute(
+        select(model.id, model.status, model.is_active, model.rejected_by)
+        .where(model.id.in_(ids), model.is_deleted == False)
+        .with_for_update()
+    ).all()
+    todo = []
+    for row in rows:
+        results[row.id] = _decide(action, row, actor.id, is_super)
+        if results[row.id] == "ok":
+            todo.append(row)
+    if not todo:
+        return results
+
+    now = datetime.utcnow()
+    values = _values(action, actor.id, now)
+    if model is Classified:
+        # Aprobar publica si está en vigencia (las fechas no cambian en este UPDATE)
+        values["is_visible"] = dates_clause(date.today()) if action == "approve" else False
+    todo_ids = [row.id for row in todo]
+    db.session.execute(
+        update(model).where(model.id.in_(todo_ids)).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+    apply_deltas(listing_deltas(model, (
+        ((row.status, row.is_active, False), (values.get("status", row.status), values["is_active"], False))
+        for row in todo
+    )))
+    log_actions(actor, action, model.__name__, todo_ids, "bulk")
+    invalidate_on_commit(*_page_tags(model, todo_ids))
+    db.session.commit()
+    return results
@@ -0,0 +1,18 @@
+# app/normalize.py
+"""
+Normalización de texto para búsquedas: minúsculas y sin tildes
+("Peluquería" -> "peluqueria", "Muñoz" -> "munoz").
+
+Se aplica al escribir (columnas *_norm de los modelos) y a la consulta del usuario,
+para no llamar a lower()/unaccent() por fila al buscar.
+"""
+import unicodedata
+
+
+def fold(value) -> str:
+    """Pliega mayúsculas/tildes y colapsa espacios. None/'' -> ''."""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", str(value))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
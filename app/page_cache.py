@@ -0,0 +1,211 @@
+# app/page_cache.py
+"""
+Caché de páginas públicas renderizadas (solo visitantes anónimos).
+
+- `@cached_page("tag", ...)` en una vista GET: la clave es endpoint + ruta + query
+  string ordenado. Solo se guardan respuestas 200 sin usuario autenticado y sin
+  mensajes flash pendientes (esas peticiones pasan directo a la vista).
+- Invalidación por etiquetas: cada entrada recuerda sus etiquetas ("classifieds",
+  "service:12", "owner:3"...) y el instante en que EMPEZÓ a generarse; cada
+  etiqueta guarda cuándo se invalidó por última vez. La entrada vale si se generó
+  después de todas sus invalidaciones (un render que leyó datos viejos durante un
+  commit queda invalidado).
+- Las etiquetas se invalidan solas tras el commit de cualquier cambio ORM de
+  Service / Classified / User. Los UPDATE/DELETE masivos deben llamar a
+  `invalidate_on_commit(*tags)` antes del commit.
+- Respuestas con ETag y Last-Modified: un navegador que revalida recibe 304.
+
+Backend (PAGE_CACHE_BACKEND): "memory" (por proceso), "filesystem" (compartido en
+la máquina), "redis" (CACHE_REDIS_URL) o "none" para desactivarla.
+"""
+import hashlib
+import time
+from collections import Counter
+from functools import wraps
+from flask import request, session, g, make_response
+from flask_login import current_user
+from sqlalchemy import event
+from werkzeug.http import http_date
+from .cache import make_cache
+from .models import db, Service, Classified, User
+
+_PENDING = "page_cache_pending"  # session.info: etiquetas a invalidar en el commit
+_subscribers = []  # fn(tags) de otras cachés con las mismas etiquetas (p.ej. app/public_classifieds.py)
+TAG_TTL = 7 * 24 * 3600  # > PAGE_CACHE_TTL: una etiqueta vencida ya no tiene entradas vivas
+
+
+class PageCache:
+    def __init__(self):
+        self.pages = None
+        self.tags = None
+        self._stats = Counter()
+
+    def init_app(self, app):
+        backend = (app.config.get("PAGE_CACHE_BACKEND") or "none").lower()
+        self.ttl = float(app.config.get("PAGE_CACHE_TTL", 300))
+        if backend == "none":
+            self.pages = self.tags = None
+            return
+        self.pages = make_cache(app, "page", ttl=self.ttl,
+                                maxsize=int(app.config.get("PAGE_CACHE_SIZE", 1000)), backend=backend)
+        self.tags = make_cache(app, "page-tag", ttl=TAG_TTL, maxsize=100000, backend=backend)
+
+    @property
+    def enabled(self) -> bool:
+        return self.pages is not None
+
+    # -------------------------
+    # Etiquetas
+    # -------------------------
+
+    def invalidate(self, *tags):
+        if not self.enabled:
+            return
+        now = time.time()
+        for tag in set(tags):
+            self.tags.set(tag, now)
+        self._stats["invalidations"] += len(set(tags))
+
+    def _fresh(self, entry) -> bool:
+        return all((self.tags.get(tag) or 0) < entry["started"] for tag in entry["tags"])
+
+    # -------------------------
+    # Lectura / escritura
+    # -------------------------
+
+    def lookup(self, key):
+        entry = self.pages.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        if not self._fresh(entry):
+            self.pages.delete(key)
+            self._stats["stale"] += 1
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return entry
+
+    def store(self, key, response, started: float, tags):
+        body = response.get_data()
+        entry = {
+            "body": body,
+            "mimetype": response.mimetype,
+            "etag": hashlib.md5(body).hexdigest(),
+            "started": started,
+            "tags": sorted(set(tags)),
+        }
+        self.pages.set(key, entry)
+        self._stats["stores"] += 1
+        return entry
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "enabled": True,
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else None,
+            **self._stats,
+            "backend": self.pages.stats(),
+        }
+
+
+page_cache = PageCache()
+
+
+def _cache_key() -> str:
+    args = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    return f"{request.endpoint}:{request.path}?{args}"
+
+
+def _respond(entry, status: str):
+    resp = make_response(entry["body"])
+    resp.mimetype = entry["mimetype"]
+    resp.set_etag(entry["etag"])
+    resp.headers["Last-Modified"] = http_date(entry["started"])
+    # Siempre revalidar (el mismo URL es distinto para usuarios con sesión)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["Vary"] = "Cookie"
+    resp.headers["X-Cache"] = status
+    return resp.make_conditional(request)
+
+
+def tag_page(*tags):
+    """Añade etiquetas a la página en curso (p.ej. las que dependen del objeto cargado)."""
+    g.setdefault("page_tags", []).extend(tags)
+
+
+def cached_page(*tags):
+    """Decorador de vistas GET públicas. `tags` admite `{kwarg}` de la ruta: "service:{service_id}"."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not page_cache.enabled or request.method != "GET":
+                return view(*args, **kwargs)
+            if current_user.is_authenticated or session.get("_flashes"):
+                page_cache._stats["bypass"] += 1
+                return view(*args, **kwargs)
+
+            key = _cache_key()
+            entry = page_cache.lookup(key)
+            if entry is not None:
+                return _respond(entry, "HIT")
+
+            started = time.time()
+            g.page_tags = [t.format(**kwargs) for t in tags]
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200 or session.get("_flashes"):
+                return resp
+            return _respond(page_cache.store(key, resp, started, g.page_tags), "MISS")
+        return wrapper
+    return decorator
+
+
+# -------------------------
+# Invalidación por commit
+# -------------------------
+
+def subscribe(fn):
+    """`fn(tags)` se llama tras cada commit con etiquetas invalidadas (aunque esta caché esté apagada)."""
+    if fn not in _subscribers:
+        _subscribers.append(fn)
+
+
+def invalidate_on_commit(*tags):
+    """Etiquetas a invalidar cuando se confirme la transacción actual."""
+    db.session.info.setdefault(_PENDING, set()).update(tags)
+
+
+def _after_flush(session, flush_context):
+    tags = set()
+    dirty = [o for o in session.dirty if session.is_modified(o, include_collections=False)]
+    for obj in list(session.new) + dirty + list(session.deleted):
+        if isinstance(obj, Service):
+            tags.add(f"service:{obj.id}")
+        elif isinstance(obj, Classified):
+            tags.update(("classifieds", f"classified:{obj.id}"))
+    # Usuario borrado: sus páginas de detalle (etiqueta owner:<id>)
+    tags.update(f"owner:{obj.id}" for obj in session.deleted if isinstance(obj, User))
+    if tags:
+        session.info.setdefault(_PENDING, set()).update(tags)
+
+
+def _after_commit(session):
+    tags = session.info.pop(_PENDING, None)
+    if tags:
+        page_cache.invalidate(*tags)
+        for fn in _subscribers:
+            fn(tags)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING, None)
+
+
+def init_app(app):
+    page_cache.init_app(app)
+    for name, fn in (("after_flush", _after_flush), ("after_commit", _after_commit),
+                     ("after_rollback", _after_rollback)):
+        if not event.contains(db.session, name, fn):
+            event.listen(db.session, name, fn)
@@ -0,0 +1,83 @@
+# app/pagination.py
+"""
+Paginación por cursor (keyset) sobre (created_at, id) para los listados de admin.
+
+El cursor es un token opaco en la URL (?cursor=...) con el último (created_at, id)
+de la página anterior: cada request hace un `WHERE (created_at, id) < cursor LIMIT n`
+acotado, sin OFFSET, por grande que sea la tabla. created_at es NOT NULL en las
+tablas paginadas (scripts/migrate_db.py rellena las filas antiguas): una fila NULL
+quedaría fuera del recorrido (DESC la pone al final en SQLite y al principio en
+Postgres, y `created_at < cursor` nunca la alcanza).
+"""
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from flask import current_app
+from sqlalchemy import or_, and_
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    per_page: int
+    next_cursor: Optional[str] = None
+    cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self) -> bool:
+        return not self.cursor
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: Optional[str]):
+    """Devuelve (created_at, id) o None si el token falta o es inválido."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        ts, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def page_size(raw=None) -> int:
+    """Tamaño de página: ?per_page=N acotado por ADMIN_PAGE_SIZE_MAX."""
+    default = int(current_app.config.get("ADMIN_PAGE_SIZE", 50))
+    maximum = int(current_app.config.get("ADMIN_PAGE_SIZE_MAX", 500))
+    try:
+        size = int(raw) if raw else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def keyset_paginate(query, model, cursor: Optional[str] = None, per_page: int = 50) -> KeysetPage:
+    """
+    Aplica orden (created_at DESC, id DESC) + cursor a `query` y trae per_page+1 filas
+    (la extra solo indica si hay página siguiente).
+    """
+    position = decode_cursor(cursor)
+    if position:
+        created_at, row_id = position
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id),
+        ))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return KeysetPage(items=rows, per_page=per_page, next_cursor=next_cursor, cursor=cursor if position else None)
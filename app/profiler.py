@@ -0,0 +1,221 @@
+# app/profiler.py
+"""
+Perfilado opcional de requests en producción.
+
+Desactivado (PROFILER_ENABLED=false, por defecto) no registra ningún hook: coste cero.
+Activado, se perfila:
+  - una muestra aleatoria de requests (PROFILE_SAMPLE_RATE, p.ej. 0.001), o
+  - cualquier request con la cabecera `X-Profile: <token>`; el token lo genera un
+    superadmin en /admin/profiles, va firmado con SECRET_KEY y caduca a las
+    PROFILE_TOKEN_TTL segundos (sirve para curl/scripts sin sesión).
+
+Modos (PROFILER_MODE):
+  - "sample" (por defecto): un hilo toma la pila del hilo del request cada
+    PROFILE_INTERVAL_MS y acumula pilas plegadas ("a;b;c N"), el formato de
+    flamegraph.pl / speedscope / inferno. Coste proporcional al intervalo, no al
+    número de llamadas.
+  - "cprofile": cProfile determinista (.prof, para pstats / snakeviz); más preciso
+    en llamadas y mucho más caro.
+Solo un request perfilado a la vez por proceso (cProfile no admite dos activos);
+si ya hay uno en curso, el siguiente no se perfila.
+
+Los archivos van a PROFILE_DIR (por defecto instance/profiles), con el endpoint y
+la duración en el nombre, y se conservan los PROFILE_MAX_FILES más recientes.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import current_app, g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+HEADER = "X-Profile"
+SUFFIXES = {"sample": ".folded", "cprofile": ".prof"}
+FILENAME_RE = re.compile(r"^(\d{8}-\d{6}-\d{6})-(\d+)ms-([\w.]+)-[0-9a-f]{6}\.(folded|prof)$")
+_busy = threading.Lock()
+
+
+def profile_dir() -> str:
+    path = current_app.config.get("PROFILE_DIR") or os.path.join(current_app.instance_path, "profiles")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# -------------------------
+# Token de la cabecera
+# -------------------------
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="profile-request")
+
+
+def make_token(user) -> str:
+    return _serializer().dumps({"uid": user.id})
+
+
+def _token_ok(token: str) -> bool:
+    try:
+        _serializer().loads(token, max_age=int(current_app.config.get("PROFILE_TOKEN_TTL", 3600)))
+    except BadSignature:
+        return False
+    return True
+
+
+# -------------------------
+# Perfiladores
+# -------------------------
+
+class StackSampler(threading.Thread):
+    """Muestrea la pila de `thread_id` cada `interval` s en pilas plegadas."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names and not self._stop_event.is_set():  # la última sería el propio stop()
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> bytes:
+        self._stop_event.set()
+        self.join()
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common()).encode("utf-8")
+
+
+class _CProfile:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self) -> bytes:
+        self.profile.disable()
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)  # mismo formato que Profile.dump_stats
+
+
+# -------------------------
+# Hooks
+# -------------------------
+
+def _wanted() -> bool:
+    token = request.headers.get(HEADER)
+    if token:
+        return _token_ok(token)
+    rate = float(current_app.config.get("PROFILE_SAMPLE_RATE", 0))
+    return rate > 0 and random.random() < rate
+
+
+def _before_request():
+    if not _wanted() or not _busy.acquire(blocking=False):
+        return
+    mode = current_app.config.get("PROFILER_MODE", "sample")
+    try:
+        if mode == "cprofile":
+            profiler = _CProfile()
+        else:
+            mode = "sample"
+            interval = float(current_app.config.get("PROFILE_INTERVAL_MS", 5)) / 1000
+            profiler = StackSampler(threading.get_ident(), interval)
+            profiler.start()
+    except Exception:
+        _busy.release()
+        current_app.logger.exception("[profiler] no se pudo iniciar el perfil")
+        return
+    g._profile = (profiler, mode, time.perf_counter())
+
+
+def _teardown_request(exc):
+    state = g.pop("_profile", None)
+    if state is None:
+        return
+    profiler, mode, started = state
+    try:
+        data = profiler.stop()
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        _write(data, mode, elapsed_ms, request.endpoint or "none")
+    except Exception:
+        current_app.logger.exception("[profiler] no se pudo guardar el perfil")
+    finally:
+        _busy.release()
+
+
+def _write(data: bytes, mode: str, elapsed_ms: int, endpoint: str):
+    directory = profile_dir()
+    name = f"{datetime.utcnow():%Y%m%d-%H%M%S-%f}-{elapsed_ms}ms-{endpoint}-{os.urandom(3).hex()}{SUFFIXES[mode]}"
+    with open(os.path.join(directory, name), "wb") as fh:
+        fh.write(data)
+    keep = int(current_app.config.get("PROFILE_MAX_FILES", 200))
+    files = sorted(f for f in os.listdir(directory) if FILENAME_RE.match(f))  # por fecha (prefijo)
+    for old in files[:-keep] if len(files) > keep else []:
+        os.remove(os.path.join(directory, old))
+
+
+# -------------------------
+# Consulta (admin)
+# -------------------------
+
+def list_profiles() -> list[dict]:
+    directory = profile_dir()
+    items = []
+    for name in os.listdir(directory):
+        match = FILENAME_RE.match(name)
+        if not match:
+            continue
+        stamp, ms, endpoint, kind = match.groups()
+        items.append({
+            "name": name,
+            "created_at": datetime.strptime(stamp, "%Y%m%d-%H%M%S-%f"),
+            "duration_ms": int(ms),
+            "endpoint": endpoint,
+            "mode": "cprofile" if kind == "prof" else "sample",
+            "size": os.path.getsize(os.path.join(directory, name)),
+        })
+    return sorted(items, key=lambda item: item["name"], reverse=True)
+
+
+def summary(name: str, limit: int = 40) -> str:
+    """Resumen legible: funciones por tiempo acumulado (.prof) o por tiempo propio (.folded)."""
+    path = os.path.join(profile_dir(), name)
+    if name.endswith(".prof"):
+        out = io.StringIO()
+        stats = pstats.Stats(path, stream=out)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+    # Tiempo propio por función: último marco de cada pila
+    own, total = Counter(), 0
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            stack, _, n = line.rstrip("\n").rpartition(" ")
+            own[stack.rsplit(";", 1)[-1]] += int(n)
+            total += int(n)
+    if not total:
+        return "0 muestras (el request duró menos que PROFILE_INTERVAL_MS)"
+    lines = [f"{total} muestras\n", f"{'%':>6}  {'muestras':>8}  función"]
+    for frame, n in own.most_common(limit):
+        lines.append(f"{n / total * 100:>5.1f}%  {n:>8}  {frame}")
+    return "\n".join(lines)
+
+
+def init_app(app):
+    if not app.config.get("PROFILER_ENABLED"):
+        return
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,156 @@
+# app/public_classifieds.py
+"""
+Modelo de lectura del listado público de clasificados.
+
+Único punto de consulta para /clasificados/ (y para cualquier API futura):
+  - Filas publicadas (Classified.is_visible, ver app/visibility.py), en orden
+    estable: start_date DESC (sin fecha al final), created_at DESC, id DESC.
+  - Paginación por cursor (keyset) sobre esa clave, como los listados de admin
+    (app/pagination.py): `WHERE clave < cursor LIMIT n` recorriendo en orden el
+    índice parcial ix_classified_public (solo filas publicadas, declarado con esta
+    misma clave, ver app/models.py), sin ordenar ni cargar la tabla entera.
+  - Caché de resultados (CLASSIFIEDS_CACHE_TTL; backend de app/cache.py): cada
+    página es una lista de dicts con las columnas de las tarjetas. La clave lleva una
+    "generación" que se renueva tras el commit de cualquier cambio que invalide la
+    etiqueta "classifieds" de la caché de páginas (listeners ORM, moderación masiva,
+    vigencia por fechas). Con caché en memoria y varios workers, los demás procesos
+    ven la página anterior hasta que vence el TTL (usar Redis para compartirla).
+"""
+import base64
+import os
+from datetime import date, datetime
+from typing import Optional
+from flask import current_app
+from sqlalchemy import and_, or_, select
+from . import page_cache
+from .cache import make_cache
+from .models import db, Classified
+from .pagination import KeysetPage
+
+COLUMNS = ("id", "title", "description", "start_date", "end_date", "created_at")
+_GEN_KEY = "generation"
+_GEN_TTL = 7 * 24 * 3600  # > CLASSIFIEDS_CACHE_TTL: una generación vencida ya no tiene páginas vivas
+
+_cache = None
+
+
+# -------------------------
+# Cursor (start_date, created_at, id)
+# -------------------------
+
+def encode_cursor(row: dict) -> str:
+    # start_date es opcional; created_at es NOT NULL (ver app/pagination.py)
+    start = row["start_date"].isoformat() if row["start_date"] else ""
+    raw = f"{start}|{row['created_at'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: Optional[str]):
+    """(start_date | None, created_at, id) o None si el token falta o es inválido."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        start, created, row_id = raw.split("|")
+        return (date.fromisoformat(start) if start else None), datetime.fromisoformat(created), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _after(position):
+    """Filas posteriores a `position` en el orden del listado."""
+    start, created, row_id = position
+    tail = or_(Classified.created_at < created, and_(Classified.created_at == created, Classified.id < row_id))
+    if start is None:  # ya en el tramo sin fecha (va al final)
+        return and_(Classified.start_date.is_(None), tail)
+    return or_(
+        Classified.start_date < start,
+        and_(Classified.start_date == start, tail),
+        Classified.start_date.is_(None),
+    )
+
+
+# -------------------------
+# Consulta
+# -------------------------
+
+def _query(position, per_page: int) -> list[dict]:
+    stmt = (
+        select(*(getattr(Classified, name) for name in COLUMNS))
+        .where(Classified.is_visible == True)
+        .order_by(Classified.start_date.desc().nullslast(), Classified.created_at.desc(), Classified.id.desc())
+        .limit(per_page + 1)
+    )
+    if position:
+        stmt = stmt.where(_after(position))
+    return [dict(row._mapping) for row in db.session.execute(stmt)]
+
+
+def page_size(raw=None) -> int:
+    """?per_page=N acotado por CLASSIFIEDS_PAGE_SIZE_MAX (pocas claves de caché)."""
+    default = int(current_app.config.get("CLASSIFIEDS_PAGE_SIZE", 48))
+    maximum = int(current_app.config.get("CLASSIFIEDS_PAGE_SIZE_MAX", 96))
+    try:
+        size = int(raw) if raw else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def public_page(cursor: Optional[str] = None, per_page: Optional[int] = None) -> KeysetPage:
+    """Página del listado público: items = dicts con COLUMNS."""
+    per_page = per_page or page_size()
+    position = decode_cursor(cursor)
+    cursor = cursor if position else None
+
+    key = f"{_generation()}:{cursor or ''}:{per_page}"
+    rows = _cache.get(key) if _cache is not None else None
+    if rows is None:
+        rows = _query(position, per_page)
+        if _cache is not None:
+            _cache.set(key, rows)
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1])
+    return KeysetPage(items=rows, per_page=per_page, next_cursor=next_cursor, cursor=cursor)
+
+
+# -------------------------
+# Caché
+# -------------------------
+
+def _generation() -> str:
+    if _cache is None:
+        return ""
+    gen = _cache.get(_GEN_KEY)
+    if gen is None:  # primera vez o vencida: las claves viejas dejan de coincidir
+        gen = invalidate()
+    return gen
+
+
+def invalidate() -> str:
+    """Descarta todas las páginas cacheadas (nueva generación)."""
+    gen = os.urandom(6).hex()
+    if _cache is not None:
+        _cache.set(_GEN_KEY, gen, ttl=_GEN_TTL)
+    return gen
+
+
+def _on_invalidate(tags):
+    if "classifieds" in tags:
+        invalidate()
+
+
+def cache_stats() -> dict:
+    return _cache.stats() if _cache is not None else {}
+
+
+def init_app(app):
+    global _cache
+    ttl = float(app.config.get("CLASSIFIEDS_CACHE_TTL", 60))
+    _cache = make_cache(
+        app, prefix="classifieds", ttl=ttl, maxsize=int(app.config.get("CLASSIFIEDS_CACHE_SIZE", 256)),
+    ) if ttl > 0 else None
+    page_cache.subscribe(_on_invalidate)
@@ -0,0 +1,355 @@
+# app/retention.py
+"""
+Retención de LoginLog y ActivityLog: resúmenes diarios, archivo y purga.
+
+- Resúmenes (rollup): por cada día completo, LoginDaily (inicios de sesión y
+  usuarios distintos) y ActionDaily (acciones por tipo y entidad). Se calculan una
+  vez desde las filas crudas y es lo que lee el dashboard para el histórico.
+- Compactación (compact): las filas más viejas que la ventana de retención
+  (LOGIN_LOG_RETENTION_DAYS / ACTIVITY_LOG_RETENTION_DAYS) se exportan a JSONL
+  comprimido, un archivo por tabla y mes (LOG_ARCHIVE_DIR/login_log-2025-01.jsonl.gz),
+  y después se borran. Por tandas de LOG_COMPACT_CHUNK filas con su commit; cada
+  tanda se escribe (y fsync) ANTES de borrarla. Si el proceso cae entre ambos pasos,
+  la siguiente pasada vuelve a exportar esas filas: al leer el archivo, deduplicar
+  por `id`. Nunca se purga un día que aún no tiene resumen.
+- Postgres con particiones (scripts/partition_logs.py): tablas particionadas por
+  mes (<tabla>_pYYYYMM) más una DEFAULT (<tabla>_default) que recoge lo que no
+  tenga mes creado, para que un INSERT nunca falle. `ensure_partitions` crea las de
+  los próximos meses (moviendo a su mes lo que haya caído en DEFAULT) y la
+  compactación exporta y elimina (DETACH + DROP) particiones completas en vez de
+  borrar filas: sin DELETE masivo ni VACUUM posterior. En SQLite (o Postgres sin
+  particionar) se borra por tandas de ids.
+
+Particiones y resúmenes los mantiene la tarea "logs" (app/workers.py, una vez al día
+por proceso) y también scripts/migrate_db.py; el archivo y la purga, que escriben
+en LOG_ARCHIVE_DIR, solo scripts/compact_logs.py (cron diario).
+"""
+import gzip
+import json
+import os
+from datetime import date, datetime, time, timedelta
+from flask import current_app
+from sqlalchemy import select, delete, func, text, distinct, table, column
+from sqlalchemy.exc import IntegrityError
+from .models import db, LoginLog, ActivityLog, LoginDaily, ActionDaily
+from .workers import register_task
+
+RETENTION_KEYS = {
+    LoginLog: "LOGIN_LOG_RETENTION_DAYS",
+    ActivityLog: "ACTIVITY_LOG_RETENTION_DAYS",
+}
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+# -------------------------
+# Resúmenes diarios
+# -------------------------
+
+def rollup_day(day: date):
+    """(Re)calcula los resúmenes de `day` desde las filas crudas. NO hace commit."""
+    start, end = _day_start(day), _day_start(day + timedelta(days=1))
+    logins, active = db.session.execute(
+        select(func.count(), func.count(distinct(LoginLog.user_id)))
+        .where(LoginLog.created_at >= start, LoginLog.created_at < end)
+    ).one()
+    actions = db.session.execute(
+        select(ActivityLog.action, ActivityLog.entity, func.count())
+        .where(ActivityLog.created_at >= start, ActivityLog.created_at < end)
+        .group_by(ActivityLog.action, ActivityLog.entity)
+    ).all()
+
+    db.session.execute(delete(LoginDaily).where(LoginDaily.day == day))
+    db.session.execute(delete(ActionDaily).where(ActionDaily.day == day))
+    db.session.add(LoginDaily(day=day, logins=logins, active_users=active))
+    counts = {}
+    for action, entity, n in actions:
+        key = (action or "", entity or "")
+        counts[key] = counts.get(key, 0) + n
+    db.session.add_all(
+        ActionDaily(day=day, action=action, entity=entity, count=n) for (action, entity), n in counts.items()
+    )
+
+
+def last_rolled_day():
+    return db.session.execute(select(func.max(LoginDaily.day))).scalar()
+
+
+def rollup(today: date | None = None, max_days: int = 92) -> int:
+    """Resume los días completos (hasta ayer) que aún no tienen resumen. Devuelve cuántos."""
+    today = today or datetime.utcnow().date()
+    last = last_rolled_day()
+    if last is None:
+        firsts = [
+            db.session.execute(select(func.min(model.created_at))).scalar()
+            for model in (LoginLog, ActivityLog)
+        ]
+        firsts = [f for f in firsts if f is not None]
+        if not firsts:
+            return 0
+        day = min(firsts).date()
+    else:
+        day = last + timedelta(days=1)
+
+    done = 0
+    while day < today and done < max_days:
+        rollup_day(day)
+        db.session.commit()
+        day += timedelta(days=1)
+        done += 1
+    return done
+
+
+def recent_activity(days: int = 14, today: date | None = None) -> list[dict]:
+    """Últimos `days` días resumidos (más reciente primero), para el dashboard."""
+    today = today or datetime.utcnow().date()
+    since = today - timedelta(days=days)
+    logins = {
+        d.day: d for d in db.session.execute(
+            select(LoginDaily).where(LoginDaily.day >= since).order_by(LoginDaily.day.desc())
+        ).scalars()
+    }
+    actions = dict(db.session.execute(
+        select(ActionDaily.day, func.sum(ActionDaily.count))
+        .where(ActionDaily.day >= since).group_by(ActionDaily.day)
+    ).all())
+    return [
+        {
+            "day": day,
+            "logins": logins[day].logins if day in logins else 0,
+            "active_users": logins[day].active_users if day in logins else 0,
+            "actions": int(actions.get(day) or 0),
+        }
+        for day in sorted(set(logins) | set(actions), reverse=True)
+    ]
+
+
+# -------------------------
+# Archivo (JSONL.gz) y purga
+# -------------------------
+
+def archive_dir() -> str:
+    path = current_app.config.get("LOG_ARCHIVE_DIR") or os.path.join(current_app.instance_path, "archive")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _export(table_name: str, rows, directory: str) -> int:
+    """Añade `rows` (mappings) a los archivos del mes de cada fila. gzip admite append."""
+    by_month = {}
+    for row in rows:
+        month = row["created_at"].strftime("%Y-%m")
+        by_month.setdefault(month, []).append(json.dumps(dict(row), default=_json_default, ensure_ascii=False))
+    for month, lines in by_month.items():
+        path = os.path.join(directory, f"{table_name}-{month}.jsonl.gz")
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="ab") as gz:
+                gz.write(("\n".join(lines) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+    return sum(len(lines) for lines in by_month.values())
+
+
+def purge_limit(model, today: date | None = None) -> datetime:
+    """Fecha antes de la cual se puede purgar: la ventana de retención, sin pasar del último día resumido."""
+    today = today or datetime.utcnow().date()
+    days = max(1, int(current_app.config.get(RETENTION_KEYS[model], 365)))
+    limit = today - timedelta(days=days)
+    last = last_rolled_day()
+    if last is None:
+        return _day_start(date.min)  # nada resumido: no se purga nada
+    return _day_start(min(limit, last + timedelta(days=1)))
+
+
+def _compact_rows(model, limit: datetime, directory: str, chunk: int, dry_run: bool) -> int:
+    tbl = model.__table__
+    old = tbl.c.created_at < limit
+    if dry_run:
+        return db.session.execute(select(func.count()).select_from(tbl).where(old)).scalar()
+    total = 0
+    while True:
+        # Orden del índice (created_at, id): recorre solo la parte vieja
+        rows = db.session.execute(
+            select(tbl).where(old).order_by(tbl.c.created_at, tbl.c.id).limit(chunk)
+        ).mappings().all()
+        if not rows:
+            return total
+        _export(tbl.name, rows, directory)
+        db.session.execute(delete(tbl).where(tbl.c.id.in_([r["id"] for r in rows])))
+        db.session.commit()
+        total += len(rows)
+
+
+# -------------------------
+# Postgres: particiones mensuales
+# -------------------------
+
+def is_partitioned(table_name: str) -> bool:
+    if db.engine.dialect.name != "postgresql":
+        return False
+    kind = db.session.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :t AND relkind IN ('p', 'r')"), {"t": table_name}
+    ).scalar()
+    return kind == "p"
+
+
+def partition_name(table_name: str, month: date) -> str:
+    return f"{table_name}_p{month:%Y%m}"
+
+
+def default_partition_name(table_name: str) -> str:
+    return f"{table_name}_default"
+
+
+def list_partitions(table_name: str) -> list[tuple[str, date]]:
+    """Particiones mensuales (nombre, primer día del mes), de la más vieja a la más nueva."""
+    names = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :t"
+    ), {"t": table_name}).scalars().all()
+    prefix = f"{table_name}_p"
+    months = []
+    for name in names:
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            months.append((name, date(int(suffix[:4]), int(suffix[4:]), 1)))
+    return sorted(months, key=lambda item: item[1])
+
+
+def ensure_partitions(table_name: str, today: date | None = None, ahead: int = 2) -> list[str]:
+    """
+    Crea la partición DEFAULT (si falta) y las del mes actual y los `ahead` siguientes.
+    Si DEFAULT ya tiene filas de un mes nuevo (la tarea no corrió a tiempo), la
+    partición se crea aparte, recibe esas filas y se adjunta. Hace commit.
+    """
+    default = default_partition_name(table_name)
+    db.session.execute(text(f'CREATE TABLE IF NOT EXISTS "{default}" PARTITION OF "{table_name}" DEFAULT'))
+    month = month_start(today or datetime.utcnow().date())
+    created = []
+    existing = {name for name, _month in list_partitions(table_name)}
+    for _ in range(ahead + 1):
+        name = partition_name(table_name, month)
+        if name not in existing:
+            lower, upper = month.isoformat(), next_month(month).isoformat()
+            bounds = f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            in_month = f"created_at >= '{lower}' AND created_at < '{upper}'"
+            stray = db.session.execute(text(f'SELECT 1 FROM "{default}" WHERE {in_month} LIMIT 1')).first()
+            if stray is None:
+                db.session.execute(text(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table_name}" {bounds}'))
+            else:
+                db.session.execute(text(f'CREATE TABLE "{name}" (LIKE "{table_name}" INCLUDING DEFAULTS)'))
+                db.session.execute(text(
+                    f'WITH moved AS (DELETE FROM "{default}" WHERE {in_month} RETURNING *) '
+                    f'INSERT INTO "{name}" SELECT * FROM moved'
+                ))
+                db.session.execute(text(f'ALTER TABLE "{table_name}" ATTACH PARTITION "{name}" {bounds}'))
+            created.append(name)
+        month = next_month(month)
+    db.session.commit()
+    return created
+
+
+def _compact_partitions(model, limit: datetime, directory: str, chunk: int, dry_run: bool) -> int:
+    """Exporta y elimina las particiones que terminan antes de `limit` (mes completo)."""
+    table_name = model.__tablename__
+    total = 0
+    for name, month in list_partitions(table_name):
+        if _day_start(next_month(month)) > limit:
+            break
+        part = table(name, *(column(c.name) for c in model.__table__.columns))
+        if dry_run:
+            total += db.session.execute(select(func.count()).select_from(part)).scalar()
+            continue
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(part).where(part.c.id > last_id).order_by(part.c.id).limit(chunk)
+            ).mappings().all()
+            if not rows:
+                break
+            _export(table_name, rows, directory)
+            last_id = rows[-1]["id"]
+            total += len(rows)
+        db.session.execute(text(f'ALTER TABLE "{table_name}" DETACH PARTITION "{name}"'))
+        db.session.execute(text(f'DROP TABLE "{name}"'))
+        db.session.commit()
+        current_app.logger.info("[retention] partición %s archivada y eliminada", name)
+    return total
+
+
+def compact(model, today: date | None = None, dry_run: bool = False) -> int:
+    """Archiva y purga las filas de `model` fuera de la ventana de retención. Devuelve cuántas."""
+    limit = purge_limit(model, today)
+    directory = None if dry_run else archive_dir()
+    chunk = int(current_app.config.get("LOG_COMPACT_CHUNK", 5000))
+    if is_partitioned(model.__tablename__):
+        return _compact_partitions(model, limit, directory, chunk, dry_run)
+    return _compact_rows(model, limit, directory, chunk, dry_run)
+
+
+def read_archive(path: str):
+    """Itera las filas de un archivo exportado, sin duplicados por `id`."""
+    seen = set()
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row["id"] in seen:
+                continue
+            seen.add(row["id"])
+            yield row
+
+
+# -------------------------
+# Tarea "logs"
+# -------------------------
+
+_maintained_day = None  # último día con particiones y resúmenes al día en este proceso
+
+
+def maintain_logs(today: date | None = None, force: bool = False) -> dict:
+    """
+    Particiones de los próximos meses (Postgres particionado) y resúmenes diarios
+    pendientes, una vez al día por proceso (o `force`). Con varios procesos a la
+    vez, si otro resume el mismo día primero, esta pasada lo deja para la siguiente.
+    """
+    global _maintained_day
+    today = today or datetime.utcnow().date()
+    if _maintained_day == today and not force:
+        return {"partitions": [], "days": 0}
+
+    partitions = []
+    for model in (LoginLog, ActivityLog):
+        if is_partitioned(model.__tablename__):
+            partitions += ensure_partitions(model.__tablename__, today)
+    try:
+        days = rollup(today)
+    except IntegrityError:
+        db.session.rollback()
+        return {"partitions": partitions, "days": 0}
+    if partitions or days:
+        current_app.logger.info("[retention] %s particiones nuevas, %s días resumidos", len(partitions), days)
+    if not days or last_rolled_day() >= today - timedelta(days=1):
+        _maintained_day = today  # si quedan días atrasados (máx. 92 por pasada), sigue en la próxima
+    return {"partitions": partitions, "days": days}
+
+
+register_task("logs", maintain_logs, "LOG_MAINTENANCE_INTERVAL", 600)
@@ -0,0 +1,226 @@
+# app/search.py
+"""
+Búsqueda de texto completo para la home pública (main.index).
+
+- SQLite: tabla virtual FTS5 `service_fts` mantenida por triggers sobre `service`
+  (solo contiene servicios visibles: aprobados, activos y no eliminados).
+- Postgres: índice GIN sobre una expresión `to_tsvector(...)` de la columna normalizada
+  (parcial, mismo predicado) + índices trigram para los LIKE sobre columnas *_norm.
+
+Si el índice no existe (BD antigua sin migrar) se cae a LIKE sobre `search_norm`.
+Las búsquedas son insensibles a tildes y mayúsculas (ver app/normalize.py).
+"""
+import re
+from sqlalchemy import text, table, column, literal_column, func, or_, and_
+from .models import db, Service, ServiceStatus
+from .normalize import fold
+
+SEARCH_MAX_TERMS = 8
+
+# Predicado de visibilidad pública (debe coincidir con el de los triggers / índice parcial)
+_SQLITE_VISIBLE_SQL = "coalesce(is_deleted, 0) = 0 AND is_active = 1 AND status = 'APPROVED'"
+_PG_VISIBLE_SQL = "is_deleted = false AND is_active = true AND status = 'APPROVED'"
+
+# Expresión indexada en Postgres (el planner la compara con la del índice).
+# 'simple': el texto ya viene plegado y sin tildes, sin stemming (igual que FTS5).
+PG_TSVECTOR_SQL = "to_tsvector('simple', coalesce(search_norm, ''))"
+
+# Índices trigram (pg_trgm) para LIKE '%...%' sobre columnas normalizadas
+_PG_TRGM_INDEXES = {
+    "ix_user_name_norm_trgm": ('"user"', "name_norm"),
+    "ix_user_email_trgm": ('"user"', "email"),
+    "ix_service_search_norm_trgm": ("service", "search_norm"),
+    "ix_classified_search_norm_trgm": ("classified", "search_norm"),
+}
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS service_fts USING fts5(
+        title, description, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS service_fts_ai AFTER INSERT ON service
+    WHEN coalesce(new.is_deleted, 0) = 0 AND new.is_active = 1 AND new.status = 'APPROVED'
+    BEGIN
+        INSERT INTO service_fts(rowid, title, description)
+        VALUES (new.id, new.title, coalesce(new.description, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS service_fts_ad AFTER DELETE ON service
+    BEGIN
+        DELETE FROM service_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS service_fts_au
+    AFTER UPDATE OF title, description, status, is_active, is_deleted ON service
+    BEGIN
+        DELETE FROM service_fts WHERE rowid = old.id;
+        INSERT INTO service_fts(rowid, title, description)
+        SELECT new.id, new.title, coalesce(new.description, '')
+        WHERE coalesce(new.is_deleted, 0) = 0 AND new.is_active = 1 AND new.status = 'APPROVED';
+    END
+    """,
+]
+
+# Cache por URL de engine: ¿existe el índice FTS? (evita consultar el catálogo por request)
+_fts_ready = {}
+
+
+def _dialect() -> str:
+    return db.engine.dialect.name
+
+
+def _terms(q: str) -> list[str]:
+    """Tokeniza la búsqueda en palabras plegadas (sin operadores ni comillas del usuario)."""
+    return re.findall(r"\w+", fold(q))[:SEARCH_MAX_TERMS]
+
+
+def normalized_match(q: str, *columns):
+    """
+    Filtro compartido (main.index, admin.users): `col LIKE '%q%'` sobre columnas
+    ya normalizadas, con la consulta plegada igual. Sin funciones por fila.
+    `%` y `_` de la consulta se escapan: buscan el carácter, no cualquiera.
+    """
+    value = fold(q).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    like = f"%{value}%"
+    return or_(*(col.like(like, escape="\\") for col in columns))
+
+
+def prefix_match(q: str, *columns):
+    """
+    `col >= q AND col < q + U+FFFF` (equivale a `LIKE 'q%'`): usa el índice B-tree
+    de la columna en SQLite y Postgres, a diferencia de LIKE. Para columnas ya en
+    minúsculas/plegadas (name_norm, email).
+    """
+    value = fold(q)
+    return or_(*(and_(col >= value, col < value + "\uffff") for col in columns))
+
+
+# -------------------------
+# Esquema (migración / init)
+# -------------------------
+
+def ensure_search_schema(rebuild: bool = False):
+    """
+    Crea (idempotente) el índice de texto completo del backend actual.
+    En SQLite, si la tabla FTS es nueva o `rebuild=True`, la repuebla desde `service`.
+    """
+    dialect = _dialect()
+    if dialect == "sqlite":
+        exists = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'service_fts'")
+        ).first()
+        for ddl in _SQLITE_DDL:
+            db.session.execute(text(ddl))
+        if rebuild or not exists:
+            rebuild_search_index()
+    elif dialect == "postgresql":
+        db.session.execute(text("DROP INDEX IF EXISTS ix_service_fts"))  # versión sin normalizar
+        db.session.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_service_fts_norm ON service USING gin ({PG_TSVECTOR_SQL}) "
+            f"WHERE {_PG_VISIBLE_SQL}"
+        ))
+        db.session.commit()
+        try:
+            db.session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for name, (tbl, col) in _PG_TRGM_INDEXES.items():
+                db.session.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {name} ON {tbl} USING gin ({col} gin_trgm_ops)"
+                ))
+        except Exception as e:
+            db.session.rollback()
+            print(f"[warn] pg_trgm no disponible, LIKE sobre *_norm sin índice: {e}")
+    db.session.commit()
+    _fts_ready.pop(str(db.engine.url), None)
+
+
+def rebuild_search_index():
+    """Repuebla `service_fts` (solo SQLite; en Postgres el índice es de expresión)."""
+    if _dialect() != "sqlite":
+        return
+    db.session.execute(text("DELETE FROM service_fts"))
+    db.session.execute(text(
+        "INSERT INTO service_fts(rowid, title, description) "
+        "SELECT id, title, coalesce(description, '') FROM service "
+        f"WHERE {_SQLITE_VISIBLE_SQL}"
+    ))
+
+
+def fts_available() -> bool:
+    key = str(db.engine.url)
+    if key not in _fts_ready:
+        dialect = _dialect()
+        if dialect == "sqlite":
+            _fts_ready[key] = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'service_fts'")
+            ).first() is not None
+        else:
+            _fts_ready[key] = dialect == "postgresql"
+    return _fts_ready[key]
+
+
+# -------------------------
+# Consultas
+# -------------------------
+
+def _visible_services():
+    return Service.query.filter(
+        Service.is_deleted == False,
+        Service.is_active == True,
+        Service.status == ServiceStatus.APPROVED.value
+    )
+
+
+def ilike_search(q: str, limit: int = 24):
+    """Ruta LIKE '%q%' sobre `search_norm` (fallback y referencia para el benchmark)."""
+    return (
+        _visible_services()
+        .filter(normalized_match(q, Service.search_norm))
+        .order_by(Service.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def fts_search(q: str, limit: int = 24):
+    """Búsqueda por índice de texto completo, ordenada por relevancia."""
+    terms = _terms(q)
+    if not terms:
+        return []
+
+    if _dialect() == "sqlite":
+        fts = table("service_fts", column("rowid"))
+        # Cada término como prefijo ("plom"* encuentra "plomería"); AND implícito
+        match = " ".join(f'"{t}"*' for t in terms)
+        return (
+            _visible_services()
+            .join(fts, fts.c.rowid == Service.id)
+            .filter(literal_column("service_fts").op("MATCH")(match))
+            # bm25: menor = más relevante; el título pesa más que la descripción
+            .order_by(literal_column("bm25(service_fts, 10.0, 1.0)"), Service.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+
+    vector = literal_column(PG_TSVECTOR_SQL)
+    query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{t}:*" for t in terms))
+    return (
+        _visible_services()
+        .filter(vector.op("@@")(query))
+        .order_by(func.ts_rank_cd(vector, query).desc(), Service.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def search_services(q: str, limit: int = 24):
+    """Punto de entrada usado por main.index."""
+    q = (q or "").strip()
+    if not q:
+        return []
+    if fts_available():
+        return fts_search(q, limit=limit)
+    return ilike_search(q, limit=limit)
@@ -2,6 +2,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
 from .models import db, Service, ServiceStatus, User
+from .page_cache import cached_page, tag_page
 from .utils import log_action
 
 services_bp = Blueprint("services", __name__)
@@ -34,7 +35,11 @@ def create_service():
 
         owner_id = current_user.id
         if _is_admin():
-            owner_id = int(request.form.get("owner_id", current_user.id))
+            owner = db.session.get(User, request.form.get("owner_id", type=int) or 0)
+            if owner is None or owner.is_deleted:
+                flash("Propietario no válido.", "danger")
+                return render_template("services/create.html", is_admin=True)
+            owner_id = owner.id
 
         if _is_admin():
             contact_name = request.form.get("contact_name","").strip()
@@ -47,11 +52,7 @@ def create_service():
 
         if not title:
             flash("El título es obligatorio.", "danger")
-            return render_template(
-                "services/create.html",
-                is_admin=_is_admin(),
-                users=User.query.filter_by(is_deleted=False).all()
-            )
+            return render_template("services/create.html", is_admin=_is_admin())
 
         s = Service(
             title=title,
@@ -66,20 +67,20 @@ def create_service():
             status=ServiceStatus.PENDING.value,
             is_active=False
         )
-        db.session.add(s); db.session.commit()
+        db.session.add(s)
+        db.session.flush()  # asigna id para la auditoría
         log_action(current_user, "create", "Service", s.id, "")
+        db.session.commit()
         flash("Servicio creado. Quedó pendiente de aprobación.", "success")
         return redirect(url_for("services.my_services"))
 
-    return render_template(
-        "services/create.html",
-        is_admin=_is_admin(),
-        users=User.query.filter_by(is_deleted=False).all()
-    )
+    return render_template("services/create.html", is_admin=_is_admin())
 
 @services_bp.route("/detail/<int:service_id>")
+@cached_page("service:{service_id}")
 def detail(service_id):
     s = Service.query.get_or_404(service_id)
+    tag_page(f"owner:{s.owner_id}")
     # público solo si aprobado y activo; el dueño/adm pueden verlo igual
     if not s.is_deleted and (s.is_active and s.status==ServiceStatus.APPROVED.value or (current_user.is_authenticated and (current_user.id==s.owner_id or _is_admin()))):
         return render_template("services/detail.html", s=s)
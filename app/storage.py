@@ -0,0 +1,222 @@
+# app/storage.py
+"""
+Almacenamiento de archivos subidos (avatares) detrás de una interfaz común.
+
+Claves con prefijo: "avatars/user3_ab12cd_512.jpg".
+
+Backends (STORAGE_BACKEND):
+  - "local"  : directorio STORAGE_LOCAL_ROOT (por defecto el padre de AVATAR_UPLOAD_DIR,
+               así "avatars/x" = AVATAR_UPLOAD_DIR/x). Escritura atómica (tmp + rename).
+  - "s3"     : S3 o compatible (MinIO, R2...) con S3_ENDPOINT_URL. Requiere `boto3`
+               (opcional: solo se importa con este backend). `url()` devuelve una URL
+               firmada (o S3_PUBLIC_BASE_URL/clave si el bucket/CDN es público) y
+               /media redirige ahí: el worker no transfiere los bytes.
+  - "memory" : dict en memoria del proceso (desarrollo y scripts/check_storage.py).
+
+Todos leen/escriben por bloques: `put` consume un file-like y `open` devuelve uno.
+Migración entre backends: scripts/migrate_storage.py.
+"""
+import hashlib
+import io
+import os
+import tempfile
+from datetime import datetime, timezone
+from flask import current_app
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class StorageError(RuntimeError):
+    pass
+
+
+def _copy(src, dst):
+    while True:
+        chunk = src.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        dst.write(chunk)
+
+
+class LocalStorage:
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        full = os.path.abspath(os.path.join(self.root, key))
+        if not full.startswith(os.path.abspath(self.root) + os.sep):
+            raise StorageError(f"clave fuera del almacenamiento: {key}")
+        return full
+
+    def put(self, key: str, fileobj, content_type: str | None = None):
+        dest = self.path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".put-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                _copy(fileobj, out)
+            os.replace(tmp, dest)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def open(self, key: str):
+        try:
+            return open(self.path(key), "rb")
+        except FileNotFoundError:
+            return None
+
+    def stat(self, key: str):
+        try:
+            st = os.stat(self.path(key))
+        except (FileNotFoundError, StorageError):
+            return None
+        return {
+            "size": st.st_size,
+            "etag": f"{st.st_mtime_ns:x}-{st.st_size:x}",
+            "modified": datetime.fromtimestamp(st.st_mtime, timezone.utc),
+        }
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str = ""):
+        base = self.path(prefix) if prefix else os.path.abspath(self.root)
+        if not os.path.isdir(base):
+            return
+        for dirpath, _dirs, files in os.walk(base):
+            for name in sorted(files):
+                if name.startswith("."):
+                    continue  # temporales
+                yield os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, "/")
+
+    def url(self, key: str):
+        return None  # lo sirve /media (send_file o X-Accel-Redirect)
+
+
+class MemoryStorage:
+    name = "memory"
+
+    def __init__(self):
+        self._files = {}  # clave -> (bytes, content_type, fecha)
+
+    def put(self, key: str, fileobj, content_type: str | None = None):
+        buf = io.BytesIO()
+        _copy(fileobj, buf)
+        self._files[key] = (buf.getvalue(), content_type, datetime.now(timezone.utc))
+
+    def open(self, key: str):
+        item = self._files.get(key)
+        return io.BytesIO(item[0]) if item else None
+
+    def stat(self, key: str):
+        item = self._files.get(key)
+        if item is None:
+            return None
+        data, _ctype, modified = item
+        return {"size": len(data), "etag": hashlib.md5(data).hexdigest(), "modified": modified}
+
+    def delete(self, key: str):
+        self._files.pop(key, None)
+
+    def list(self, prefix: str = ""):
+        yield from sorted(k for k in self._files if k.startswith(prefix))
+
+    def url(self, key: str):
+        return None
+
+
+class S3Storage:
+    name = "s3"
+
+    def __init__(self, client, bucket: str, prefix: str = "", public_base_url: str = "", presign_ttl: int = 3600):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.public_base_url = public_base_url.rstrip("/")
+        self.presign_ttl = presign_ttl
+        # Cuánto puede cachear el navegador la redirección de /media
+        self.redirect_max_age = 31536000 if self.public_base_url else presign_ttl // 2
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    def put(self, key: str, fileobj, content_type: str | None = None):
+        extra = {"CacheControl": IMMUTABLE}
+        if content_type:
+            extra["ContentType"] = content_type
+        # upload_fileobj: multipart por bloques, no carga el archivo entero
+        self.client.upload_fileobj(fileobj, self.bucket, self._key(key), ExtraArgs=extra)
+
+    def open(self, key: str):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def stat(self, key: str):
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return {"size": head["ContentLength"], "etag": head["ETag"].strip('"'), "modified": head["LastModified"]}
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list(self, prefix: str = ""):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get("Contents", []):
+                yield obj["Key"][len(self.prefix):]
+
+    def url(self, key: str):
+        if self.public_base_url:
+            return f"{self.public_base_url}/{self._key(key)}"
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self._key(key)}, ExpiresIn=self.presign_ttl,
+        )
+
+
+def make_storage(config, backend: str | None = None):
+    """Construye un backend a partir de la configuración (dict o app.config)."""
+    backend = (backend or config.get("STORAGE_BACKEND") or "local").lower()
+    if backend == "local":
+        root = config.get("STORAGE_LOCAL_ROOT") or os.path.dirname(config["AVATAR_UPLOAD_DIR"].rstrip("/\\"))
+        return LocalStorage(root)
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "s3":
+        try:
+            import boto3
+        except ImportError as e:
+            raise StorageError("STORAGE_BACKEND=s3 requiere el paquete boto3 (pip install boto3)") from e
+        client = boto3.client(
+            "s3",
+            endpoint_url=config.get("S3_ENDPOINT_URL") or None,
+            region_name=config.get("S3_REGION") or None,
+            aws_access_key_id=config.get("S3_ACCESS_KEY_ID") or None,
+            aws_secret_access_key=config.get("S3_SECRET_ACCESS_KEY") or None,
+        )
+        return S3Storage(
+            client, config["S3_BUCKET"], prefix=config.get("S3_PREFIX", ""),
+            public_base_url=config.get("S3_PUBLIC_BASE_URL", ""),
+            presign_ttl=int(config.get("S3_PRESIGN_TTL", 3600)),
+        )
+    raise StorageError(f"STORAGE_BACKEND desconocido: {backend}")
+
+
+def init_app(app):
+    app.extensions["storage"] = make_storage(app.config)
+
+
+def get_storage():
+    return current_app.extensions["storage"]
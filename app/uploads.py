@@ -0,0 +1,91 @@
+# app/uploads.py
+"""
+Subidas de archivos con límites aplicados mientras se recibe el cuerpo.
+
+- UploadRequest: MAX_CONTENT_LENGTH por endpoint (UPLOAD_LIMITS) en vez de uno
+  global. Werkzeug rechaza con 413 antes de leer el cuerpo si Content-Length lo
+  supera, y corta la lectura si un cuerpo sin longitud declarada se pasa.
+  Las partes de archivo van a un temporal en disco a partir de UPLOAD_SPOOL_SIZE
+  bytes (nunca el cuerpo entero en memoria).
+- receive_upload: copia el archivo por bloques a un temporal contando bytes (corta
+  en cuanto se pasa de `max_size`) y detecta el tipo por los bytes mágicos, no por
+  la extensión. El llamador procesa el temporal y lo mueve/borra.
+"""
+import os
+import tempfile
+from flask import current_app
+from flask.wrappers import Request
+
+CHUNK_SIZE = 64 * 1024
+
+# Firmas (offset, bytes) -> tipo
+_MAGIC = (
+    ("jpeg", 0, b"\xff\xd8\xff"),
+    ("png", 0, b"\x89PNG\r\n\x1a\n"),
+    ("gif", 0, b"GIF87a"),
+    ("gif", 0, b"GIF89a"),
+    ("webp", 8, b"WEBP"),  # "RIFF" <tamaño> "WEBP"
+)
+
+# Extensiones de configuración -> tipo detectado
+KIND_BY_EXT = {"jpg": "jpeg", "jpeg": "jpeg", "png": "png", "gif": "gif", "webp": "webp"}
+
+
+class UploadError(ValueError):
+    """Subida rechazada; `reason` es "too_large" o "bad_type"."""
+
+    def __init__(self, reason: str, message: str = ""):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+def sniff_kind(head: bytes):
+    """Tipo de imagen según los primeros bytes (None si no se reconoce)."""
+    for kind, offset, signature in _MAGIC:
+        if head[offset:offset + len(signature)] == signature:
+            if kind == "webp" and not head.startswith(b"RIFF"):
+                continue
+            return kind
+    return None
+
+
+def receive_upload(file_storage, max_size: int, allowed_kinds, tmp_dir: str | None = None):
+    """
+    Copia el archivo a un temporal (en tmp_dir, para poder renombrarlo en el mismo
+    disco) y devuelve (ruta, tipo). Lanza UploadError; en ese caso no deja temporal.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            stream = file_storage.stream
+            head = stream.read(CHUNK_SIZE)
+            kind = sniff_kind(head)
+            if kind not in allowed_kinds:
+                raise UploadError("bad_type", f"tipo no permitido ({kind or 'desconocido'})")
+            size = 0
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadError("too_large", f"supera {max_size} bytes")
+                out.write(chunk)
+                chunk = stream.read(CHUNK_SIZE)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, kind
+
+
+class UploadRequest(Request):
+    @property
+    def max_content_length(self):
+        limits = current_app.config.get("UPLOAD_LIMITS") or {}
+        if self.endpoint in limits:
+            return limits[self.endpoint]
+        return current_app.config.get("MAX_CONTENT_LENGTH")
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(
+            max_size=int(current_app.config.get("UPLOAD_SPOOL_SIZE", 256 * 1024)),
+            dir=current_app.config.get("UPLOAD_TMP_DIR") or None,
+        )
@@ -0,0 +1,93 @@
+# app/user_cache.py
+"""
+user_loader de Flask-Login con caché (USER_CACHE_TTL segundos).
+
+Se cachea un dict con las columnas del usuario; en cada request se reconstruye el
+objeto y se adjunta a la sesión con `merge(load=False)` (sin SELECT). Sigue siendo
+una instancia persistente normal: se puede modificar y hacer commit.
+
+Invalidación: cualquier cambio ORM de un User (perfil, rol, verificación, borrado
+lógico o físico, login) borra su entrada tras el commit. Los UPDATE/DELETE masivos
+sobre `user` deben llamar a `invalidate_users(*ids)`.
+"""
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from . import login_manager
+from .cache import make_cache
+from .models import db, User
+
+_PENDING = "user_cache_pending"  # session.info: ids a invalidar en el commit
+
+_cache = None
+
+
+def _columns(user: User) -> dict:
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+
+def _from_columns(values: dict) -> User:
+    user = User(**values)
+    make_transient_to_detached(user)  # como recién cargado: sin cambios pendientes
+    return db.session.merge(user, load=False)
+
+
+def load_user(user_id):
+    try:
+        uid = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    values = _cache.get(uid)
+    if values is not None:
+        return _from_columns(values)
+    user = db.session.get(User, uid)
+    if user is not None:
+        _cache.set(uid, _columns(user))
+    return user
+
+
+def invalidate_users(*ids):
+    if _cache is not None:
+        _cache.delete(*ids)
+
+
+def cache_stats() -> dict:
+    return _cache.stats() if _cache is not None else {}
+
+
+# -------------------------
+# Invalidación por commit
+# -------------------------
+
+def _after_flush(session, flush_context):
+    ids = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    ids.update(
+        obj.id for obj in session.dirty
+        if isinstance(obj, User) and session.is_modified(obj, include_collections=False)
+    )
+    if ids:
+        session.info.setdefault(_PENDING, set()).update(ids)
+
+
+def _after_commit(session):
+    ids = session.info.pop(_PENDING, None)
+    if ids:
+        invalidate_users(*ids)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING, None)
+
+
+def init_app(app):
+    """Registra el user_loader y los listeners de invalidación (idempotente)."""
+    global _cache
+    _cache = make_cache(
+        app, prefix="user",
+        ttl=float(app.config.get("USER_CACHE_TTL", 30)),
+        maxsize=int(app.config.get("USER_CACHE_SIZE", 2048)),
+    )
+    login_manager.user_loader(load_user)
+    for name, fn in (("after_flush", _after_flush), ("after_commit", _after_commit),
+                     ("after_rollback", _after_rollback)):
+        if not event.contains(db.session, name, fn):
+            event.listen(db.session, name, fn)
@@ -4,9 +4,14 @@ import random
 import string
 import ipaddress
 import secrets
+from datetime import datetime
 from typing import Optional
 from flask import request, current_app
-from werkzeug.utils import secure_filename
+from sqlalchemy import insert
+from .audit import audit_writer
+from .images import render_avatar_variants, ImageError, AVATAR_SIZES
+from .storage import get_storage
+from .uploads import receive_upload, UploadError, KIND_BY_EXT
 from .models import db, ActivityLog
 
 # -------------------------
@@ -18,117 +23,90 @@ def gen_code(length: int = 6) -> str:
     alphabet = string.ascii_uppercase + string.digits
     return "".join(random.choice(alphabet) for _ in range(length))
 
-def allowed_image(filename) -> bool:
-    """Valida extensión de imagen según configuración."""
-    if not filename or "." not in filename:
-        return False
-    ext = filename.rsplit(".", 1)[1].lower()
-    allowed_cfg = current_app.config.get("ALLOWED_IMAGE_EXTENSIONS")
-    avatar_allowed = current_app.config.get("AVATAR_ALLOWED_EXT")
-    allowed = set()
-    if isinstance(allowed_cfg, (set, list, tuple)): 
-        allowed |= set(allowed_cfg)
-    if isinstance(avatar_allowed, (set, list, tuple)): 
-        allowed |= set(avatar_allowed)
-    if not allowed:
-        allowed = {"png", "jpg", "jpeg", "webp", "gif"}
-    return ext in allowed
-
 def save_avatar(file_storage, user_id: int) -> Optional[str]:
     """
-    Guarda el avatar en /static/uploads/avatars y devuelve la URL pública (/static/...).
-    Devuelve None si no se guardó (extensión/tamaño inválidos, etc.).
+    Recibe el avatar por bloques (límite AVATAR_MAX_SIZE, tipo por bytes mágicos),
+    genera sus variantes (app/images.py), las guarda en el almacenamiento
+    (app/storage.py) y devuelve la URL pública de la mayor (/media/avatars/...).
+    Devuelve None si no se guardó (tamaño o tipo inválidos, imagen ilegible, etc.).
     """
     if not file_storage or file_storage.filename == "":
         return None
 
-    # Directorio destino (con valor por defecto robusto)
-    upload_dir = current_app.config.get("AVATAR_UPLOAD_DIR")
-    if not upload_dir:
-        upload_dir = os.path.join(current_app.root_path, "static", "uploads", "avatars")
-
     max_size = int(current_app.config.get("AVATAR_MAX_SIZE", 2 * 1024 * 1024))
+    allowed_ext = current_app.config.get("AVATAR_ALLOWED_EXT") or KIND_BY_EXT.keys()
+    allowed_kinds = {KIND_BY_EXT[ext] for ext in allowed_ext if ext in KIND_BY_EXT}
 
-    # Tamaño: usa content_length si está disponible; si no, calcula con stream
-    size = getattr(file_storage, "content_length", None)
-    if not size:
-        try:
-            pos = file_storage.stream.tell()
-        except Exception:
-            pos = 0
-        try:
-            file_storage.stream.seek(0, os.SEEK_END)
-            size = file_storage.stream.tell()
-            file_storage.stream.seek(pos)
-        except Exception:
-            size = 0
-
-    if size and size > max_size:
+    try:
+        tmp_path, _kind = receive_upload(
+            file_storage, max_size, allowed_kinds, tmp_dir=current_app.config.get("UPLOAD_TMP_DIR") or None,
+        )
+    except UploadError as e:
+        current_app.logger.info("[avatar] subida rechazada (user %s): %s", user_id, e)
         return None
 
-    if not allowed_image(file_storage.filename):
+    base_name = f"user{user_id}_{secrets.token_hex(6)}"
+    try:
+        with open(tmp_path, "rb") as fh:
+            variants = render_avatar_variants(fh, base_name)
+    except ImageError as e:
+        current_app.logger.info("[avatar] imagen rechazada (user %s): %s", user_id, e)
         return None
+    finally:
+        os.remove(tmp_path)
 
-    fname = secure_filename(file_storage.filename)
-    ext = fname.rsplit(".", 1)[-1].lower()
-    rand = secrets.token_hex(6)
-    new_name = f"user{user_id}_{rand}.{ext}"
-    abs_path = os.path.join(upload_dir, new_name)
-    os.makedirs(os.path.dirname(abs_path), exist_ok=True)
-    file_storage.save(abs_path)
+    storage = get_storage()
+    for name, data, content_type in variants:
+        storage.put(f"avatars/{name}", data, content_type)
 
     # URL pública (no usamos url_for aquí para no exigir contexto)
-    #return f"/static/uploads/avatars/{new_name}"
-# ... dentro de save_avatar(...)
-    return f"/media/avatars/{new_name}"
+    return f"/media/avatars/{base_name}_{AVATAR_SIZES[-1]}.jpg"
 
 
 # -------------------------
 # Auditoría / logs
 # -------------------------
 
-def log_action(user, action: str, entity: str, entity_id: int, detail: str = ""):
-    """
-    Guarda una línea de auditoría en ActivityLog.
-    Compatibilidad:
-      - Si el modelo tiene (actor_id, meta), guardamos JSON con ip/ua/detalle.
-      - Si no, intentamos con (user_id, detail, ip, user_agent).
-    """
+def _audit_row(user, action: str, entity: str, entity_id: int, detail: str = "") -> dict:
+    """Columnas de ActivityLog (meta JSON con ip/ua/detalle)."""
     ip = get_client_ip(request) or (request.remote_addr if request else None)
     ua = request.headers.get("User-Agent") if request else None
     meta = {"detail": detail, "ip": ip, "user_agent": ua}
+    return dict(
+        actor_id=(user.id if user else None),
+        action=action,
+        entity=entity,
+        entity_id=entity_id,
+        meta=json.dumps(meta, ensure_ascii=False),
+        created_at=datetime.utcnow(),
+    )
 
-    try:
-        # Modelo moderno (actor_id + meta JSON string)
-        entry = ActivityLog(
-            actor_id=(user.id if user else None),
-            action=action,
-            entity=entity,
-            entity_id=entity_id,
-            meta=json.dumps(meta, ensure_ascii=False)
-        )
-        db.session.add(entry)
-        db.session.commit()
+def log_action(user, action: str, entity: str, entity_id: int, detail: str = ""):
+    """
+    Registra una línea de auditoría en ActivityLog. NO hace commit.
+      - AUDIT_MODE="transaction" (por defecto): se añade a la sesión y entra en el
+        commit del llamador (llamar ANTES de db.session.commit()).
+      - AUDIT_MODE="queue": se encola para el escritor por lotes (app/audit.py)
+        cuando se confirma la transacción del llamador; si se revierte, se descarta.
+    """
+    row = _audit_row(user, action, entity, entity_id, detail)
+    if current_app.config.get("AUDIT_MODE", "transaction") == "queue":
+        audit_writer.submit_on_commit([row])
+    else:
+        db.session.add(ActivityLog(**row))
+
+def log_actions(user, action: str, entity: str, entity_ids, detail: str = ""):
+    """
+    Como log_action para varias entidades: en modo "transaction" un solo INSERT
+    por lotes (executemany) dentro de la transacción del llamador. NO hace commit.
+    """
+    rows = [_audit_row(user, action, entity, entity_id, detail) for entity_id in entity_ids]
+    if not rows:
         return
-    except TypeError:
-        # Compatibilidad con modelo antiguo
-        try:
-            entry = ActivityLog(
-                user_id=(user.id if user else None),
-                action=action,
-                entity=entity,
-                entity_id=entity_id,
-                detail=detail,
-                ip=ip,
-                user_agent=ua
-            )
-            db.session.add(entry)
-            db.session.commit()
-            return
-        except Exception:
-            db.session.rollback()
-    except Exception:
-        db.session.rollback()
+    if current_app.config.get("AUDIT_MODE", "transaction") == "queue":
+        audit_writer.submit_on_commit(rows)
+    else:
+        db.session.execute(insert(ActivityLog), rows)
 
 # -------------------------
 # IP real del cliente
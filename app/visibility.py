@@ -0,0 +1,90 @@
+# app/visibility.py
+"""
+Visibilidad pública materializada de los clasificados (Classified.is_visible).
+
+Un clasificado se publica si no está eliminado, está activo y aprobado y hoy cae
+dentro de su vigencia (start_date / end_date, opcionales). En vez de evaluar esas
+condiciones (con sus OR ... IS NULL, que no usan índices) en cada request, la
+columna `is_visible` guarda el resultado y el listado público filtra solo por ella
+(índice parcial ix_classified_public):
+  - Escrituras ORM: el listener before_insert / before_update del modelo la recalcula.
+  - UPDATE masivos (app/moderation.py): la fijan en el mismo UPDATE.
+  - Fechas: la tarea "visibility" (app/workers.py) la cambia cuando llega el
+    start_date o pasa el end_date. Las fechas son por día: en cada pasada solo
+    compara el día; al cambiar (y en la primera pasada de cada proceso, que hace de
+    recuperación tras un arranque o una caída) recalcula toda la tabla con dos
+    UPDATE ... RETURNING, audita cada transición ("auto_show" / "auto_hide", sin
+    actor) e invalida las páginas cacheadas. Con varios procesos a la vez, cada fila
+    la cambia y audita solo uno (el UPDATE filtra por el valor anterior).
+"""
+from datetime import date
+from flask import current_app
+from sqlalchemy import and_, not_, or_, update
+from .models import db, Classified, ServiceStatus
+from .page_cache import invalidate_on_commit
+from .utils import log_actions
+from .workers import register_task
+
+_synced_day = None  # último día recalculado en este proceso
+
+
+def dates_clause(today: date):
+    """Vigencia en SQL (equivalente a Classified.is_currently_valid)."""
+    return and_(
+        or_(Classified.start_date.is_(None), Classified.start_date <= today),
+        or_(Classified.end_date.is_(None), Classified.end_date >= today),
+    )
+
+
+def visible_clause(today: date):
+    """Condición completa de publicación (equivalente a Classified.is_publishable)."""
+    return and_(
+        Classified.is_deleted == False,
+        Classified.is_active == True,
+        Classified.status == ServiceStatus.APPROVED.value,
+        dates_clause(today),
+    )
+
+
+def _flip(value: bool, criterion) -> list[int]:
+    return db.session.execute(
+        update(Classified).where(criterion).values(is_visible=value)
+        .returning(Classified.id).execution_options(synchronize_session=False)
+    ).scalars().all()
+
+
+def sync_visibility(today: date | None = None, force: bool = False) -> dict:
+    """
+    Alinea is_visible con la vigencia de `today` si el día cambió desde la última
+    pasada (o `force`). Devuelve {"shown": [ids], "hidden": [ids]}. Hace commit.
+    """
+    global _synced_day
+    today = today or date.today()
+    if _synced_day == today and not force:
+        return {"shown": [], "hidden": []}
+
+    should = visible_clause(today)
+    shown = _flip(True, and_(Classified.is_visible.isnot(True), should))
+    hidden = _flip(False, and_(Classified.is_visible == True, not_(should)))
+    if shown or hidden:
+        log_actions(None, "auto_show", "Classified", shown, f"vigencia {today}")
+        log_actions(None, "auto_hide", "Classified", hidden, f"vigencia {today}")
+        invalidate_on_commit("classifieds", *(f"classified:{i}" for i in shown + hidden))
+        current_app.logger.info("[visibility] %s: %s publicados, %s retirados", today, len(shown), len(hidden))
+    db.session.commit()
+    _synced_day = today
+    return {"shown": shown, "hidden": hidden}
+
+
+def backfill_visibility() -> int:
+    """Rellena is_visible donde es NULL (filas anteriores a la columna), sin auditar."""
+    res = db.session.execute(
+        update(Classified).where(Classified.is_visible.is_(None))
+        .values(is_visible=visible_clause(date.today()))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return res.rowcount
+
+
+register_task("visibility", sync_visibility, "CLASSIFIED_VISIBILITY_INTERVAL", 60)
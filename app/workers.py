@@ -0,0 +1,93 @@
+# app/workers.py
+"""
+Tareas periódicas en segundo plano (cola de correo, etc.).
+
+Cada módulo registra sus tareas con `register_task(nombre, fn, intervalo)`.
+Se pueden ejecutar de dos formas:
+  - Dentro de cada proceso web: BACKGROUND_WORKERS="mail,..." arranca un hilo por
+    tarea en el primer request de cada proceso (compatible con el fork de gunicorn).
+  - En un proceso aparte: `python scripts/run_workers.py` (BACKGROUND_WORKERS vacío).
+Las tareas deben ser seguras con varios procesos a la vez (reclamar filas, no asumir
+exclusividad).
+"""
+import os
+import threading
+import time
+
+# nombre -> (fn, clave de config del intervalo, intervalo por defecto en segundos)
+_TASKS = {}
+_started = {}  # pid -> {nombre: hilo}
+_lock = threading.Lock()
+
+
+def register_task(name: str, fn, interval_key: str, default_interval: float):
+    """`fn()` se ejecuta dentro de un app context cada `config[interval_key]` segundos."""
+    _TASKS[name] = (fn, interval_key, default_interval)
+
+
+def task_interval(app, name: str) -> float:
+    _, key, default = _TASKS[name]
+    return float(app.config.get(key, default))
+
+
+def run_task_once(app, name: str):
+    fn = _TASKS[name][0]
+    with app.app_context():
+        from .models import db
+        try:
+            fn()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("[worker] la tarea %s falló", name)
+        finally:
+            db.session.remove()
+
+
+def _loop(app, name: str):
+    while True:
+        run_task_once(app, name)
+        time.sleep(task_interval(app, name))
+
+
+def configured_tasks(app) -> list[str]:
+    raw = app.config.get("BACKGROUND_WORKERS") or ""
+    names = [n.strip() for n in raw.split(",") if n.strip()]
+    return [n for n in names if n in _TASKS]
+
+
+def start_inprocess(app):
+    """Arranca (una vez por proceso) los hilos de BACKGROUND_WORKERS."""
+    pid = os.getpid()
+    if pid in _started:
+        return
+    with _lock:
+        if pid in _started:
+            return
+        threads = {}
+        for name in configured_tasks(app):
+            t = threading.Thread(target=_loop, args=(app, name), name=f"worker-{name}", daemon=True)
+            t.start()
+            threads[name] = t
+        _started[pid] = threads
+
+
+def init_app(app):
+    if not (app.config.get("BACKGROUND_WORKERS") or "").strip():
+        return
+
+    @app.before_request
+    def _start_background_workers():
+        start_inprocess(app)
+
+
+def run_forever(app, names=None):
+    """Bucle en primer plano para scripts/run_workers.py (Ctrl+C para salir)."""
+    names = names or list(_TASKS)
+    next_run = {name: 0.0 for name in names}
+    while True:
+        now = time.monotonic()
+        for name in names:
+            if now >= next_run[name]:
+                run_task_once(app, name)
+                next_run[name] = time.monotonic() + task_interval(app, name)
+        time.sleep(max(0.05, min(next_run.values()) - time.monotonic()))
@@ -0,0 +1,86 @@
+# scripts/backfill_avatars.py
+"""
+Genera las variantes (24/120/512 px, WebP + JPEG, sin EXIF) de los avatares subidos
+antes del procesado de imágenes y actualiza User.avatar_url. Idempotente: los
+usuarios que ya apuntan a una variante se saltan.
+
+Uso:
+(.venv) > python scripts/backfill_avatars.py
+(.venv) > python scripts/backfill_avatars.py --dry-run
+(.venv) > python scripts/backfill_avatars.py --delete-originals   # borra los archivos crudos
+"""
+
+import argparse
+import io
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+
+from app import create_app, db  # noqa: E402
+from app.images import render_avatar_variants, has_variants, ImageError, AVATAR_SIZES  # noqa: E402
+from app.storage import get_storage  # noqa: E402
+from app.models import User  # noqa: E402
+
+MEDIA_PREFIXES = ("/media/avatars/", "/static/uploads/avatars/")
+
+
+def _local_name(url: str):
+    for prefix in MEDIA_PREFIXES:
+        if url.startswith(prefix):
+            return url[len(prefix):]
+    return None  # URL externa: no se toca
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de variantes de avatar")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--delete-originals", action="store_true")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        storage = get_storage()
+        done = skipped = failed = 0
+        users = User.query.filter(User.avatar_url.isnot(None), User.avatar_url != "").order_by(User.id).all()
+        for u in users:
+            name = _local_name(u.avatar_url)
+            if has_variants(u.avatar_url) or not name:
+                skipped += 1
+                continue
+            key = f"avatars/{name}"
+            original = storage.open(key)
+            if original is None:
+                print(f"[avatar] user {u.id}: falta {key}")
+                failed += 1
+                continue
+            base_name = os.path.splitext(name)[0]
+            if args.dry_run:
+                original.close()
+                print(f"[avatar] user {u.id}: {name} -> {base_name}_<{'|'.join(map(str, AVATAR_SIZES))}>")
+                done += 1
+                continue
+            try:
+                with original:
+                    # PIL necesita seek(): los cuerpos de S3 no lo tienen
+                    variants = render_avatar_variants(io.BytesIO(original.read()), base_name)
+            except ImageError as e:
+                print(f"[avatar] user {u.id}: {name} ilegible ({e})")
+                failed += 1
+                continue
+            for variant, data, content_type in variants:
+                storage.put(f"avatars/{variant}", data, content_type)
+            u.avatar_url = f"/media/avatars/{base_name}_{AVATAR_SIZES[-1]}.jpg"
+            db.session.commit()
+            if args.delete_originals:
+                storage.delete(key)
+            done += 1
+        print(f"[ok] {done} procesados, {skipped} sin cambios, {failed} con error.")
+
+
+if __name__ == "__main__":
+    main()
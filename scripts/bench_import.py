@@ -0,0 +1,133 @@
+# scripts/bench_import.py
+"""
+Benchmark de la importación masiva (app/imports.py) frente al alta fila a fila
+(lo que hace services.create_service: add + flush + auditoría por fila).
+
+Crea una base SQLite temporal (o usa BENCH_DATABASE_URL), siembra propietarios,
+genera un CSV de N filas (~2% duplicadas, ~1% con errores) y mide: simulación,
+importación real, reimportación (todo duplicado) y el alta fila a fila sobre una
+muestra (--baseline), extrapolada a N.
+
+Uso:
+(.venv) > python scripts/bench_import.py --rows 100000 --baseline 2000
+"""
+
+import argparse
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_import_")
+os.environ["DATABASE_URL"] = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+)
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+os.environ["BACKGROUND_WORKERS"] = ""
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Service, ServiceStatus  # noqa: E402
+from app.imports import import_listings, read_rows  # noqa: E402
+from app.search import ensure_search_schema  # noqa: E402
+from app.utils import log_action  # noqa: E402
+
+WORDS = (
+    "plomería electricista clases inglés envíos mudanzas abogado contador peluquería "
+    "restaurante empanadas arepas panadería fotografía diseño web jardinería limpieza"
+).split()
+FIELDS = ("owner_email", "title", "description", "website", "contact_name", "contact_email", "contact_phone")
+
+
+def seed_owners(n: int) -> list[str]:
+    emails = [f"socio{i}@bench.local" for i in range(n)]
+    db.session.execute(User.__table__.insert(), [
+        dict(name=f"Socio {i}", email=e, name_norm=f"socio {i}", password_hash="x", role="user",
+             is_verified=True, is_deleted=False)
+        for i, e in enumerate(emails)
+    ])
+    db.session.commit()
+    return emails
+
+
+def write_csv(path: str, rows: int, owners: list[str], offset: int = 0):
+    rnd = random.Random(42 + offset)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(FIELDS)
+        for i in range(offset, offset + rows):
+            n = rnd.randrange(i + 1) if rnd.random() < 0.02 else i  # ~2% repite una fila anterior
+            title = f"{' '.join(rnd.sample(WORDS, 2)).capitalize()} {n}"
+            owner = owners[n % len(owners)] if rnd.random() > 0.01 else "nadie@bench.local"
+            writer.writerow([owner, title, " ".join(rnd.choice(WORDS) for _ in range(20)),
+                             f"https://ej{n}.local", f"Contacto {n}", f"contacto{n}@bench.local", "555-0100"])
+
+
+def row_by_row(path: str) -> int:
+    """Alta como en services.create_service: consulta de propietario, add, flush, auditoría."""
+    done = 0
+    with open(path, newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            owner = User.query.filter_by(email=row["owner_email"]).first()
+            if owner is None:
+                continue
+            s = Service(title=row["title"], description=row["description"], website=row["website"],
+                        owner_id=owner.id, contact_name=row["contact_name"],
+                        contact_email=row["contact_email"], contact_phone=row["contact_phone"],
+                        status=ServiceStatus.PENDING.value, is_active=False)
+            db.session.add(s)
+            db.session.flush()
+            log_action(owner, "create", "Service", s.id, "")
+            db.session.commit()
+            done += 1
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de importación masiva")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--owners", type=int, default=2000)
+    parser.add_argument("--baseline", type=int, default=2000, help="Filas para el alta fila a fila (0 = omitir)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.test_request_context():
+        db.drop_all()
+        db.create_all()
+        ensure_search_schema()  # los triggers FTS forman parte del coste real de insertar
+        owners = seed_owners(args.owners)
+        path = os.path.join(_tmpdir, "import.csv")
+        write_csv(path, args.rows, owners)
+        print(f"[bench] {args.rows} filas, {os.path.getsize(path) / 1e6:.1f} MB ({db.engine.url})")
+
+        def run(label, dry_run):
+            t0 = time.perf_counter()
+            with open(path, "rb") as fh:
+                report = import_listings(Service, read_rows(fh, "csv"), dry_run=dry_run, source="bench")
+            secs = time.perf_counter() - t0
+            print(f"{label:<16}{secs:>8.2f}s {report['total'] / secs:>10.0f} filas/s  "
+                  f"creadas={report['created']} duplicadas={report['duplicates']} errores={report['errors']}")
+
+        run("simulación", True)
+        run("importación", False)
+        run("reimportación", False)
+
+        if args.baseline:
+            sample = os.path.join(_tmpdir, "baseline.csv")
+            write_csv(sample, args.baseline, owners, offset=args.rows)
+            t0 = time.perf_counter()
+            done = row_by_row(sample)
+            secs = time.perf_counter() - t0
+            print(f"{'fila a fila':<16}{secs:>8.2f}s {done / secs:>10.0f} filas/s  "
+                  f"(~{args.rows * secs / max(done, 1):.0f}s para {args.rows})")
+        print(f"[bench] memoria máx. del proceso: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# scripts/bench_media.py
+"""
+Benchmark del servido de avatares: ruta anterior (send_from_directory con cabeceras
+por defecto) vs /media/avatars (immutable + ETag) y el modo X-Accel-Redirect.
+
+En proceso (cliente de pruebas de Flask, sin red) mide requests/seg de:
+  - legacy      : la ruta original, 200 con el archivo completo
+  - media       : ruta nueva, 200 con el archivo completo
+  - media-304   : ruta nueva con If-None-Match (revalidación)
+  - x-accel     : ruta nueva con MEDIA_SENDFILE=x-accel (el proxy envía el archivo)
+Con `immutable` el navegador ni siquiera revalida: a partir de la segunda vista la
+petición no llega al servidor, que es la mayor parte de la mejora real.
+
+Contra un servidor en marcha (gunicorn/nginx), con varios hilos:
+(.venv) > python scripts/bench_media.py --url http://localhost:8000/media/avatars/<archivo> --threads 8
+
+Uso:
+(.venv) > python scripts/bench_media.py --requests 2000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_media_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+os.environ.setdefault("BACKGROUND_WORKERS", "")  # sin hilo de correo
+
+from flask import send_from_directory  # noqa: E402
+from PIL import Image  # noqa: E402
+from app import create_app  # noqa: E402
+from app import storage  # noqa: E402
+from app.images import render_avatar_variants  # noqa: E402
+
+
+def make_avatar(upload_dir: str) -> str:
+    src = os.path.join(_tmpdir, "src.jpg")
+    Image.effect_noise((1600, 1600), 64).convert("RGB").save(src, "JPEG", quality=90)
+    os.makedirs(upload_dir, exist_ok=True)
+    with open(src, "rb") as fh:
+        for name, data, _ctype in render_avatar_variants(fh, "user1_bench"):
+            with open(os.path.join(upload_dir, name), "wb") as out:
+                out.write(data.getvalue())
+    return "user1_bench_512.jpg"
+
+
+def run_local(client, url: str, n: int, headers=None) -> dict:
+    latencies = []
+    status = None
+    t0 = time.perf_counter()
+    for _ in range(n):
+        t = time.perf_counter()
+        resp = client.get(url, headers=headers or {})
+        resp.get_data()
+        latencies.append(time.perf_counter() - t)
+        status = resp.status_code
+    total = time.perf_counter() - t0
+    return {"rps": n / total, "p50_ms": statistics.median(latencies) * 1000, "status": status}
+
+
+def run_remote(url: str, n: int, threads: int) -> dict:
+    latencies = []
+    lock = threading.Lock()
+
+    def one(_):
+        t = time.perf_counter()
+        with urllib.request.urlopen(url) as resp:
+            resp.read()
+        with lock:
+            latencies.append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(n)))
+    total = time.perf_counter() - t0
+    return {"rps": n / total, "p50_ms": statistics.median(latencies) * 1000, "status": 200}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de /media/avatars")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--url", help="medir un servidor en marcha en vez del cliente de pruebas")
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.url:
+        r = run_remote(args.url, args.requests, args.threads)
+        print(f"[bench] {args.url}: {r['rps']:.0f} req/s, p50 {r['p50_ms']:.2f} ms")
+        return
+
+    app = create_app()
+    upload_dir = os.path.join(_tmpdir, "avatars")
+    app.config.update(AVATAR_UPLOAD_DIR=upload_dir, STORAGE_BACKEND="local")
+    storage.init_app(app)
+    filename = make_avatar(upload_dir)
+
+    # Ruta anterior, tal cual estaba en create_app
+    @app.route("/legacy/avatars/<path:filename>")
+    def legacy_avatars(filename):
+        return send_from_directory(upload_dir, filename)
+
+    client = app.test_client()
+    etag = client.get(f"/media/avatars/{filename}").headers["ETag"]
+    size = os.path.getsize(os.path.join(upload_dir, filename))
+    print(f"[bench] {filename}: {size} bytes, {args.requests} requests por caso")
+
+    cases = [
+        ("legacy", f"/legacy/avatars/{filename}", None),
+        ("media", f"/media/avatars/{filename}", None),
+        ("media-304", f"/media/avatars/{filename}", {"If-None-Match": etag}),
+    ]
+    for name, url, headers in cases:
+        r = run_local(client, url, args.requests, headers)
+        print(f"  {name:<10} {r['rps']:>8.0f} req/s   p50 {r['p50_ms']:.3f} ms   [{r['status']}]")
+
+    app.config["MEDIA_SENDFILE"] = "x-accel"
+    r = run_local(client, f"/media/avatars/{filename}", args.requests)
+    print(f"  {'x-accel':<10} {r['rps']:>8.0f} req/s   p50 {r['p50_ms']:.3f} ms   [{r['status']}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# scripts/bench_metrics.py
+"""
+Coste de la instrumentación (app/metrics.py): latencia de unas rutas con
+METRICS_ENABLED activado y desactivado, sobre una base SQLite temporal.
+
+Uso:
+(.venv) > python scripts/bench_metrics.py --requests 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_metrics_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+os.environ["BACKGROUND_WORKERS"] = ""
+
+from app import create_app, db  # noqa: E402
+from app.config import BaseConfig  # noqa: E402
+from app.models import User, Service, ServiceStatus  # noqa: E402
+
+PASSWORD = "bench-pass"
+ROUTES = ("/", "/admin/users", "/admin/services", "/admin/dashboard")
+
+
+def seed():
+    admin = User(name="Admin", email="admin@bench.local", role="superadmin", is_verified=True)
+    admin.set_password(PASSWORD)
+    db.session.add(admin)
+    db.session.flush()
+    for i in range(200):
+        db.session.add(User(name=f"Usuario {i}", email=f"u{i}@bench.local", password_hash="x", role="user"))
+        db.session.add(Service(title=f"Servicio {i}", description="bench", owner_id=admin.id,
+                               status=ServiceStatus.APPROVED.value, is_active=True))
+    db.session.commit()
+
+
+def make_client(enabled: bool):
+    BaseConfig.METRICS_ENABLED = enabled  # se lee en create_app()
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, PAGE_CACHE_BACKEND="none", SLOW_REQUEST_MS=10 ** 6)
+    client = app.test_client()
+    client.post("/login", data={"email": "admin@bench.local", "password": PASSWORD})
+    return app, client
+
+
+def measure(clients: list, route: str, n: int) -> list[list[float]]:
+    """Latencias (ms) de `route` en cada cliente, alternando request a request."""
+    for client in clients:
+        for _ in range(20):  # calentamiento
+            client.get(route)
+    samples = [[] for _ in clients]
+    for _ in range(n):
+        for client, out in zip(clients, samples):
+            t0 = time.perf_counter()
+            client.get(route)
+            out.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste de la instrumentación por request")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        db.create_all()
+        seed()
+
+    clients = [make_client(False)[1], make_client(True)[1]]
+    print(f"{'ruta':<20}{'sin p50':>10}{'con p50':>10}{'dif':>9}")
+    for route in ROUTES:
+        off, on = measure(clients, route, args.requests)
+        p50_off, p50_on = statistics.median(off), statistics.median(on)
+        print(f"{route:<20}{p50_off:>8.2f}ms{p50_on:>8.2f}ms{(p50_on - p50_off) / p50_off * 100:>8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# scripts/bench_search.py
+"""
+Benchmark de la búsqueda pública: LIKE '%q%' (sin índice) vs índice de texto completo.
+
+Crea una base SQLite temporal (o usa BENCH_DATABASE_URL), siembra N servicios
+visibles y mide la latencia de ambas rutas para un conjunto de consultas.
+
+Uso:
+(.venv) > python scripts/bench_search.py --rows 50000 --repeat 20
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_search_")
+os.environ["DATABASE_URL"] = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+)
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Service, ServiceStatus  # noqa: E402
+from app.normalize import fold  # noqa: E402
+from app.search import ensure_search_schema, ilike_search, fts_search  # noqa: E402
+
+WORDS = (
+    "plomería electricista clases inglés envíos mudanzas abogado contador peluquería "
+    "restaurante empanadas arepas panadería fotografía diseño web jardinería limpieza "
+    "construcción pintura mecánico taller seguros inmigración traducciones tutorías "
+    "música baile yoga masajes uñas barbería catering eventos transporte aeropuerto"
+).split()
+
+QUERIES = ["plomería", "clases inglés", "peluqueria", "taller mecánico", "arepas", "tradu", "zzzz"]
+
+
+def seed(rows: int):
+    owner = User(name="Bench", email="bench@local", role="user", is_verified=True)
+    owner.set_password("bench")
+    db.session.add(owner)
+    db.session.commit()
+
+    rnd = random.Random(42)
+    batch = []
+    for i in range(rows):
+        title = " ".join(rnd.sample(WORDS, 3)).capitalize()
+        description = " ".join(rnd.choice(WORDS) for _ in range(30))
+        batch.append(dict(
+            title=title, description=description, owner_id=owner.id,
+            title_norm=fold(title), search_norm=fold(f"{title} {description}"),
+            status=ServiceStatus.APPROVED.value, is_active=True, is_deleted=False,
+        ))
+        if len(batch) >= 5000:
+            db.session.execute(Service.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Service.__table__.insert(), batch)
+    db.session.commit()
+
+
+def timed(fn, q: str, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(q, limit=24)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LIKE vs FTS")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # Triggers primero: los inserts del seed mantienen el índice
+        ensure_search_schema()
+        t0 = time.perf_counter()
+        seed(args.rows)
+        print(f"[seed] {args.rows} servicios en {time.perf_counter() - t0:.1f}s ({db.engine.url})")
+
+        print(f"{'consulta':<18}{'ilike p50':>12}{'fts p50':>12}{'ilike p95':>12}{'fts p95':>12}{'speedup':>10}")
+        for q in QUERIES:
+            a = timed(ilike_search, q, args.repeat)
+            b = timed(fts_search, q, args.repeat)
+            p50a, p50b = statistics.median(a), statistics.median(b)
+            p95a = statistics.quantiles(a, n=20)[-1]
+            p95b = statistics.quantiles(b, n=20)[-1]
+            print(f"{q:<18}{p50a:>10.2f}ms{p50b:>10.2f}ms{p95a:>10.2f}ms{p95b:>10.2f}ms{p50a / max(p50b, 1e-6):>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
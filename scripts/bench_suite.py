@@ -0,0 +1,598 @@
+# scripts/bench_suite.py
+"""
+Suite de carga de las rutas calientes públicas y de admin, con resultados en JSON
+para comparar ejecuciones.
+
+1. Siembra (si la base está vacía) volúmenes realistas con INSERT por lotes sobre
+   las tablas de app.models: 100k usuarios, 200k servicios, 100k clasificados,
+   2M login_log y 1M activity_log (--scale 0.1 para una décima parte). Después
+   construye el índice de búsqueda, reconcilia los KPIs y, en Postgres, ANALYZE
+   (lo que haría autovacuum tras una carga así).
+2. Mide requests/seg y latencia p50/p95/p99 de cada escenario (SCENARIOS): búsqueda
+   de main.index, /clasificados/, detalles, login y listados de admin. Los detalles
+   y búsquedas varían el id / la consulta con una semilla fija; con la caché de
+   páginas activa (PAGE_CACHE_BACKEND) se cuentan los HIT/MISS.
+   - En proceso (por defecto): cliente de pruebas de Flask, sin red; --threads N
+     hilos con un cliente cada uno (comparten el GIL: sirve para medir la app, no
+     la concurrencia).
+   - --gunicorn: arranca `gunicorn "app:create_app()"` sobre la misma base y mide
+     por HTTP; --url: un servidor ya en marcha (debe usar la misma base, de ahí
+     salen los ids y los usuarios). Con DevConfig: ProdConfig marca las cookies
+     como Secure y por http no vuelven.
+3. --out guarda el JSON (metadatos: commit, backend, volúmenes, modo) y --compare
+   BASE.json lo compara con la ejecución actual (o `--compare A.json B.json` sin
+   ejecutar nada): sale con código 1 si algún escenario empeora su p95 o sus
+   requests/seg más de --max-regression.
+
+La base es SQLite temporal salvo BENCH_DATABASE_URL (p.ej. un archivo fijo para
+sembrar una vez y medir muchas, o postgresql://...). --reseed la vacía y siembra
+de nuevo: nunca apuntarla a una base con datos reales.
+
+Uso:
+(.venv) > python scripts/bench_suite.py --scale 0.1 --out base.json
+(.venv) > set BENCH_DATABASE_URL=sqlite:///C:/tmp/bench.db
+(.venv) > python scripts/bench_suite.py --seed-only
+(.venv) > python scripts/bench_suite.py --gunicorn --workers 4 --threads 16 --out gunicorn.json
+(.venv) > python scripts/bench_suite.py --only search,admin_users --compare base.json
+(.venv) > python scripts/bench_suite.py --compare base.json new.json
+"""
+
+import argparse
+import http.cookiejar
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_suite_")
+os.environ["DATABASE_URL"] = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+)
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+os.environ["BACKGROUND_WORKERS"] = ""  # sin hilos de correo ni de borrados
+
+from sqlalchemy import func, insert, select, text  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.kpis import reconcile  # noqa: E402
+from app.models import User, Service, Classified, LoginLog, ActivityLog, ServiceStatus  # noqa: E402
+from app.normalize import fold  # noqa: E402
+from app.search import ensure_search_schema  # noqa: E402
+
+PASSWORD = "bench-pass"
+ADMIN_EMAIL = "admin@bench.local"
+VOLUMES = {"users": 100_000, "services": 200_000, "classifieds": 100_000,
+           "login_logs": 2_000_000, "activity_logs": 1_000_000}
+BATCH = 10_000
+
+WORDS = (
+    "plomería electricista clases inglés envíos mudanzas abogado contador peluquería "
+    "restaurante empanadas arepas panadería fotografía diseño web jardinería limpieza "
+    "construcción pintura mecánico taller seguros inmigración traducciones tutorías "
+    "música baile yoga masajes uñas barbería catering eventos transporte aeropuerto"
+).split()
+FIRST_NAMES = ("Ana María José Luis Carlos Andrés Camila Valentina Juan Sofía Diego Laura "
+               "Santiago Daniela Felipe Natalia Jorge Paula Mateo Mariana").split()
+LAST_NAMES = ("García Rodríguez Martínez López González Pérez Gómez Díaz Muñoz Rojas "
+              "Vargas Castro Ramírez Moreno Herrera Jiménez Torres Ruiz Ortiz Suárez").split()
+QUERIES = ("plomería", "clases inglés", "peluqueria", "taller mecánico", "arepas", "tradu", "zzzz")
+USER_AGENTS = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64)", "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0)",
+               "Mozilla/5.0 (Linux; Android 14)", "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_0)")
+ACTIONS = (("create", "Service"), ("create", "Classified"), ("approve", "Service"),
+           ("approve", "Classified"), ("reject", "Service"), ("update", "User"), ("softdelete", "Service"))
+_CSRF = re.compile(r'name="csrf_token" value="([^"]+)"')
+
+
+# -------------------------
+# Siembra
+# -------------------------
+
+def _insert(model, rows):
+    """INSERT por lotes (executemany); vacía `rows`."""
+    if rows:
+        db.session.execute(insert(model), rows)
+        db.session.commit()
+        rows.clear()
+
+
+def _ago(rnd, now, days: int) -> datetime:
+    return now - timedelta(seconds=rnd.randrange(days * 86400))
+
+
+def _listing_state(rnd, admin_id, now):
+    """status / is_active / is_deleted / aprobación con un reparto de producción."""
+    roll = rnd.random()
+    status = (ServiceStatus.APPROVED if roll < 0.8 else
+              ServiceStatus.PENDING if roll < 0.95 else ServiceStatus.REJECTED).value
+    approved = status == ServiceStatus.APPROVED.value
+    return dict(
+        status=status,
+        is_active=approved and rnd.random() < 0.9,
+        is_deleted=rnd.random() < 0.02,
+        approved_by=admin_id if approved else None,
+        approved_at=now if approved else None,
+    )
+
+
+def seed_users(rnd, n: int, now) -> None:
+    password_hash = generate_password_hash(PASSWORD)  # uno para todos: el hash cuesta ~50 ms
+    rows = []
+    for i in range(n):
+        if i == 0:
+            name, email, role = "Bench Admin", ADMIN_EMAIL, "superadmin"
+        else:
+            name = f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)} {rnd.choice(LAST_NAMES)}"
+            email, role = f"user{i}@bench.local", "admin" if i % 5000 == 0 else "user"
+        rows.append(dict(
+            name=name, name_norm=fold(name), email=email, phone=f"240{rnd.randrange(10 ** 7):07d}",
+            password_hash=password_hash, role=role,
+            is_verified=i == 0 or rnd.random() < 0.97, is_deleted=i != 0 and rnd.random() < 0.01,
+            created_at=_ago(rnd, now, 3 * 365),
+            last_login_at=_ago(rnd, now, 60) if rnd.random() < 0.4 else None,
+        ))
+        if len(rows) >= BATCH:
+            _insert(User, rows)
+    _insert(User, rows)
+
+
+def seed_services(rnd, n: int, owner_ids, admin_id, now) -> None:
+    rows = []
+    for i in range(n):
+        title = " ".join(rnd.sample(WORDS, 3)).capitalize()
+        description = " ".join(rnd.choice(WORDS) for _ in range(30))
+        rows.append(dict(
+            title=title, description=description, title_norm=fold(title),
+            search_norm=fold(f"{title} {description}"), owner_id=rnd.choice(owner_ids),
+            website=f"https://servicio{i}.example.com", address=f"{rnd.randrange(1, 9999)} Main St",
+            contact_name=rnd.choice(FIRST_NAMES), contact_email=f"contact{i}@bench.local",
+            contact_phone=f"240{rnd.randrange(10 ** 7):07d}", created_at=_ago(rnd, now, 3 * 365),
+            **_listing_state(rnd, admin_id, now),
+        ))
+        if len(rows) >= BATCH:
+            _insert(Service, rows)
+    _insert(Service, rows)
+
+
+def seed_classifieds(rnd, n: int, owner_ids, admin_id, now) -> None:
+    today = now.date()
+    rows = []
+    for _ in range(n):
+        title = " ".join(rnd.sample(WORDS, 3)).capitalize()
+        description = " ".join(rnd.choice(WORDS) for _ in range(20))
+        # Vigentes, vencidos y futuros; ~20% sin fecha de fin
+        start = today - timedelta(days=rnd.randint(-30, 240))
+        end = None if rnd.random() < 0.2 else start + timedelta(days=rnd.randint(7, 180))
+        state = _listing_state(rnd, admin_id, now)
+        # INSERT Core: is_visible a mano (el listener del modelo no corre)
+        state["is_visible"] = Classified(start_date=start, end_date=end, **state).is_publishable(today)
+        rows.append(dict(
+            title=title, description=description, title_norm=fold(title),
+            search_norm=fold(f"{title} {description}"), owner_id=rnd.choice(owner_ids),
+            start_date=start, end_date=end, created_at=_ago(rnd, now, 365), **state,
+        ))
+        if len(rows) >= BATCH:
+            _insert(Classified, rows)
+    _insert(Classified, rows)
+
+
+def seed_logs(rnd, logins: int, activities: int, user_ids, now) -> None:
+    rows = []
+    for _ in range(logins):
+        rows.append(dict(
+            user_id=rnd.choice(user_ids), ip=f"10.{rnd.randrange(256)}.{rnd.randrange(256)}.{rnd.randrange(256)}",
+            user_agent=rnd.choice(USER_AGENTS), location="", created_at=_ago(rnd, now, 180),
+        ))
+        if len(rows) >= BATCH:
+            _insert(LoginLog, rows)
+    _insert(LoginLog, rows)
+    for _ in range(activities):
+        action, entity = rnd.choice(ACTIONS)
+        rows.append(dict(
+            actor_id=rnd.choice(user_ids), action=action, entity=entity,
+            entity_id=rnd.randrange(1, 200_000), meta=None, created_at=_ago(rnd, now, 365),
+        ))
+        if len(rows) >= BATCH:
+            _insert(ActivityLog, rows)
+    _insert(ActivityLog, rows)
+
+
+def seed(volumes: dict, reseed: bool) -> None:
+    if reseed:
+        db.drop_all()
+    db.create_all()
+    if db.session.execute(select(func.count()).select_from(User)).scalar():
+        print("[seed] la base ya tiene datos: se reutiliza (--reseed para sembrar de nuevo)")
+        return
+
+    rnd, now = random.Random(42), datetime.utcnow()
+    steps = (
+        ("usuarios", lambda: seed_users(rnd, volumes["users"], now)),
+        ("servicios", lambda: seed_services(rnd, volumes["services"], user_ids, admin_id, now)),
+        ("clasificados", lambda: seed_classifieds(rnd, volumes["classifieds"], user_ids, admin_id, now)),
+        ("logs", lambda: seed_logs(rnd, volumes["login_logs"], volumes["activity_logs"], user_ids, now)),
+    )
+    user_ids, admin_id = [], None
+    for label, step in steps:
+        t0 = time.perf_counter()
+        step()
+        print(f"[seed] {label} en {time.perf_counter() - t0:.1f}s")
+        if not user_ids:
+            user_ids = db.session.execute(select(User.id)).scalars().all()
+            admin_id = db.session.execute(select(User.id).where(User.email == ADMIN_EMAIL)).scalar()
+
+    t0 = time.perf_counter()
+    # Inserts Core: ni el listener de búsqueda ni el de KPIs los ven
+    ensure_search_schema(rebuild=True)
+    reconcile()
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+    print(f"[seed] índice de búsqueda y KPIs en {time.perf_counter() - t0:.1f}s")
+
+
+def table_counts() -> dict:
+    return {
+        name: db.session.execute(select(func.count()).select_from(model)).scalar()
+        for name, model in (("users", User), ("services", Service), ("classifieds", Classified),
+                            ("login_logs", LoginLog), ("activity_logs", ActivityLog))
+    }
+
+
+def sample_targets(limit: int = 2000) -> dict:
+    """Ids visibles y usuarios verificados para los escenarios (misma semilla: mismos URLs)."""
+    rnd = random.Random(7)
+
+    def visible_ids(model):
+        ids = db.session.execute(select(model.id).where(
+            model.is_deleted == False, model.is_active == True,
+            model.status == ServiceStatus.APPROVED.value,
+        )).scalars().all()
+        return rnd.sample(ids, min(limit, len(ids)))
+
+    emails = db.session.execute(
+        select(User.email).where(User.is_verified == True, User.is_deleted == False, User.role == "user")
+        .order_by(User.id).limit(limit)
+    ).scalars().all()
+    return {"services": visible_ids(Service), "classifieds": visible_ids(Classified), "emails": emails,
+            "names": [fold(n) for n in LAST_NAMES]}
+
+
+# -------------------------
+# Escenarios
+# -------------------------
+
+def _pick(key):
+    return lambda rnd, targets: rnd.choice(targets[key])
+
+
+SCENARIOS = {
+    # nombre: (sesión, ruta(rnd, targets))
+    "search": ("anon", lambda rnd, t: "/?q=" + urllib.parse.quote(rnd.choice(QUERIES))),
+    "classifieds": ("anon", lambda rnd, t: "/clasificados/"),
+    "service_detail": ("anon", lambda rnd, t: f"/services/detail/{_pick('services')(rnd, t)}"),
+    "classified_detail": ("anon", lambda rnd, t: f"/clasificados/detail/{_pick('classifieds')(rnd, t)}"),
+    "login": ("login", None),
+    "admin_services": ("admin", lambda rnd, t: "/admin/services"),
+    "admin_services_filtered": ("admin", lambda rnd, t: "/admin/services?status=pending&q="
+                                + urllib.parse.quote(rnd.choice(WORDS))),
+    "admin_classifieds": ("admin", lambda rnd, t: "/admin/classifieds"),
+    "admin_users": ("admin", lambda rnd, t: "/admin/users"),
+    "admin_users_search": ("admin", lambda rnd, t: "/admin/users?q=" + urllib.parse.quote(rnd.choice(t["names"]))),
+    "admin_logs": ("admin", lambda rnd, t: "/admin/logs"),
+}
+
+
+# -------------------------
+# Clientes (misma interfaz: request(method, path, data) -> (status, X-Cache))
+# -------------------------
+
+class LocalClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        resp = self.client.open(path, method=method, data=data)
+        resp.get_data()
+        return resp.status_code, resp.headers.get("X-Cache")
+
+    def text(self, path):
+        return self.client.get(path).get_data(as_text=True)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None  # el 302 es la respuesta que se mide (igual que en proceso)
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect)
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req, timeout=60) as resp:
+                resp.read()
+                return resp.status, resp.headers.get("X-Cache")
+        except urllib.error.HTTPError as e:  # 3xx/4xx/5xx
+            e.read()
+            return e.code, e.headers.get("X-Cache")
+
+    def text(self, path):
+        with self.opener.open(self.base_url + path, timeout=60) as resp:
+            return resp.read().decode("utf-8")
+
+
+class Session:
+    """Cliente + token CSRF de un hilo; 'admin' inicia sesión al crearse."""
+
+    def __init__(self, client, kind):
+        self.client = client
+        self.csrf = None
+        if kind == "admin":
+            status = self.login(ADMIN_EMAIL)
+            if status != 302:
+                raise RuntimeError(f"login de admin fallido ({status})")
+
+    def _token(self):
+        if self.csrf is None:  # uno por sesión: Flask-WTF lo guarda en la cookie
+            match = _CSRF.search(self.client.text("/login"))
+            self.csrf = match.group(1) if match else ""
+        return self.csrf
+
+    def login(self, email):
+        status, _ = self.client.request("POST", "/login", {
+            "email": email, "password": PASSWORD, "csrf_token": self._token(),
+        })
+        return status
+
+
+# -------------------------
+# Medición
+# -------------------------
+
+def percentiles(samples: list[float]) -> dict:
+    ms = sorted(s * 1000 for s in samples)
+    if len(ms) < 2:
+        value = round(ms[0], 3) if ms else None
+        return {"mean_ms": value, "p50_ms": value, "p95_ms": value, "p99_ms": value, "max_ms": value}
+    cuts = statistics.quantiles(ms, n=100, method="inclusive")
+    return {
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(cuts[49], 3), "p95_ms": round(cuts[94], 3), "p99_ms": round(cuts[98], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def run_scenario(name, make_client, targets, n: int, warmup: int, threads: int) -> dict:
+    kind, route = SCENARIOS[name]
+    expected = 302 if kind == "login" else 200
+    local = threading.local()
+    lock = threading.Lock()
+    sessions = itertools.count()
+    latencies, statuses, cache = [], Counter(), Counter()
+    errors = [0]
+
+    def one(_i, record=True):
+        state = getattr(local, "state", None)
+        if state is None:  # fuera del tiempo medido: cliente nuevo y, si toca, login
+            state = local.state = (Session(make_client(), kind), random.Random(f"{name}:{next(sessions)}"))
+        session, rnd = state
+        if kind == "login":
+            token = session._token()
+            args = ("POST", "/login", {"email": rnd.choice(targets["emails"]), "password": PASSWORD,
+                                       "csrf_token": token})
+        else:
+            args = ("GET", route(rnd, targets), None)
+        t0 = time.perf_counter()
+        try:
+            status, hit = session.client.request(*args)
+        except Exception:
+            status, hit = "error", None
+        elapsed = time.perf_counter() - t0
+        if not record:
+            return
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] += 1
+            if hit:
+                cache[hit] += 1
+            if status != expected:
+                errors[0] += 1
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda i: one(i, record=False), range(warmup)))
+        t0 = time.perf_counter()
+        list(pool.map(one, range(n)))
+        wall = time.perf_counter() - t0
+
+    result = {"requests": n, "errors": errors[0], "seconds": round(wall, 3), "rps": round(n / wall, 1)}
+    result.update(percentiles(latencies))
+    result["status"] = dict(statuses)
+    if cache:
+        result["cache"] = dict(cache)
+    return result
+
+
+# -------------------------
+# gunicorn
+# -------------------------
+
+def start_gunicorn(workers: int, port: int, extra: str):
+    cmd = [sys.executable, "-m", "gunicorn", "app:create_app()", "--chdir", BASE_DIR,
+           "-w", str(workers), "-b", f"127.0.0.1:{port}", "--log-level", "warning", *shlex.split(extra)]
+    proc = subprocess.Popen(cmd, env=dict(os.environ))
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"[bench] gunicorn terminó al arrancar (código {proc.returncode})")
+        try:
+            with urllib.request.urlopen(url + "/privacy", timeout=2):
+                return proc, url
+        except OSError:
+            time.sleep(0.3)
+    proc.terminate()
+    raise SystemExit("[bench] gunicorn no respondió en 60 s")
+
+
+# -------------------------
+# Comparación
+# -------------------------
+
+def compare(base: dict, new: dict, max_regression: float) -> int:
+    """Tabla de diferencias; devuelve cuántos escenarios empeoran más de max_regression."""
+    if base["meta"].get("counts") != new["meta"].get("counts"):
+        print("[compare] aviso: los volúmenes de datos no coinciden")
+    for key in ("mode", "threads", "workers", "database"):
+        if base["meta"].get(key) != new["meta"].get(key):
+            print(f"[compare] aviso: {key} distinto ({base['meta'].get(key)} -> {new['meta'].get(key)})")
+
+    print(f"{'escenario':<26}{'rps':>16}{'p95 ms':>20}{'p99 ms':>20}")
+    regressions = 0
+    for name, cur in new["results"].items():
+        old = base["results"].get(name)
+        if not old:
+            continue
+        rps_change = cur["rps"] / old["rps"] - 1 if old["rps"] else 0.0
+        p95_change = cur["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        worse = rps_change < -max_regression or p95_change > max_regression
+        regressions += worse
+        print(f"{name:<26}{old['rps']:>7.0f}->{cur['rps']:<7.0f}{rps_change:>+6.0%}"
+              f"{old['p95_ms']:>9.1f}->{cur['p95_ms']:<7.1f}{p95_change:>+5.0%}"
+              f"{old['p99_ms']:>9.1f}->{cur['p99_ms']:<9.1f}{'  REGRESIÓN' if worse else ''}")
+    return regressions
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BASE_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -------------------------
+# Main
+# -------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de carga de rutas públicas y de admin")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplica los volúmenes por defecto")
+    for name, value in VOLUMES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, help=f"filas de {name} (por defecto {value:,})")
+    parser.add_argument("--reseed", action="store_true", help="vaciar la base y sembrar de nuevo")
+    parser.add_argument("--seed-only", action="store_true")
+    parser.add_argument("--only", help="escenarios separados por comas: " + ",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=300, help="requests medidos por escenario")
+    parser.add_argument("--login-requests", type=int, default=50, help="login: cada uno verifica un hash")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--threads", type=int, help="clientes concurrentes (1 en proceso, 8 por HTTP)")
+    parser.add_argument("--url", help="medir un servidor en marcha sobre la misma base")
+    parser.add_argument("--gunicorn", action="store_true", help="arrancar gunicorn y medir por HTTP")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--gunicorn-args", default="", help='p.ej. "-k gthread --threads 4"')
+    parser.add_argument("--out", help="guardar los resultados en este JSON")
+    parser.add_argument("--compare", nargs="+", metavar="JSON", help="BASE [NUEVO]")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="0.2 = 20%% peor en p95 o rps")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        sys.exit(1 if compare(_load(args.compare[0]), _load(args.compare[1]), args.max_regression) else 0)
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"escenarios desconocidos: {', '.join(unknown)}")
+
+    volumes = {name: getattr(args, name) if getattr(args, name) is not None else int(value * args.scale)
+               for name, value in VOLUMES.items()}
+    app = create_app()
+    with app.app_context():
+        seed(volumes, args.reseed)
+        counts = table_counts()
+        targets = sample_targets()
+        backend = db.engine.dialect.name
+    print(f"[bench] {backend}: " + ", ".join(f"{k}={v:,}" for k, v in counts.items()))
+    if args.seed_only:
+        return
+
+    proc = None
+    if args.gunicorn:
+        proc, url = start_gunicorn(args.workers, args.port, args.gunicorn_args)
+    else:
+        url = args.url
+    threads = args.threads or (8 if url else 1)
+    make_client = (lambda: HttpClient(url)) if url else (lambda: LocalClient(app))
+
+    report = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "git_commit": _git_commit(),
+            "mode": "gunicorn" if args.gunicorn else "http" if url else "inprocess",
+            "target": url or "wsgi",
+            "threads": threads,
+            "workers": args.workers if args.gunicorn else None,
+            "database": backend,
+            "config": os.environ.get("FLASK_CONFIG"),
+            "page_cache": app.config.get("PAGE_CACHE_BACKEND"),
+            "counts": counts,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": {},
+    }
+    print(f"[bench] modo {report['meta']['mode']}, {threads} hilo(s)")
+    print(f"{'escenario':<26}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'errores':>9}")
+    try:
+        for name in names:
+            n = args.login_requests if name == "login" else args.requests
+            r = run_scenario(name, make_client, targets, n, args.warmup, threads)
+            report["results"][name] = r
+            print(f"{name:<26}{r['rps']:>9.1f}{r['p50_ms']:>8.2f}ms{r['p95_ms']:>8.2f}ms"
+                  f"{r['p99_ms']:>8.2f}ms{r['errors']:>9}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+        print(f"[bench] resultados en {args.out}")
+    if args.compare:
+        sys.exit(1 if compare(_load(args.compare[0]), report, args.max_regression) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# scripts/check_query_plans.py
+"""
+Verifica con EXPLAIN que las consultas "calientes" usan índices.
+
+Levanta la app sobre una BD temporal (o CHECK_DATABASE_URL, ⚠️ se recrea: usar una
+BD desechable), siembra unas filas,
+recorre las rutas públicas, de propietario y de admin capturando el SQL real que
+emiten (before_cursor_execute) y ejecuta EXPLAIN sobre cada SELECT.
+Sale con código 1 si alguna cae en un recorrido secuencial de tabla o si una ruta
+emite más sentencias SQL que su presupuesto (detecta N+1 y cargas de tablas enteras
+que no se notan en el plan).
+
+- SQLite: falla con "SCAN <tabla>" sin índice (SEARCH / SCAN ... USING INDEX son válidos).
+- Postgres: se desactiva enable_seqscan (tablas pequeñas) y falla con "Seq Scan".
+
+Uso:
+(.venv) > python scripts/check_query_plans.py
+"""
+
+import os
+import re
+import sys
+import tempfile
+from datetime import date, timedelta
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="check_plans_")
+os.environ["DATABASE_URL"] = os.getenv(
+    "CHECK_DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'plans.db')}"
+)
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+
+from sqlalchemy import event  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import User, Service, Classified, ServiceStatus  # noqa: E402
+from app.kpis import reconcile  # noqa: E402
+from app.search import ensure_search_schema  # noqa: E402
+
+PASSWORD = "check-plans"
+
+# Rutas calientes: (cliente, url, máximo de sentencias SQL por request)
+ROUTES = [
+    ("anon", "/?q=plomeria", 6),
+    ("anon", "/clasificados/", 6),
+    ("anon", "/services/detail/{service_id}", 3),
+    ("anon", "/clasificados/detail/{classified_id}", 3),
+    ("owner", "/services/my", 4),
+    ("owner", "/clasificados/mine", 4),
+    ("admin", "/admin/dashboard", 4),
+    ("admin", "/admin/services", 3),
+    ("admin", "/admin/services?status=PENDING", 3),
+    ("admin", "/admin/classifieds", 3),
+    ("admin", "/admin/classifieds?status=APPROVED", 3),
+    ("admin", "/admin/users", 3),
+    ("admin", "/admin/users/search?q=due", 2),
+    ("admin", "/admin/users/search?q=owner@", 2),
+    ("admin", "/services/create", 2),
+    ("admin", "/admin/logs", 6),
+    ("admin", "/admin/logs?action=approve", 6),
+]
+
+# Recorridos completos conocidos y aceptados (regex sobre el SQL)
+ALLOWED_SCANS = []
+
+
+def seed():
+    admin = User(name="Admin", email="admin@check", role="superadmin", is_verified=True)
+    owner = User(name="Dueño", email="owner@check", role="user", is_verified=True)
+    for u in (admin, owner):
+        u.set_password(PASSWORD)
+    db.session.add_all([admin, owner])
+    db.session.commit()
+    today = date.today()
+    for i in range(20):
+        approved = i % 2 == 0
+        status = ServiceStatus.APPROVED.value if approved else ServiceStatus.PENDING.value
+        rejected_by = None
+        if i % 5 == 1:
+            # Rechazados: los listados de admin resuelven el nombre de quien rechazó
+            status, rejected_by = ServiceStatus.REJECTED.value, admin.id
+        db.session.add(Service(
+            title=f"Plomería {i}", description="reparaciones", owner_id=owner.id,
+            status=status, is_active=approved, rejected_by=rejected_by,
+        ))
+        db.session.add(Classified(
+            title=f"Clasificado {i}", owner_id=owner.id, start_date=today - timedelta(days=i),
+            status=status, is_active=approved, rejected_by=rejected_by,
+        ))
+    db.session.commit()
+    reconcile()  # KPIs materializados: el dashboard mide la lectura, no el arranque en frío
+    return dict(
+        service_id=Service.query.filter_by(is_active=True).first().id,
+        classified_id=Classified.query.filter_by(is_active=True).first().id,
+    )
+
+
+def explain(conn, statement, parameters):
+    """Devuelve la lista de problemas del plan ([] si usa índices)."""
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        # "SCAN <tabla>" sin "USING ... INDEX" = recorrido completo (las subconsultas anon_N no cuentan)
+        tables = set(db.metadata.tables)
+        return [d for d in (r[-1] for r in rows) if re.fullmatch(r"SCAN (\w+)", d) and d.split()[1] in tables]
+    rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).fetchall()
+    return [r[0].strip() for r in rows if "Seq Scan" in r[0]]
+
+
+def main() -> int:
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        ensure_search_schema()
+        ids = seed()
+
+    clients = {name: app.test_client() for name in ("anon", "owner", "admin")}
+    clients["owner"].post("/login", data={"email": "owner@check", "password": PASSWORD})
+    clients["admin"].post("/login", data={"email": "admin@check", "password": PASSWORD})
+
+    captured = []
+    with app.app_context():
+        engine = db.engine
+
+    counts = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        counts[current_route] = counts.get(current_route, 0) + 1
+        if statement.lstrip().upper().startswith("SELECT") and "sqlite_master" not in statement:
+            captured.append((current_route, statement, parameters))
+
+    failures = 0
+    event.listen(engine, "before_cursor_execute", capture)
+    for client_name, url, budget in ROUTES:
+        current_route = url.format(**ids)
+        resp = clients[client_name].get(current_route)
+        if resp.status_code >= 400:
+            print(f"[error] {current_route} -> {resp.status_code}")
+            return 1
+        if counts.get(current_route, 0) > budget:
+            failures += 1
+            print(f"[FAIL] {current_route}: {counts[current_route]} sentencias (máximo {budget})")
+    event.remove(engine, "before_cursor_execute", capture)
+
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for route, statement, parameters in captured:
+            if any(p.match(statement.strip()) for p in ALLOWED_SCANS):
+                continue
+            problems = explain(conn, statement, parameters)
+            if problems:
+                failures += 1
+                print(f"[FAIL] {route}: {', '.join(problems)}\n       {' '.join(statement.split())[:300]}")
+
+    print(f"[plans] {len(ROUTES)} rutas, {len(captured)} consultas revisadas, {failures} fallos.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
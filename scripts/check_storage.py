@@ -0,0 +1,119 @@
+# scripts/check_storage.py
+"""
+Verifica un backend de almacenamiento (app/storage.py) y el flujo completo de
+avatares sobre él: subida por /profile -> variantes guardadas -> /media/avatars.
+
+Por defecto usa el backend en memoria y una BD temporal (no toca nada real).
+Contra un S3 local tipo MinIO:
+    docker run -p 9000:9000 minio/minio server /data      # y crear el bucket
+    S3_ENDPOINT_URL=http://localhost:9000 S3_BUCKET=test S3_ACCESS_KEY_ID=minioadmin \\
+    S3_SECRET_ACCESS_KEY=minioadmin python scripts/check_storage.py --backend s3
+
+Uso:
+(.venv) > python scripts/check_storage.py [--backend memory|local|s3]
+Sale con código 1 si algo falla.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+_tmpdir = tempfile.mkdtemp(prefix="check_storage_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'check.db')}"
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+os.environ.setdefault("BACKGROUND_WORKERS", "")
+
+from PIL import Image  # noqa: E402
+from app import create_app, db, storage as storage_ext  # noqa: E402
+from app.models import User  # noqa: E402
+from app.storage import get_storage  # noqa: E402
+
+failures = []
+
+
+def check(cond, message):
+    print(f"  [{'ok' if cond else 'FAIL'}] {message}")
+    if not cond:
+        failures.append(message)
+
+
+def check_contract(st):
+    key = "check/hola.txt"
+    payload = b"x" * 200_000  # varios bloques
+    st.put(key, io.BytesIO(payload), "text/plain")
+    info = st.stat(key)
+    check(info is not None and info["size"] == len(payload), "put + stat (tamaño)")
+    fh = st.open(key)
+    check(fh is not None and fh.read() == payload, "open devuelve el contenido")
+    fh.close()
+    check(key in list(st.list("check/")), "list(prefix) incluye la clave")
+    check(st.stat("check/no-existe") is None and st.open("check/no-existe") is None, "clave inexistente -> None")
+    url = st.url(key)
+    check(url is None or url.startswith("http"), f"url(): {url or 'sin URL (lo sirve /media)'}")
+    st.delete(key)
+    check(st.stat(key) is None, "delete")
+
+
+def check_avatar_flow(app):
+    with app.app_context():
+        u = User(name="Check", email="check@local", role="user", is_verified=True)
+        u.set_password("check")
+        db.session.add(u)
+        db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"email": "check@local", "password": "check"})
+    buf = io.BytesIO()
+    Image.new("RGB", (640, 480), (10, 120, 200)).save(buf, "JPEG")
+    buf.seek(0)
+    resp = client.post("/profile", data={"name": "Check", "email": "check@local", "avatar_file": (buf, "a.jpg")},
+                       content_type="multipart/form-data")
+    check(resp.status_code == 302, "subida de avatar por /profile")
+    with app.app_context():
+        url = User.query.filter_by(email="check@local").first().avatar_url
+        keys = list(get_storage().list("avatars/"))
+    check(url is not None and len(keys) == 6, f"6 variantes guardadas ({len(keys)})")
+    if not url:
+        return
+    resp = client.get(url)
+    if resp.status_code == 302:
+        check(resp.headers["Location"].startswith("http"), "/media redirige a la URL del almacenamiento")
+    else:
+        check(resp.status_code == 200 and resp.data[:3] == b"\xff\xd8\xff", "/media sirve el JPEG")
+        etag = resp.headers.get("ETag")
+        check(client.get(url, headers={"If-None-Match": etag}).status_code == 304, "/media responde 304 con ETag")
+    # Con redirección no se consulta el almacenamiento (sin HEAD por request): responde él
+    missing = client.get("/media/avatars/no-existe.jpg").status_code
+    check(missing == 404 or (missing == 302 and resp.status_code == 302), f"/media inexistente -> {missing}")
+    with app.app_context():
+        for key in keys:
+            get_storage().delete(key)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verifica el backend de almacenamiento")
+    parser.add_argument("--backend", default="memory", choices=("memory", "local", "s3"))
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, STORAGE_BACKEND=args.backend)
+    if args.backend == "local":
+        app.config["STORAGE_LOCAL_ROOT"] = os.path.join(_tmpdir, "uploads")
+    storage_ext.init_app(app)
+    with app.app_context():
+        db.create_all()
+        print(f"[storage] backend {args.backend}")
+        check_contract(get_storage())
+    check_avatar_flow(app)
+
+    print(f"[storage] {len(failures)} fallos.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# scripts/compact_logs.py
+"""
+Retención de LoginLog / ActivityLog (app/retention.py). Programarlo una vez al día
+(cron / Render Cron Job):
+  1. Postgres particionado: crea las particiones de los próximos meses.
+  2. Resume los días completos pendientes (login_daily / action_daily).
+  3. Exporta a JSONL.gz (LOG_ARCHIVE_DIR) y purga lo que supera la retención
+     (LOGIN_LOG_RETENTION_DAYS / ACTIVITY_LOG_RETENTION_DAYS).
+
+Uso:
+(.venv) > python scripts/compact_logs.py
+(.venv) > python scripts/compact_logs.py --dry-run        # resume, pero solo cuenta lo que se purgaría
+(.venv) > python scripts/compact_logs.py --rollup-only    # solo resúmenes
+(.venv) > python scripts/compact_logs.py --read instance/archive/login_log-2025-01.jsonl.gz
+"""
+
+import argparse
+import json
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+os.environ.setdefault("BACKGROUND_WORKERS", "")
+
+from app import create_app  # noqa: E402
+from app.engine import maintenance_mode  # noqa: E402
+from app.models import LoginLog, ActivityLog  # noqa: E402
+from app import retention  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resúmenes, archivo y purga de logs")
+    parser.add_argument("--dry-run", action="store_true", help="Genera resúmenes pero no exporta ni borra: solo cuenta")
+    parser.add_argument("--rollup-only", action="store_true", help="Solo genera los resúmenes diarios")
+    parser.add_argument("--read", metavar="ARCHIVO", help="Imprime un archivo exportado (sin duplicados)")
+    args = parser.parse_args()
+
+    if args.read:
+        for row in retention.read_archive(args.read):
+            print(json.dumps(row, ensure_ascii=False))
+        return
+
+    maintenance_mode()
+    app = create_app()
+    with app.app_context():
+        for model in (LoginLog, ActivityLog):
+            if retention.is_partitioned(model.__tablename__):
+                for name in retention.ensure_partitions(model.__tablename__):
+                    print(f"[retention] + partición {name}")
+
+        days = 0
+        while True:  # rollup() avanza como mucho ~3 meses por llamada
+            n = retention.rollup()
+            if not n:
+                break
+            days += n
+        print(f"[retention] {days} días resumidos (último: {retention.last_rolled_day() or '-'}).")
+        if args.rollup_only:
+            return
+
+        for model in (LoginLog, ActivityLog):
+            limit = retention.purge_limit(model)
+            n = retention.compact(model, dry_run=args.dry_run)
+            verb = "se purgarían" if args.dry_run else "archivadas y purgadas"
+            print(f"[retention] {model.__tablename__}: {n} filas anteriores a {limit:%Y-%m-%d} {verb}.")
+        if not args.dry_run:
+            print(f"[ok] Archivo en {retention.archive_dir()}")
+
+
+if __name__ == "__main__":
+    main()
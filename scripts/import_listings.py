@@ -0,0 +1,78 @@
+# scripts/import_listings.py
+"""
+Importa servicios o clasificados desde un CSV / JSONL (app/imports.py).
+
+Uso:
+(.venv) > python scripts/import_listings.py services socios.csv --dry-run
+(.venv) > python scripts/import_listings.py services socios.csv --actor admin@dominio.com --errors errores.csv
+(.venv) > python scripts/import_listings.py classifieds anuncios.jsonl
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+os.environ.setdefault("BACKGROUND_WORKERS", "")
+
+from app import create_app, db  # noqa: E402
+from app.models import User  # noqa: E402
+from app.imports import ImportFileError, MODELS, FORMATS, import_listings, read_rows  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Importación masiva de servicios/clasificados")
+    parser.add_argument("kind", choices=sorted(MODELS))
+    parser.add_argument("path", help="Archivo .csv o .jsonl (UTF-8)")
+    parser.add_argument("--dry-run", action="store_true", help="Valida y cuenta, sin insertar")
+    parser.add_argument("--actor", metavar="EMAIL", help="Usuario al que se atribuye la auditoría")
+    parser.add_argument("--errors", metavar="CSV", help="Escribe el informe de errores por fila")
+    args = parser.parse_args()
+
+    fmt = args.path.rsplit(".", 1)[-1].lower()
+    fmt = "jsonl" if fmt == "ndjson" else fmt
+    if fmt not in FORMATS:
+        print("[import] el archivo debe ser .csv o .jsonl")
+        return 2
+
+    app = create_app()
+    app.config["IMPORT_MAX_REPORTED_ERRORS"] = 10 ** 9  # en CLI, informe completo
+    with app.app_context():
+        actor = None
+        if args.actor:
+            actor = db.session.execute(db.select(User).filter_by(email=args.actor.lower())).scalar()
+            if actor is None:
+                print(f"[import] no existe el usuario {args.actor}")
+                return 2
+        try:
+            with open(args.path, "rb") as fh:
+                report = import_listings(
+                    MODELS[args.kind], read_rows(fh, fmt), actor=actor,
+                    dry_run=args.dry_run, source=os.path.basename(args.path),
+                )
+        except ImportFileError as e:
+            print(f"[import] {e}")
+            return 2
+
+    verb = "se crearían" if args.dry_run else "creados"
+    print(f"[import] {report['total']} filas: {report['created']} {verb}, "
+          f"{report['duplicates']} duplicados, {report['errors']} errores.")
+    if args.errors:
+        with open(args.errors, "w", newline="", encoding="utf-8") as out:
+            writer = csv.DictWriter(out, fieldnames=("line", "title", "error"))
+            writer.writeheader()
+            writer.writerows(report["error_rows"])
+        print(f"[import] errores en {args.errors}")
+    else:
+        for row in report["error_rows"][:20]:
+            print(f"  línea {row['line']}: {row['error']} ({row['title']})")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,9 +25,11 @@ if BASE_DIR not in sys.path:
 os.environ.setdefault("FLASK_CONFIG", "DevConfig")
 
 from app import create_app, db  # noqa: E402
+from app.engine import maintenance_mode  # noqa: E402
 from app.models import (      # noqa: E402
     User, Service, Classified, LoginLog, ActivityLog, ServiceStatus
 )
+from app.search import ensure_search_schema  # noqa: E402
 
 def seed_superadmin():
     """Crea un superadmin si no existe."""
@@ -70,6 +72,7 @@ def maybe_remove_sqlite():
             print(f"[warn] No se pudo eliminar {abs_path}: {e}")
 
 def main():
+    maintenance_mode()
     app = create_app()
     with app.app_context():
         # Si es SQLite local, eliminar archivo para recrear
@@ -79,6 +82,7 @@ def main():
         db.drop_all()
         db.create_all()
         db.session.commit()
+        ensure_search_schema()
         print("[init] Tablas creadas correctamente.")
 
         # Semilla mínima (opcional)
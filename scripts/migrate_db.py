@@ -0,0 +1,289 @@
+# scripts/migrate_db.py
+"""
+Migraciones idempotentes sobre una base existente (sin borrar datos).
+Complementa a scripts/init_db.py, que recrea todo desde cero.
+
+Uso:
+(.venv) > python scripts/migrate_db.py
+(.venv) > python scripts/migrate_db.py --rebuild-search   # repuebla el índice FTS
+"""
+
+import argparse
+import os
+import sys
+
+# Asegura que el proyecto esté en sys.path
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+
+from sqlalchemy import inspect, select, update, text  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.engine import maintenance_mode  # noqa: E402
+from app.models import User, Service, Classified, LoginLog, ActivityLog  # noqa: E402
+from app.normalize import fold  # noqa: E402
+from app.search import ensure_search_schema  # noqa: E402
+from app.visibility import backfill_visibility  # noqa: E402
+from app import retention  # noqa: E402
+
+BATCH = 1000
+
+# Índices que ya no declaran los modelos (sustituidos por otros)
+OBSOLETE_INDEXES = (
+    "ix_classified_listed",   # -> ix_classified_visible
+    "ix_classified_visible",  # -> ix_classified_public (clave completa del listado)
+)
+
+
+def add_missing_columns():
+    """ALTER TABLE ... ADD COLUMN para columnas nuevas de los modelos (siempre nullables)."""
+    insp = inspect(db.engine)
+    for tbl in db.metadata.sorted_tables:
+        if not insp.has_table(tbl.name):
+            continue
+        existing = {c["name"] for c in insp.get_columns(tbl.name)}
+        for col in tbl.columns:
+            if col.name in existing:
+                continue
+            coltype = col.type.compile(dialect=db.engine.dialect)
+            quoted = db.engine.dialect.identifier_preparer.quote(tbl.name)
+            db.session.execute(text(f"ALTER TABLE {quoted} ADD COLUMN {col.name} {coltype}"))
+            print(f"[migrate] + {tbl.name}.{col.name} {coltype}")
+            for index in tbl.indexes:
+                if col.name in index.columns:
+                    index.create(db.session.connection(), checkfirst=True)
+    db.session.commit()
+
+
+def create_missing_indexes():
+    """Crea los índices declarados en los modelos que aún no existen (compuestos/parciales)."""
+    insp = inspect(db.engine)
+    conn = db.session.connection()
+    for tbl in db.metadata.sorted_tables:
+        if not insp.has_table(tbl.name):
+            continue
+        existing = {ix["name"] for ix in insp.get_indexes(tbl.name)}
+        for index in tbl.indexes:
+            # ddl_if(dialect=...): variantes por backend del mismo índice (ver app/models.py)
+            only = getattr(index, "_ddl_if", None)
+            if only is not None and only.dialect not in (None, db.engine.dialect.name):
+                continue
+            if index.name not in existing:
+                index.create(conn)
+                print(f"[migrate] + índice {index.name}")
+    db.session.commit()
+
+
+# Orden de los listados por cursor (app/pagination.py, app/public_classifieds.py)
+NOT_NULL_CREATED_AT = ("user", "service", "classified", "login_log", "activity_log")
+
+
+def fill_created_at():
+    """
+    created_at NOT NULL en las tablas paginadas por cursor: las filas antiguas sin
+    fecha toman la más antigua de su tabla (siguen al final del listado). En Postgres
+    además SET NOT NULL; en SQLite la restricción la pone create_all / la
+    reconstrucción de tablas, y los datos ya no tienen NULL.
+    """
+    insp = inspect(db.engine)
+    for name in NOT_NULL_CREATED_AT:
+        if not insp.has_table(name):
+            continue
+        res = db.session.execute(text(
+            f'UPDATE "{name}" SET created_at = coalesce((SELECT min(created_at) FROM "{name}"), CURRENT_TIMESTAMP) '
+            "WHERE created_at IS NULL"
+        ))
+        if res.rowcount:
+            print(f"[migrate] {name}.created_at: {res.rowcount} filas sin fecha")
+        nullable = {c["name"]: c["nullable"] for c in insp.get_columns(name)}.get("created_at")
+        if db.engine.dialect.name == "postgresql" and nullable:
+            db.session.execute(text(f'ALTER TABLE "{name}" ALTER COLUMN created_at SET NOT NULL'))
+            print(f"[migrate] {name}.created_at: NOT NULL")
+    db.session.commit()
+
+
+def drop_obsolete_indexes():
+    for name in OBSOLETE_INDEXES:
+        db.session.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+    db.session.commit()
+
+
+def _fk_rules_missing() -> dict:
+    """{tabla: [FKs del modelo con ON DELETE que la BD no tiene]}."""
+    insp = inspect(db.engine)
+    missing = {}
+    for tbl in db.metadata.sorted_tables:
+        if not insp.has_table(tbl.name):
+            continue
+        current = {
+            tuple(fk["constrained_columns"]): ((fk.get("options") or {}).get("ondelete") or "").upper()
+            for fk in insp.get_foreign_keys(tbl.name)
+        }
+        for fk in tbl.foreign_key_constraints:
+            if fk.ondelete and current.get(tuple(fk.column_keys)) != fk.ondelete.upper():
+                missing.setdefault(tbl.name, []).append(fk)
+    return missing
+
+
+def _rebuild_sqlite_table(conn, tbl):
+    """SQLite no tiene ALTER CONSTRAINT: renombra, crea la tabla del modelo y copia."""
+    old = f"{tbl.name}__old"
+    indexes = [ix["name"] for ix in inspect(conn).get_indexes(tbl.name)]
+    columns = {c["name"] for c in inspect(conn).get_columns(tbl.name)}
+    conn.exec_driver_sql(f'ALTER TABLE "{tbl.name}" RENAME TO "{old}"')
+    for name in indexes:
+        conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{name}"')
+    tbl.create(conn)
+    cols = ", ".join(f'"{c.name}"' for c in tbl.columns if c.name in columns)
+    conn.exec_driver_sql(f'INSERT INTO "{tbl.name}" ({cols}) SELECT {cols} FROM "{old}"')
+    conn.exec_driver_sql(f'DROP TABLE "{old}"')  # sus triggers (FTS) se recrean en migrate_search
+
+
+def ensure_fk_rules():
+    """
+    Reglas ON DELETE de las FKs hacia user (CASCADE / SET NULL, ver app/models.py).
+    Postgres: por cada FK, DROP de la vieja + ADD ... NOT VALID en una transacción
+    corta (el ACCESS EXCLUSIVE del DROP dura solo eso) y después un VALIDATE CONSTRAINT
+    por FK, cada uno en su transacción: recorre la tabla con SHARE UPDATE EXCLUSIVE,
+    sin bloquear escrituras. SQLite: se reconstruye la tabla con foreign_keys=OFF y
+    se comprueba con PRAGMA foreign_key_check.
+    """
+    missing = _fk_rules_missing()
+    if not missing:
+        return
+    db.session.commit()
+    if db.engine.dialect.name == "sqlite":
+        # BEGIN/COMMIT explícitos: el PRAGMA no tiene efecto dentro de una transacción
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            conn.exec_driver_sql("BEGIN")
+            try:
+                for name in missing:
+                    _rebuild_sqlite_table(conn, db.metadata.tables[name])
+                    print(f"[migrate] {name}: reconstruida con reglas ON DELETE")
+                orphans = conn.exec_driver_sql("PRAGMA foreign_key_check").fetchall()
+                conn.exec_driver_sql("COMMIT")
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            finally:
+                conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+        for table, rowid, parent, _fk in orphans:
+            print(f"[migrate] ⚠️ {table} rowid={rowid} apunta a un {parent} inexistente")
+        return
+
+    insp = inspect(db.engine)
+    pending = []
+    for name, fks in missing.items():
+        reflected = {tuple(fk["constrained_columns"]): fk["name"] for fk in insp.get_foreign_keys(name)}
+        for fk in fks:
+            cols = tuple(fk.column_keys)
+            old = reflected.get(cols)
+            new = old or f"{name}_{'_'.join(cols)}_fkey"
+            ref = fk.elements[0].column
+            if old:
+                db.session.execute(text(f'ALTER TABLE "{name}" DROP CONSTRAINT "{old}"'))
+            db.session.execute(text(
+                f'ALTER TABLE "{name}" ADD CONSTRAINT "{new}" FOREIGN KEY ({", ".join(cols)}) '
+                f'REFERENCES "{ref.table.name}" ({ref.name}) ON DELETE {fk.ondelete} NOT VALID'
+            ))
+            db.session.commit()
+            pending.append((name, new))
+            print(f"[migrate] {name}.{', '.join(cols)}: ON DELETE {fk.ondelete}")
+    for name, constraint in pending:
+        db.session.execute(text(f'ALTER TABLE "{name}" VALIDATE CONSTRAINT "{constraint}"'))
+        db.session.commit()
+        print(f"[migrate] {name}.{constraint}: validada")
+
+
+def _backfill(model, values_fn, pending_col):
+    """Rellena por lotes las filas donde `pending_col` es NULL."""
+    total = 0
+    while True:
+        rows = db.session.execute(
+            select(model).where(pending_col.is_(None)).limit(BATCH)
+        ).scalars().all()
+        if not rows:
+            break
+        for row in rows:
+            db.session.execute(update(model).where(model.id == row.id).values(**values_fn(row)))
+        db.session.commit()
+        total += len(rows)
+    if total:
+        print(f"[migrate] {model.__tablename__}: {total} filas normalizadas")
+
+
+def backfill_norm_columns():
+    """Columnas *_norm (búsqueda sin tildes) de filas anteriores a la migración."""
+    _backfill(User, lambda u: {"name_norm": fold(u.name)}, User.name_norm)
+    for model in (Service, Classified):
+        _backfill(
+            model,
+            lambda r: {
+                "title_norm": fold(r.title),
+                "search_norm": fold(f"{r.title or ''} {r.description or ''}"),
+            },
+            model.search_norm,
+        )
+
+
+def backfill_last_login():
+    """User.last_login_at desde LoginLog (para que el KPI de activos 30d no cuente de más)."""
+    res = db.session.execute(text(
+        'UPDATE "user" SET last_login_at = '
+        "(SELECT max(created_at) FROM login_log WHERE login_log.user_id = \"user\".id) "
+        "WHERE last_login_at IS NULL"
+    ))
+    db.session.commit()
+    if res.rowcount:
+        print(f"[migrate] user.last_login_at: {res.rowcount} filas")
+
+
+def backfill_classified_visibility():
+    """Classified.is_visible de filas anteriores a la columna (la tarea "visibility" la mantiene)."""
+    n = backfill_visibility()
+    if n:
+        print(f"[migrate] classified.is_visible: {n} filas")
+
+
+def ensure_log_partitions():
+    """Postgres particionado: DEFAULT y particiones de los próximos meses (también lo hace la tarea "logs")."""
+    for model in (LoginLog, ActivityLog):
+        if retention.is_partitioned(model.__tablename__):
+            for name in retention.ensure_partitions(model.__tablename__):
+                print(f"[migrate] + partición {name}")
+
+
+def migrate_search(rebuild: bool = False):
+    """Índice de texto completo para la búsqueda pública (FTS5 / GIN)."""
+    ensure_search_schema(rebuild=rebuild)
+    print(f"[migrate] Índice de búsqueda listo ({db.engine.dialect.name}).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones idempotentes de la BD")
+    parser.add_argument("--rebuild-search", action="store_true", help="Repuebla el índice de búsqueda")
+    args = parser.parse_args()
+
+    maintenance_mode()
+    app = create_app()
+    with app.app_context():
+        # Tablas nuevas (create_all no toca las existentes)
+        db.create_all()
+        add_missing_columns()
+        fill_created_at()  # antes de reconstruir tablas en SQLite (ya con NOT NULL)
+        ensure_fk_rules()
+        create_missing_indexes()
+        drop_obsolete_indexes()
+        backfill_norm_columns()
+        backfill_last_login()
+        backfill_classified_visibility()
+        ensure_log_partitions()
+        migrate_search(rebuild=args.rebuild_search)
+        print("[ok] Migración completada.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# scripts/migrate_storage.py
+"""
+Copia los archivos subidos de un backend de almacenamiento a otro (app/storage.py),
+p.ej. del disco local a S3/MinIO antes de cambiar STORAGE_BACKEND. Idempotente:
+salta las claves que ya existen en el destino con el mismo tamaño. Copia por bloques
+(no carga archivos enteros en memoria). Los dos backends se configuran con las
+mismas variables de entorno (STORAGE_LOCAL_ROOT, S3_*).
+
+Uso:
+(.venv) > python scripts/migrate_storage.py --from local --to s3 --dry-run
+(.venv) > python scripts/migrate_storage.py --from local --to s3
+(.venv) > python scripts/migrate_storage.py --from local --to s3 --verify   # compara tamaños al final
+"""
+
+import argparse
+import mimetypes
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+
+from app import create_app  # noqa: E402
+from app.storage import make_storage  # noqa: E402
+
+
+def migrate(src, dst, prefix: str, dry_run: bool = False) -> dict:
+    stats = {"copied": 0, "skipped": 0, "bytes": 0}
+    for key in src.list(prefix):
+        info = src.stat(key)
+        current = dst.stat(key)
+        if current is not None and info is not None and current["size"] == info["size"]:
+            stats["skipped"] += 1
+            continue
+        if dry_run:
+            print(f"[storage] copiaría {key} ({info['size'] if info else '?'} bytes)")
+        else:
+            fh = src.open(key)
+            try:
+                dst.put(key, fh, mimetypes.guess_type(key)[0])
+            finally:
+                fh.close()
+        stats["copied"] += 1
+        stats["bytes"] += info["size"] if info else 0
+    return stats
+
+
+def verify(src, dst, prefix: str) -> int:
+    missing = 0
+    for key in src.list(prefix):
+        a, b = src.stat(key), dst.stat(key)
+        if b is None or a["size"] != b["size"]:
+            print(f"[verify] {key}: {'falta' if b is None else 'tamaño distinto'}")
+            missing += 1
+    return missing
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Migra archivos entre backends de almacenamiento")
+    parser.add_argument("--from", dest="source", required=True, choices=("local", "s3"))
+    parser.add_argument("--to", dest="target", required=True, choices=("local", "s3"))
+    parser.add_argument("--prefix", default="avatars/")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--verify", action="store_true")
+    args = parser.parse_args()
+    if args.source == args.target:
+        parser.error("origen y destino son el mismo backend")
+
+    app = create_app()
+    src = make_storage(app.config, args.source)
+    dst = make_storage(app.config, args.target)
+    stats = migrate(src, dst, args.prefix, args.dry_run)
+    print(f"[storage] {stats['copied']} copiados ({stats['bytes']} bytes), {stats['skipped']} ya estaban.")
+    if args.verify and not args.dry_run:
+        missing = verify(src, dst, args.prefix)
+        print(f"[verify] {missing} con diferencias.")
+        return 1 if missing else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
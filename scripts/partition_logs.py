@@ -0,0 +1,124 @@
+# scripts/partition_logs.py
+"""
+Postgres: convierte login_log y activity_log en tablas particionadas por mes
+(RANGE sobre created_at, particiones <tabla>_pYYYYMM). Con particiones la purga de
+scripts/compact_logs.py elimina meses enteros (DETACH + DROP) en vez de borrar filas.
+
+Qué hace, por tabla y en una transacción:
+  renombra la tabla, crea la particionada con las mismas columnas (PK pasa a ser
+  (id, created_at), obligatorio en Postgres), recrea FKs e índices del modelo, crea
+  una partición por mes con datos (+ los 2 siguientes) y una DEFAULT para los meses
+  aún sin crear (un INSERT nunca falla; ver retention.ensure_partitions), copia las
+  filas, traspasa la secuencia del id y borra la tabla vieja. Las filas con created_at NULL (la clave de
+  partición no lo admite) toman la fecha de la fila más antigua.
+
+⚠️ Bloquea la tabla mientras copia: ejecutar en una ventana de mantenimiento y con
+backup. Idempotente (las tablas ya particionadas se saltan). No aplica a SQLite.
+
+Uso:
+(.venv) > python scripts/partition_logs.py --dry-run
+(.venv) > python scripts/partition_logs.py
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, date
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+os.environ.setdefault("BACKGROUND_WORKERS", "")
+
+from sqlalchemy import text  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.engine import maintenance_mode  # noqa: E402
+from app.models import LoginLog, ActivityLog  # noqa: E402
+from app.retention import (  # noqa: E402
+    is_partitioned, partition_name, default_partition_name, month_start, next_month,
+)
+
+AHEAD = 2  # meses futuros ya creados (luego los mantiene la tarea "logs" de app/retention.py)
+
+
+def _months(first: date, last: date):
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def partition_table(model, dry_run: bool):
+    tbl = model.__table__
+    name, old = tbl.name, f"{tbl.name}__unpart"
+    if is_partitioned(name):
+        print(f"[partition] {name}: ya está particionada")
+        return
+
+    first, count = db.session.execute(text(f'SELECT min(created_at), count(*) FROM "{name}"')).one()
+    today = datetime.utcnow().date()
+    last = today
+    for _ in range(AHEAD):
+        last = next_month(last)
+    months = list(_months((first.date() if first else today), last))
+    print(f"[partition] {name}: {count} filas -> {len(months)} particiones "
+          f"({partition_name(name, months[0])} .. {partition_name(name, months[-1])})")
+    if dry_run:
+        return
+
+    def run(sql):
+        db.session.execute(text(sql))
+
+    seq = db.session.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": name}).scalar()
+
+    run(f'ALTER TABLE "{name}" RENAME TO "{old}"')
+    run(f'ALTER TABLE "{old}" RENAME CONSTRAINT "{name}_pkey" TO "{old}_pkey"')
+    for index in tbl.indexes:
+        run(f'DROP INDEX IF EXISTS "{index.name}"')
+    run(f'UPDATE "{old}" SET created_at = coalesce((SELECT min(created_at) FROM "{old}"), now()) '
+        "WHERE created_at IS NULL")
+
+    run(f'CREATE TABLE "{name}" (LIKE "{old}" INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+    run(f'ALTER TABLE "{name}" ADD CONSTRAINT "{name}_pkey" PRIMARY KEY (id, created_at)')
+    for fk in tbl.foreign_key_constraints:
+        ref = fk.elements[0].column
+        ondelete = f" ON DELETE {fk.ondelete}" if fk.ondelete else ""
+        run(f'ALTER TABLE "{name}" ADD FOREIGN KEY ({", ".join(fk.column_keys)}) '
+            f'REFERENCES "{ref.table.name}" ({ref.name}){ondelete}')
+    for index in tbl.indexes:
+        index.create(db.session.connection())  # en la tabla padre: se propaga a cada partición
+    for month in months:
+        run(f'CREATE TABLE "{partition_name(name, month)}" PARTITION OF "{name}" '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')")
+    run(f'CREATE TABLE "{default_partition_name(name)}" PARTITION OF "{name}" DEFAULT')
+
+    run(f'INSERT INTO "{name}" SELECT * FROM "{old}"')
+    if seq:
+        run(f'ALTER SEQUENCE {seq} OWNED BY "{name}".id')
+    run(f'DROP TABLE "{old}"')
+    db.session.commit()
+    run(f'ANALYZE "{name}"')
+    db.session.commit()
+    print(f"[partition] {name}: particionada")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Particiona login_log y activity_log por mes (Postgres)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    maintenance_mode()
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            print("[partition] solo aplica a Postgres; en SQLite la purga borra por tandas.")
+            return 0
+        for model in (LoginLog, ActivityLog):
+            partition_table(model, args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# scripts/reconcile_kpis.py
+"""
+Recalcula los KPIs exactos del dashboard (tabla kpi_counter).
+
+Los contadores se mantienen al vuelo (app/kpis.py); este job corrige la deriva
+(p.ej. usuarios que salen de la ventana de 30 días) y purga contadores diarios viejos.
+Lo mismo hace la tarea "kpis" (app/workers.py, cada KPI_RECONCILE_INTERVAL); el
+script sirve para forzarlo a mano o si los workers en segundo plano están apagados.
+
+Uso:
+(.venv) > python scripts/reconcile_kpis.py
+"""
+
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+
+from app import create_app  # noqa: E402
+from app.engine import maintenance_mode  # noqa: E402
+from app.kpis import reconcile  # noqa: E402
+
+
+def main():
+    maintenance_mode()
+    app = create_app()
+    with app.app_context():
+        values = reconcile()
+        for name, value in sorted(values.items()):
+            print(f"[kpis] {name} = {value}")
+        print("[ok] KPIs reconciliados.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# scripts/run_workers.py
+"""
+Ejecuta las tareas en segundo plano (app/workers.py) en un proceso aparte.
+
+Útil si el proceso web arranca con BACKGROUND_WORKERS="" (p.ej. varios workers de
+gunicorn y se prefiere un único drenador). Las tareas son seguras en paralelo:
+se puede tener este proceso y los hilos del web a la vez.
+
+Uso:
+(.venv) > python scripts/run_workers.py              # todas las tareas, en bucle
+(.venv) > python scripts/run_workers.py mail         # solo algunas
+(.venv) > python scripts/run_workers.py --once mail  # una pasada y salir
+(.venv) > python scripts/run_workers.py --status     # colas de correo y borrados, perfil de la BD
+"""
+
+import os
+import sys
+
+BASE_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+os.environ.setdefault("FLASK_CONFIG", "DevConfig")
+
+from app import create_app  # noqa: E402
+from app import workers  # noqa: E402
+from app.deletions import deletion_stats  # noqa: E402
+from app.email import outbox_stats  # noqa: E402
+from app.engine import pool_stats, pragma_values  # noqa: E402
+
+
+def main(argv) -> int:
+    once = "--once" in argv
+    status = "--status" in argv
+    names = [a for a in argv if not a.startswith("--")]
+
+    app = create_app()
+    if status:
+        with app.app_context():
+            for name, value in outbox_stats().items():
+                print(f"[mail] {name} = {value}")
+            for name, value in deletion_stats().items():
+                print(f"[deletions] {name} = {value}")
+            options = {k: v for k, v in app.config["SQLALCHEMY_ENGINE_OPTIONS"].items() if k != "connect_args"}
+            options["poolclass"] = getattr(options.get("poolclass"), "__name__", "por defecto")
+            print(f"[db] {pool_stats()['backend']} {options}")
+            for name, value in pragma_values().items():
+                print(f"[db] PRAGMA {name} = {value}")
+        return 0
+
+    unknown = [n for n in names if n not in workers._TASKS]
+    if unknown:
+        print(f"[error] tareas desconocidas: {', '.join(unknown)} (disponibles: {', '.join(workers._TASKS)})")
+        return 1
+    names = names or list(workers._TASKS)
+
+    if once:
+        for name in names:
+            workers.run_task_once(app, name)
+        return 0
+
+    print(f"[workers] ejecutando: {', '.join(names)} (Ctrl+C para salir)")
+    try:
+        workers.run_forever(app, names)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))